@@ -1,6 +1,13 @@
+import sys
+from pathlib import Path
+
 import streamlit as st
 import math
 
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from corvigil.assets import stylesheet, thumbnail_url
+from corvigil.probes import HealthCache
+
 APP_DIRECTORY = [
     {
         "title": "Cardiac Risk Assessment",
@@ -9,7 +16,7 @@ APP_DIRECTORY = [
         "url": "https://anice-tools-cardiac-report.streamlit.app/",
         "button_text": "Launch Assessment",
         "theme_color": "linear-gradient(135deg, #667eea 0%, #764ba2 100%)",
-        "image_url": None,
+        "image_url": thumbnail_url("cardiac_problem.jpg"),
     },
     {
         "title": "Heart Attack Predictor",
@@ -18,7 +25,16 @@ APP_DIRECTORY = [
         "url": "https://anice-tools-heart-attack-predict.streamlit.app/",
         "button_text": "Check Risk",
         "theme_color": "linear-gradient(135deg, #FF6B9D 0%, #C9184A 100%)",
-        "image_url": None,
+        "image_url": thumbnail_url("heart_attack.jpg"),
+    },
+    {
+        "title": "Unified Patient Intake",
+        "description": "Enter a patient once and get both risk assessments side by side, scored concurrently.",
+        "icon": "🩺",
+        "page": "intake",
+        "button_text": "Start Intake",
+        "theme_color": "linear-gradient(135deg, #4facfe 0%, #00f2fe 100%)",
+        "image_url": None
     },
     {
         "title": "ECG Analysis Tool",
@@ -31,176 +47,42 @@ APP_DIRECTORY = [
     },
 ]
 
-# -----------------------------------------------------------------------------
-# 2. PAGE CONFIGURATION
-# -----------------------------------------------------------------------------
-st.set_page_config(
-    page_title="CorVigil Hub",
-    page_icon="🏥",
-    layout="wide",
-    initial_sidebar_state="collapsed"
-)
+# Cards with a "page" open one of the hub's own pages (PAGES) instead of a "url".
+APPS_DIR = Path(__file__).resolve().parent
+PAGES = {"intake": ("intake_app.py", "Patient Intake", "🩺")}
+
+# Status checks: every card's "health_url" (default: its "url") is probed
+# concurrently in the background; reruns only read the cached results.
+HEALTH_TTL_SECONDS = 30
+HEALTH_TIMEOUT_SECONDS = 3
+STATUS_POLL_SECONDS = 5
 
 # -----------------------------------------------------------------------------
-# 3. CUSTOM CSS
+# 2. MAIN LAYOUT LOGIC
 # -----------------------------------------------------------------------------
-st.markdown("""
-<style>
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700;800&display=swap');
-
-    * {
-        font-family: 'Inter', sans-serif;
-    }
-
-    .stApp {
-        background: linear-gradient(to bottom right, #f8f9fa, #e9ecef);
-    }
-
-    /* Remove default top padding so banner sits flush */
-    .block-container {
-        padding-top: 1rem;
-        padding-bottom: 5rem;
-    }
-
-    /* Banner Styling */
-    .banner-container {
-        border-radius: 20px;
-        overflow: hidden;
-        margin-bottom: 2rem;
-        box-shadow: 0 4px 15px rgba(0,0,0,0.1);
-    }
-
-    .banner-img {
-        width: 100%;
-        height: auto;
-        display: block;
-    }
-
-    /* Header Styling */
-    .main-header {
-        font-size: 3.5rem;
-        font-weight: 800;
-        background: linear-gradient(120deg, #2c3e50, #4ca1af);
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-        text-align: center;
-        margin-bottom: 0.5rem;
-    }
-
-    .sub-header {
-        text-align: center;
-        color: #6c757d;
-        font-size: 1.2rem;
-        font-weight: 500;
-        margin-bottom: 4rem;
-    }
-
-    div[data-testid="column"] {
-        background: transparent;
-    }
-
-    /* Card Styling */
-    .app-card {
-        background: white;
-        border-radius: 20px;
-        padding: 0;
-        box-shadow: 0 10px 25px rgba(0,0,0,0.05);
-        transition: all 0.3s ease;
-        border: 1px solid #e9ecef;
-        overflow: hidden;
-        height: 100%;
-        display: flex;
-        flex-direction: column;
-    }
-
-    .app-card:hover {
-        transform: translateY(-8px);
-        box-shadow: 0 20px 40px rgba(0,0,0,0.12);
-        border-color: #dee2e6;
-    }
-
-    .card-thumbnail {
-        height: 160px;
-        width: 100%;
-        display: flex;
-        align-items: center;
-        justify-content: center;
-        font-size: 4rem;
-        color: white;
-        position: relative;
-    }
-
-    .thumbnail-img {
-        width: 100%;
-        height: 100%;
-        object-fit: cover;
-    }
-
-    .card-content {
-        padding: 1.5rem;
-        flex-grow: 1;
-        display: flex;
-        flex-direction: column;
-    }
-
-    .card-title {
-        font-size: 1.4rem;
-        font-weight: 700;
-        color: #212529;
-        margin-bottom: 0.5rem;
-        display: flex;
-        align-items: center;
-        gap: 0.5rem;
-    }
-
-    .card-desc {
-        color: #6c757d;
-        font-size: 0.95rem;
-        line-height: 1.5;
-        margin-bottom: 1.5rem;
-        flex-grow: 1;
-    }
-
-    .stLinkButton > a {
-        display: block;
-        width: 100%;
-        text-align: center;
-        border-radius: 10px;
-        font-weight: 600;
-        background: white;
-        border: 2px solid #e9ecef;
-        color: #495057;
-        transition: all 0.2s;
-    }
-
-    .stLinkButton > a:hover {
-        background: #f8f9fa;
-        border-color: #ced4da;
-        color: #212529;
-    }
-
-    .footer {
-        text-align: center;
-        padding: 4rem 0 2rem 0;
-        color: #adb5bd;
-        font-size: 0.9rem;
-    }
-</style>
-""", unsafe_allow_html=True)
+@st.cache_resource
+def load_health_cache():
+    return HealthCache(ttl=HEALTH_TTL_SECONDS, timeout=HEALTH_TIMEOUT_SECONDS)
 
 
-# -----------------------------------------------------------------------------
-# 4. MAIN LAYOUT LOGIC
-# -----------------------------------------------------------------------------
-def main():
-    st.write("")
-    # Header
-    st.markdown('<div class="main-header">CorVigil Portal</div>', unsafe_allow_html=True)
-    st.markdown('<div class="sub-header">Centralized Cardiovascular Health Intelligence Platform</div>',
-                unsafe_allow_html=True)
+def health_target(app):
+    url = app.get("health_url", app.get("url", ""))
+    return url if url.startswith(("http://", "https://")) else None
+
+
+def status_html(result, latency_ms):
+    if result is None:
+        return '<div class="card-status checking">● Checking status…</div>'
+    if not result.up:
+        reason = f"HTTP {result.status}" if result.status else "unreachable"
+        return f'<div class="card-status down">● Offline ({reason})</div>'
+    return f'<div class="card-status up">● Online · {latency_ms:.0f} ms</div>'
 
-    st.write("")
-    st.write("")
+
+@st.fragment(run_every=f"{STATUS_POLL_SECONDS}s")
+def app_grid():
+    health = load_health_cache()
+    statuses = health.get(t for t in map(health_target, APP_DIRECTORY) if t)
 
     # Grid System
     COLS_PER_ROW = 3
@@ -218,10 +100,13 @@ def main():
 
                 with cols[i]:
                     if app.get("image_url"):
-                        thumb_html = f'<img src="{app["image_url"]}" class="thumbnail-img">'
+                        thumb_html = f'<img src="{app["image_url"]}" class="thumbnail-img" loading="lazy" alt="">'
                     else:
                         thumb_html = f'{app["icon"]}'
 
+                    target = health_target(app)
+                    status = status_html(statuses[target], health.recent_latency_ms(target)) if target else ""
+
                     st.markdown(f"""
                     <div class="app-card">
                         <div class="card-thumbnail" style="background: {app['theme_color']}">
@@ -230,19 +115,47 @@ def main():
                         <div class="card-content">
                             <div class="card-title">{app['title']}</div>
                             <div class="card-desc">{app['description']}</div>
+                            {status}
                         </div>
                     </div>
                     """, unsafe_allow_html=True)
 
-                    st.link_button(
-                        label=app["button_text"],
-                        url=app["url"],
-                        use_container_width=True
-                    )
+                    if app.get("page"):
+                        if st.button(app["button_text"], key=f"open_{app['page']}", use_container_width=True):
+                            st.switch_page(PAGES[app["page"]][0])
+                    else:
+                        st.link_button(
+                            label=app["button_text"],
+                            url=app["url"],
+                            use_container_width=True
+                        )
             else:
                 with cols[i]:
                     st.write("")
 
+
+def main():
+    # page configuration and CSS (apps/styles/hub.css, built by `python -m corvigil.assets build`)
+    # belong to the portal page only, the other pages set their own
+    st.set_page_config(
+        page_title="CorVigil Hub",
+        page_icon="🏥",
+        layout="wide",
+        initial_sidebar_state="collapsed"
+    )
+    st.markdown(stylesheet("hub", st.get_option("server.enableStaticServing")), unsafe_allow_html=True)
+
+    st.write("")
+    # Header
+    st.markdown('<div class="main-header">CorVigil Portal</div>', unsafe_allow_html=True)
+    st.markdown('<div class="sub-header">Centralized Cardiovascular Health Intelligence Platform</div>',
+                unsafe_allow_html=True)
+
+    st.write("")
+    st.write("")
+
+    app_grid()
+
     # Footer
     st.markdown("---")
     st.markdown(
@@ -251,5 +164,13 @@ def main():
     )
 
 
+def navigation():
+    """The portal plus the hub's own pages, reachable from their cards and at ``/<name>``."""
+    pages = [st.Page(APPS_DIR / path, title=title, icon=icon, url_path=name)
+             for name, (path, title, icon) in PAGES.items()]
+    return st.navigation([st.Page(main, title="CorVigil Portal", icon="🏥", default=True), *pages],
+                         position="hidden")
+
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    navigation().run()
\ No newline at end of file
@@ -1,8 +1,22 @@
+import sys
+from pathlib import Path
+
 import streamlit as st
-import joblib
 import pandas as pd
 import plotly.graph_objects as go
 
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from corvigil.assets import stylesheet
+from corvigil.counterfactual import describe as describe_changes, search as search_changes
+from corvigil.encoding import encode_cardiac_form
+from corvigil.explain import compare, describe
+from corvigil.inference import InferenceBusy
+from corvigil.preprocess import apply_clip
+from corvigil.reload import ModelWatcher
+from corvigil.reports import render_cardiac_report, submit
+from corvigil.results import ResultStore
+from corvigil.schema import CARDIAC
+
 st.set_page_config(
     page_title="Cardiac Risk Assessment",
     page_icon="❤️",
@@ -10,241 +24,8 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
-# Enhanced Custom CSS
-st.markdown("""
-    <style>
-    /* Import modern font */
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700&display=swap');
-
-    /* Global styles */
-    * {
-        font-family: 'Inter', sans-serif;
-    }
-
-    /* Header styling */
-    .main-header {
-        font-size: 3rem;
-        font-weight: 700;
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-        text-align: center;
-        margin-bottom: 0.5rem;
-        padding: 1rem 0;
-    }
-
-    .sub-header {
-        font-size: 1.3rem;
-        color: #64748b;
-        text-align: center;
-        margin-bottom: 3rem;
-        font-weight: 500;
-    }
-
-    /* Card styling */
-    .info-card {
-        background: linear-gradient(135deg, #f5f7fa 0%, #c3cfe2 100%);
-        padding: 2rem;
-        border-radius: 16px;
-        margin-bottom: 1.5rem;
-        box-shadow: 0 4px 6px rgba(0, 0, 0, 0.07);
-        border: 1px solid rgba(255, 255, 255, 0.8);
-    }
-
-    .result-card {
-        background: linear-gradient(135deg, #ffffff 0%, #f8fafc 100%);
-        padding: 2rem;
-        border-radius: 16px;
-        box-shadow: 0 10px 25px rgba(0, 0, 0, 0.1);
-        border: 1px solid #e2e8f0;
-        margin-bottom: 1.5rem;
-        min-height: 400px;
-    }
-
-    /* Risk box styling */
-    .risk-box {
-        padding: 24px;
-        border-radius: 12px;
-        margin: 16px 0;
-        text-align: center;
-        font-size: 1.8rem;
-        font-weight: 700;
-        box-shadow: 0 4px 12px rgba(0, 0, 0, 0.1);
-        transition: transform 0.2s ease;
-    }
-
-    .risk-box:hover {
-        transform: translateY(-2px);
-        box-shadow: 0 6px 16px rgba(0, 0, 0, 0.15);
-    }
-
-    .very-low { 
-        background: linear-gradient(135deg, #d4edda 0%, #c3e6cb 100%);
-        color: #155724;
-        border: 2px solid #b1dfbb;
-    }
-    .low { 
-        background: linear-gradient(135deg, #d1ecf1 0%, #bee5eb 100%);
-        color: #0c5460;
-        border: 2px solid #abdde5;
-    }
-    .moderate { 
-        background: linear-gradient(135deg, #fff3cd 0%, #ffeaa7 100%);
-        color: #856404;
-        border: 2px solid #ffe082;
-    }
-    .high { 
-        background: linear-gradient(135deg, #f8d7da 0%, #f5c6cb 100%);
-        color: #721c24;
-        border: 2px solid #f1b0b7;
-    }
-    .very-high { 
-        background: linear-gradient(135deg, #f5c6cb 0%, #f17a7a 100%);
-        color: #721c24;
-        border: 2px solid #e08e8e;
-    }
-
-    /* Section headers */
-    .section-header {
-        font-size: 1.5rem;
-        font-weight: 600;
-        color: #1e293b;
-        margin-bottom: 1.5rem;
-        padding-bottom: 0.5rem;
-        border-bottom: 3px solid #667eea;
-        display: inline-block;
-    }
-
-    /* Input sections */
-    .input-section {
-        background: #f8fafc;
-        padding: 1.5rem;
-        border-radius: 12px;
-        margin-bottom: 1rem;
-        border-left: 4px solid #667eea;
-    }
-
-    /* Metric cards */
-    div[data-testid="metric-container"] {
-        background: linear-gradient(135deg, #ffffff 0%, #f8fafc 100%);
-        padding: 1rem;
-        border-radius: 10px;
-        box-shadow: 0 2px 8px rgba(0, 0, 0, 0.05);
-        border: 1px solid #e2e8f0;
-    }
-
-    div[data-testid="metric-container"] > label {
-        font-weight: 600 !important;
-        color: #475569 !important;
-    }
-
-    /* Buttons */
-    .stButton > button {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        color: white;
-        font-weight: 600;
-        padding: 0.75rem 2rem;
-        border-radius: 10px;
-        border: none;
-        box-shadow: 0 4px 12px rgba(102, 126, 234, 0.4);
-        transition: all 0.3s ease;
-    }
-
-    .stButton > button:hover {
-        transform: translateY(-2px);
-        box-shadow: 0 6px 16px rgba(102, 126, 234, 0.5);
-    }
-
-    /* Expander styling */
-    .streamlit-expanderHeader {
-        background: linear-gradient(135deg, #f8fafc 0%, #e2e8f0 100%);
-        border-radius: 8px;
-        font-weight: 600;
-        padding: 1rem;
-    }
-
-    /* Info boxes */
-    .stAlert {
-        border-radius: 12px;
-        border-left-width: 4px;
-    }
-
-    /* Spacing */
-    div[data-testid="stHorizontalBlock"] {
-        gap: 1.5rem;
-    }
-
-    /* Footer */
-    .footer {
-        text-align: center;
-        padding: 2rem;
-        background: linear-gradient(135deg, #f5f7fa 0%, #c3cfe2 100%);
-        border-radius: 12px;
-        margin-top: 3rem;
-        color: #475569;
-        font-size: 0.95rem;
-    }
-
-    /* Form sections */
-    .stForm {
-        background: linear-gradient(135deg, #fff5f7 0%, #ffe8f0 100%);
-        padding: 2rem;
-        border-radius: 16px;
-        box-shadow: 0 10px 25px rgba(0, 0, 0, 0.08);
-        border: 1px solid #ffc4d6;
-    }
-
-    /* Form input styling for better contrast */
-    .stForm label {
-        color: #1e293b !important;
-        font-weight: 600 !important;
-        text-shadow: 1px 1px 2px rgba(255, 255, 255, 0.8),
-                     -1px -1px 2px rgba(255, 255, 255, 0.8),
-                     1px -1px 2px rgba(255, 255, 255, 0.8),
-                     -1px 1px 2px rgba(255, 255, 255, 0.8);
-    }
-
-    .stForm .stMarkdown h4 {
-        color: #1e293b !important;
-        font-weight: 700 !important;
-        text-shadow: 1px 1px 2px rgba(255, 255, 255, 0.8),
-                     -1px -1px 2px rgba(255, 255, 255, 0.8),
-                     1px -1px 2px rgba(255, 255, 255, 0.8),
-                     -1px 1px 2px rgba(255, 255, 255, 0.8);
-    }
-
-    /* Section icons with better visibility */
-    .stForm .stMarkdown p {
-        color: #1e293b !important;
-        text-shadow: 1px 1px 2px rgba(255, 255, 255, 0.8),
-                     -1px -1px 2px rgba(255, 255, 255, 0.8),
-                     1px -1px 2px rgba(255, 255, 255, 0.8),
-                     -1px 1px 2px rgba(255, 255, 255, 0.8);
-    }
-
-    /* Checkbox labels - make them black */
-    .stCheckbox label {
-        color: #000000 !important;
-        font-weight: 600 !important;
-        text-shadow: 1px 1px 2px rgba(255, 255, 255, 0.8),
-                     -1px -1px 2px rgba(255, 255, 255, 0.8),
-                     1px -1px 2px rgba(255, 255, 255, 0.8),
-                     -1px 1px 2px rgba(255, 255, 255, 0.8);
-    }
-
-    .stCheckbox span {
-        color: #000000 !important;
-    }
-
-    /* Divider */
-    hr {
-        margin: 2rem 0;
-        border: none;
-        height: 2px;
-        background: linear-gradient(90deg, transparent, #667eea, transparent);
-    }
-    </style>
-""", unsafe_allow_html=True)
+# Shared stylesheet (built from apps/styles/ by `python -m corvigil.assets build`)
+st.markdown(stylesheet("cardiac", st.get_option("server.enableStaticServing")), unsafe_allow_html=True)
 
 MODEL_PATH = "models/cardiac_failure_detection.pkl"
 THRESHOLD = 0.30
@@ -252,39 +33,94 @@ THRESHOLD = 0.30
 BINS = [0.0, 0.20, 0.35, 0.50, 0.70, 1.0]
 LABELS = ["Very Low Risk", "Low Risk", "Moderate Risk", "High Risk", "Very High Risk"]
 
-FEATURES = ["age", "gender", "height", "weight", "bmi",
-            "ap_hi", "ap_lo", "cholesterol", "gluc",
-            "smoke", "alco", "active"]
-
 
 @st.cache_resource
-def load_model():
+def load_watcher():
+    # swaps in a new model file, with its sidecar, once it is loaded, warmed up and validated;
+    # CORVIGIL_BACKEND=onnx scores with the exported ONNX graph instead of the joblib pipeline
     try:
-        return joblib.load(MODEL_PATH)
+        return ModelWatcher(CARDIAC)
     except FileNotFoundError:
         st.error(f"🚨 Model file '{MODEL_PATH}' not found. Please ensure the model is in the correct directory.")
         return None
 
 
-def predict_risk(inputs: dict, model):
-    X = pd.DataFrame([inputs], columns=FEATURES)
-    X['age'] = X['age'] / 100.0
-    X['gender'] = X['gender'] - 1
-    X['cholesterol'] = (X['cholesterol'] - 1) / 2.0
-    X['bmi'] = X['weight'] / ((X['height'] * 0.01) ** 2)
-    prob = model.predict_proba(X)[0, 1]
+@st.cache_resource
+def load_result_store():
+    # CORVIGIL_RESULT_STORE shares scored results between the replicas on this host
+    return ResultStore.from_env()
+
+
+# display name, scale from model units and unit for the population comparison
+FACTOR_DISPLAY = {
+    "age": ("Age", 100, " years"), "height": ("Height", 1, " cm"), "weight": ("Weight", 1, " kg"),
+    "ap_hi": ("Systolic BP", 1, " mmHg"), "ap_lo": ("Diastolic BP", 1, " mmHg"), "bmi": ("BMI", 1, ""),
+    "gender": ("Gender", 1, ""), "cholesterol": ("Cholesterol", 1, ""), "gluc": ("Glucose", 1, ""),
+    "smoke": ("Smoking", 1, ""), "alco": ("Alcohol Use", 1, ""), "active": ("Physical Activity", 1, ""),
+}
+LEVELS = ("Normal", "Above Normal", "Well Above Normal")
+FACTOR_VALUES = {
+    "gender": {0.0: "Female", 1.0: "Male"},
+    "cholesterol": dict(zip((0.0, 0.5, 1.0), LEVELS)),
+    "gluc": dict(zip((1.0, 2.0, 3.0), LEVELS)),
+}
+
+
+def factor_value(factor, value):
+    name, scale, unit = FACTOR_DISPLAY[factor]
+    if factor in FACTOR_VALUES:
+        return FACTOR_VALUES[factor].get(value, f"{value:g}")
+    if factor in ("smoke", "alco", "active"):
+        return "Yes" if value else "No"
+    return f"{value * scale:.3g}{unit}"
+
+
+def predict_risk(inputs: dict, model, monitor=None, bounds=None, store=None, explainer=None, shadow=None,
+                 version=None):
+    X = encode_cardiac_form(inputs)
+    # same outlier clipping as training, bmi is computed before it like in the notebook
+    X = apply_clip(X, bounds or {})
+    cached = store.get(CARDIAC, X, version) if store is not None else None
+    if cached is not None:
+        prob, explanation = cached["probability"], cached["explanation"]
+    else:
+        prob = model.predict_proba(X)[0, 1]
+        explanation = explainer.explain_factors(X) if explainer is not None else None
+    if shadow is not None:
+        shadow.submit(X, prob)
+    if monitor is not None:
+        monitor.update(X.iloc[0].to_dict())
     prediction = int(prob >= THRESHOLD)
 
     risk_zone = pd.cut([prob], bins=BINS, labels=LABELS, include_lowest=True)[0]
 
+    if store is not None and cached is None:
+        store.put(CARDIAC, X, {"probability": float(prob), "risk_zone": str(risk_zone),
+                               "explanation": explanation}, version)
+
     return {
         "probability": round(float(prob), 4),
         "screening_prediction": prediction,
         "risk_zone": str(risk_zone),
-        "input_summary": inputs
+        "input_summary": inputs,
+        "features": X.iloc[0].to_dict(),
+        "explanation": explanation
     }
 
 
+@st.fragment(run_every="1s")
+def report_download():
+    future = st.session_state.get("report_future")
+    if future is None:
+        return
+    if future.done():
+        st.download_button("📄 Download Assessment Report", future.result(),
+                           file_name="cardiac_risk_report.html", mime="text/html",
+                           on_click="ignore", use_container_width=True)
+    else:
+        st.caption("📄 Preparing the downloadable report…")
+
+
 def create_gauge_chart(probability):
     fig = go.Figure(go.Indicator(
         mode="gauge+number",
@@ -329,9 +165,11 @@ def main():
     st.markdown('<div class="sub-header">AI-Powered Cardiovascular Health Screening Platform</div>',
                 unsafe_allow_html=True)
 
-    model = load_model()
-    if model is None:
+    watcher = load_watcher()
+    if watcher is None:
         st.stop()
+    # one model version for the whole run, even if a new one is swapped in meanwhile
+    live = watcher.current
 
     # Initialize session state
     if 'form_submitted' not in st.session_state:
@@ -391,33 +229,14 @@ def main():
         # Lifestyle Factors Section
         st.markdown("#### 🏃 Lifestyle Factors")
 
-        # Add specific styling for checkboxes
-        st.markdown("""
-            <style>
-            div[data-testid="stForm"] .stCheckbox label span {
-                color: #000000 !important;
-                font-weight: 600 !important;
-            }
-            div[data-testid="stForm"] .stCheckbox label {
-                color: #000000 !important;
-            }
-            </style>
-        """, unsafe_allow_html=True)
-
         lifestyle_col1, lifestyle_col2, lifestyle_col3 = st.columns(3)
 
         with lifestyle_col1:
             smoke = st.checkbox("🚬 Current Smoker")
-            st.markdown('<style>.stCheckbox:nth-of-type(1) label p {color: #000000 !important;}</style>',
-                        unsafe_allow_html=True)
         with lifestyle_col2:
             alco = st.checkbox("🍷 Alcohol Consumer")
-            st.markdown('<style>.stCheckbox:nth-of-type(2) label p {color: #000000 !important;}</style>',
-                        unsafe_allow_html=True)
         with lifestyle_col3:
             active = st.checkbox("💪 Physically Active", value=True)
-            st.markdown('<style>.stCheckbox:nth-of-type(3) label p {color: #000000 !important;}</style>',
-                        unsafe_allow_html=True)
 
         st.markdown("<br>", unsafe_allow_html=True)
 
@@ -447,7 +266,16 @@ def main():
 
         # Get prediction
         with st.spinner("🔄 Analyzing patient data..."):
-            result = predict_risk(inputs, model)
+            try:
+                # clip bounds, drift reference and explanation background come from the sidecar loaded with
+                # this version; CORVIGIL_SHADOW=1 also scores it with models/<stem>.candidate.pkl
+                result = predict_risk(inputs, live.executor, live.monitor, live.bounds, load_result_store(),
+                                      live.explainer(), live.shadow(), live.version)
+            except InferenceBusy:
+                st.warning("⏳ The assessment service is busy right now. Please submit again in a moment.")
+                st.stop()
+        # the report renders in the background while the results below are drawn
+        st.session_state.report_future = submit(render_cardiac_report, inputs, result, THRESHOLD)
 
         st.markdown("<br>", unsafe_allow_html=True)
         st.markdown('<p class="section-header">📊 Assessment Results</p>', unsafe_allow_html=True)
@@ -564,6 +392,51 @@ def main():
             st.metric("Physical Activity", "💪 Active" if active else "⚠️ Inactive")
             st.metric("BMI Status", f"{bmi_color} {bmi_category}")
 
+        explainer = live.explainer()
+        if explainer is not None and result["explanation"] is not None:
+            st.markdown("<br>", unsafe_allow_html=True)
+            st.markdown('<p class="section-header">🎯 What Drives This Estimate</p>', unsafe_allow_html=True)
+            st.caption(f"Contribution of each factor against an average risk of "
+                       f"{explainer.base_value * 100:.0f}% in {explainer.reference}.")
+            for f in result["explanation"][:5]:
+                direction = "raises" if f["impact"] > 0 else "lowers"
+                st.markdown(f"• **{FACTOR_DISPLAY[f['factor']][0]}** {factor_value(f['factor'], f['value'])} "
+                            f"{direction} the estimate by **{abs(f['impact']) * 100:.1f} points**")
+
+        # computed at training time by `python -m corvigil.explain fit cardiac`
+        population = live.population
+        if population is not None:
+            st.markdown("<br>", unsafe_allow_html=True)
+            st.markdown('<p class="section-header">👥 Compared with the Population</p>', unsafe_allow_html=True)
+            st.caption(f"Against {population['rows']} training patients, most influential factors first.")
+            zone = result["risk_zone"]
+            for entry in compare(population, CARDIAC, result["features"], zone).head(6).to_dict("records"):
+                name, scale, unit = FACTOR_DISPLAY[entry["factor"]]
+                st.markdown("• " + describe(entry, zone, name, FACTOR_VALUES.get(entry["factor"]), scale, unit))
+
+        if result["screening_prediction"] == 1:
+            st.markdown("<br>", unsafe_allow_html=True)
+            st.markdown('<p class="section-header">🧭 What Would Lower This Risk</p>', unsafe_allow_html=True)
+            try:
+                # candidate batches queue on the bounded inference pool like every other request
+                outcome = search_changes("cardiac", live.pipeline, inputs, THRESHOLD, bounds=live.bounds,
+                                         executor=live.executor)
+            except InferenceBusy:
+                st.warning("⏳ The assessment service is busy right now. Please submit again in a moment.")
+            else:
+                if outcome.solutions:
+                    for option in outcome.solutions:
+                        st.markdown(f"• {'; '.join(describe_changes('cardiac', option))} → "
+                                    f"estimated risk **{option.probability * 100:.1f}%**")
+                else:
+                    st.info("No combination of up to three lifestyle, weight, blood pressure or cholesterol "
+                            f"changes brings the estimate under {THRESHOLD * 100:.0f}%.")
+                st.caption(f"Smallest changes first; {outcome.scored:,} of {outcome.candidates:,} candidate "
+                           f"combinations scored in {outcome.elapsed_s * 1000:.0f} ms.")
+
+        st.markdown("<br>", unsafe_allow_html=True)
+        report_download()
+
     elif not st.session_state.form_submitted:
         # Welcome screen
         st.markdown("<br>", unsafe_allow_html=True)
@@ -614,6 +487,8 @@ def main():
         '</div>',
         unsafe_allow_html=True
     )
+    st.caption(f"Model version {live.label} · loaded {live.loaded_at:%Y-%m-%d %H:%M}"
+               + (f" · promoted {live.promoted_at}" if live.promoted_at else ""))
 
 
 if __name__ == "__main__":
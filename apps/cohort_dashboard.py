@@ -0,0 +1,133 @@
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import streamlit as st
+import joblib
+import plotly.graph_objects as go
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from corvigil.batch import risk_zone_codes, score_batches
+from corvigil.cohorts import CohortCube
+from corvigil.datasets import as_frame
+from corvigil.schema import LABELS, SPECS
+
+st.set_page_config(
+    page_title="CorVigil Cohorts",
+    page_icon="📊",
+    layout="wide"
+)
+
+CUBE_DIR = Path(".cache") / "cohorts"
+ZONE_COLORS = ["#2f9e44", "#1c7ed6", "#f59f00", "#e8590c", "#c92a2a"]
+BATCH_ROWS = 65_536
+
+
+@st.cache_resource
+def load_model(name):
+    return joblib.load(SPECS[name].model_path)
+
+
+def cube_path(name):
+    return CUBE_DIR / f"{name}.npz"
+
+
+def get_cube(name):
+    """The session's cube for ``name``, starting from the saved one if there is one."""
+    key = f"cube_{name}"
+    if key not in st.session_state:
+        path = cube_path(name)
+        st.session_state[key] = CohortCube.load(path) if path.exists() else CohortCube(name)
+    return st.session_state[key]
+
+
+def add_batch(name, uploaded, cube):
+    """Score an uploaded patient file chunk by chunk, adding every chunk to ``cube``."""
+    spec = SPECS[name]
+    suffix = Path(uploaded.name).suffix or ".csv"
+    with tempfile.NamedTemporaryFile(suffix=suffix) as tmp:
+        tmp.write(uploaded.getbuffer())
+        tmp.flush()
+        status = st.empty()
+        done = 0
+        for X, prob in score_batches(tmp.name, spec, load_model(name), BATCH_ROWS):
+            cube.update(as_frame(X, spec.features), prob, risk_zone_codes(prob))
+            done += len(prob)
+            status.caption(f"⏳ Scored {done:,} patients…")
+        status.empty()
+    CUBE_DIR.mkdir(parents=True, exist_ok=True)
+    cube.save(cube_path(name))
+    return done
+
+
+def share_chart(shares):
+    fig = go.Figure()
+    cohorts = [" / ".join(map(str, i)) if isinstance(i, tuple) else str(i) for i in shares.index]
+    for zone, color in zip(LABELS, ZONE_COLORS):
+        fig.add_trace(go.Bar(y=cohorts, x=shares[zone] * 100, name=zone, orientation="h",
+                             marker_color=color, hovertemplate="%{y}: %{x:.1f}%<extra>" + zone + "</extra>"))
+    fig.update_layout(barmode="stack", height=max(260, 28 * len(cohorts) + 120),
+                      xaxis_title="Share of cohort (%)", yaxis=dict(autorange="reversed"),
+                      legend=dict(orientation="h", y=-0.2), margin=dict(l=10, r=10, t=10, b=10))
+    return fig
+
+
+def main():
+    st.title("📊 Cohort Risk Breakdown")
+    st.caption("Risk-zone shares by patient group, answered from pre-aggregated count cubes.")
+
+    with st.sidebar:
+        name = st.selectbox("Model", sorted(SPECS), format_func=lambda n: n.replace("_", " ").title())
+        cube = get_cube(name)
+        st.metric("Patients in cube", f"{cube.rows:,}")
+        uploaded = st.file_uploader("Add a scored batch", type=["csv", "parquet"],
+                                    help="Patient file with the model's features; it is scored and added.")
+        if uploaded is not None and st.button("Score and add", use_container_width=True):
+            rows = add_batch(name, uploaded, cube)
+            st.success(f"Added {rows:,} patients")
+            st.rerun()
+        if cube.rows and st.button("Reset cube", use_container_width=True):
+            st.session_state[f"cube_{name}"] = CohortCube(name)
+            cube_path(name).unlink(missing_ok=True)
+            st.rerun()
+
+    if not cube.rows:
+        st.info("No patients yet. Add a batch in the sidebar, or build one with "
+                "`python -m corvigil.batch <model> patients.parquet -o scored.parquet "
+                f"--cube {cube_path(name)}`.")
+        return
+
+    by = st.multiselect("Break down by", cube.dim_names, default=cube.dim_names[:1])
+    where = {}
+    with st.expander("Filters"):
+        cols = st.columns(3)
+        for i, dim in enumerate(cube.dims):
+            chosen = cols[i % 3].multiselect(dim.name.replace("_", " ").title(), dim.labels, key=f"f_{name}_{dim.name}")
+            if chosen:
+                where[dim.name] = chosen
+
+    start = time.perf_counter()
+    table = cube.query(by, where)
+    elapsed = (time.perf_counter() - start) * 1000
+    if table.empty:
+        st.warning("No patients match these filters.")
+        return
+    shares = table[LABELS].div(table["patients"], axis=0)
+
+    total = int(table["patients"].sum())
+    m1, m2, m3 = st.columns(3)
+    m1.metric("Patients selected", f"{total:,}")
+    m2.metric("Mean risk probability", f"{(table['mean_probability'] * table['patients']).sum() / total:.1%}")
+    m3.metric("High or Very High Risk", f"{table[LABELS[-2:]].to_numpy().sum() / total:.1%}")
+
+    st.plotly_chart(share_chart(shares), use_container_width=True)
+    view = shares.mul(100).round(1).add_suffix(" %")
+    view.insert(0, "patients", table["patients"])
+    view["mean probability"] = table["mean_probability"].round(3)
+    st.dataframe(view, use_container_width=True)
+    st.caption(f"Answered from {cube.counts.size:,} cube cells in {elapsed:.1f} ms.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,19 @@
+import sys
+from pathlib import Path
+
 import streamlit as st
 import pandas as pd
-import joblib
-import shap
-from streamlit_shap import st_shap
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from corvigil.assets import stylesheet
+from corvigil.batch import risk_zone_codes
+from corvigil.counterfactual import describe as describe_changes, search as search_changes
+from corvigil.explain import compare, describe
+from corvigil.inference import InferenceBusy
+from corvigil.reload import ModelWatcher
+from corvigil.reports import render_heart_attack_report, submit as submit_report
+from corvigil.results import ResultStore
+from corvigil.schema import HEART_ATTACK, LABELS
 
 # ---------------- CONFIG ----------------
 st.set_page_config(
@@ -12,171 +23,43 @@ st.set_page_config(
 )
 
 # ---------------- CUSTOM CSS ----------------
-st.markdown("""
-<style>
-    /* Main background with soft skin tint */
-    .main {
-        background: linear-gradient(135deg, #FFF5F5 0%, #FFE9E9 100%);
-    }
-
-    /* Header styling */
-    .main-header {
-        text-align: center;
-        padding: 2rem 0 1rem 0;
-        background: linear-gradient(135deg, #FF6B9D 0%, #C9184A 100%);
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-        background-clip: text;
-        font-weight: 800;
-        font-size: 3rem;
-        margin-bottom: 0.5rem;
-    }
-
-    .sub-header {
-        text-align: center;
-        color: #8B5A5A;
-        font-size: 1.1rem;
-        margin-bottom: 2rem;
-        font-weight: 400;
-    }
-
-    /* Form container */
-    .stForm {
-        background: #FFF0F3;
-        border-radius: 20px;
-        padding: 2rem;
-        box-shadow: 0 4px 20px rgba(201, 24, 74, 0.08);
-        border: 1px solid #FFE0E9;
-    }
-
-    /* Input fields */
-    .stNumberInput input, .stSelectbox select {
-        border-radius: 10px;
-        border: 1.5px solid #FFD6E0;
-        background: #FFFAFA;
-        color: #2D3748;
-        transition: all 0.3s ease;
-    }
-
-    .stNumberInput input:focus, .stSelectbox select:focus {
-        border-color: #FF6B9D;
-        box-shadow: 0 0 0 3px rgba(255, 107, 157, 0.1);
-        background: #FFFBFC;
-    }
-
-    /* Labels */
-    label {
-        color: #6B4848 !important;
-        font-weight: 500 !important;
-        font-size: 0.95rem !important;
-    }
-
-    /* Submit button */
-    .stButton > button {
-        background: linear-gradient(135deg, #FF6B9D 0%, #C9184A 100%);
-        color: white;
-        border: none;
-        border-radius: 12px;
-        padding: 0.75rem 2rem;
-        font-weight: 600;
-        font-size: 1.1rem;
-        transition: all 0.3s ease;
-        box-shadow: 0 4px 15px rgba(201, 24, 74, 0.25);
-    }
-
-    .stButton > button:hover {
-        transform: translateY(-2px);
-        box-shadow: 0 6px 20px rgba(201, 24, 74, 0.35);
-    }
-
-    /* Result cards */
-    .stAlert {
-        border-radius: 15px;
-        border: none;
-        box-shadow: 0 4px 15px rgba(0, 0, 0, 0.08);
-    }
-
-    /* Dividers */
-    hr {
-        margin: 2rem 0;
-        border: none;
-        height: 1px;
-        background: linear-gradient(90deg, transparent, #FFD6E0, transparent);
-    }
-
-    /* Expander styling */
-    .streamlit-expanderHeader {
-        background: #FFF0F3;
-        border-radius: 10px;
-        border: 1px solid #FFE9EE;
-        color: #6B4848;
-        font-weight: 600;
-    }
-
-    .streamlit-expanderContent {
-        background: #FFF8FA;
-        border: 1px solid #FFE9EE;
-        border-top: none;
-        border-radius: 0 0 10px 10px;
-        padding: 1rem;
-    }
-
-    /* Section headers */
-    h2, h3 {
-        color: #6B4848;
-        font-weight: 600;
-    }
-
-    /* Metrics */
-    .stMetric {
-        background: #FFFBFC;
-        padding: 1rem;
-        border-radius: 10px;
-        border: 1px solid #FFE9EE;
-    }
-
-    /* Info boxes */
-    .stInfo {
-        background: linear-gradient(135deg, #FFF5F7 0%, #FFE9F0 100%);
-        border-left: 4px solid #FF6B9D;
-    }
-
-    .stSuccess {
-        background: linear-gradient(135deg, #F0FFF4 0%, #E6F9ED 100%);
-        border-left: 4px solid #48BB78;
-    }
-
-    /* Footer */
-    .footer-text {
-        text-align: center;
-        color: #8B5A5A;
-        font-size: 0.9rem;
-        padding: 2rem 0 1rem 0;
-    }
-
-    /* Card effect for result column */
-    .result-card {
-        background: #FFF0F3;
-        border-radius: 20px;
-        padding: 2rem;
-        box-shadow: 0 4px 20px rgba(201, 24, 74, 0.08);
-        border: 1px solid #FFE0E9;
-        min-height: 400px;
-    }
-</style>
-""", unsafe_allow_html=True)
-
-MODEL_PATH = "models/heart_attack_detection.pkl"
+st.markdown(stylesheet("heart_attack", st.get_option("server.enableStaticServing")), unsafe_allow_html=True)
+
 THRESHOLD = 0.35
 
 
 # ---------------- LOAD MODEL ----------------
 @st.cache_resource
-def load_model():
-    return joblib.load(MODEL_PATH)
+def load_watcher():
+    # swaps in a new models/heart_attack_detection.pkl, with its sidecar, once it is loaded, warmed up and validated;
+    # CORVIGIL_BACKEND=onnx scores with the exported ONNX graph instead of the joblib pipeline
+    return ModelWatcher(HEART_ATTACK)
 
 
-model = load_model()
+@st.cache_resource
+def load_result_store():
+    # CORVIGIL_RESULT_STORE shares scored results between the replicas on this host
+    return ResultStore.from_env()
+
+
+# one model version for the whole run, even if a new one is swapped in meanwhile
+live = load_watcher().current
+model = live.pipeline
+executor = live.executor
+# drift reference and population explanations (`python -m corvigil.explain fit heart_attack`) come from
+# the sidecar loaded with this version; CORVIGIL_SHADOW=1 also scores it with models/<stem>.candidate.pkl
+monitor = live.monitor
+population = live.population
+store = load_result_store()
+shadow = live.shadow()
+
+FACTOR_NAMES = {
+    "Age": "Age", "RestingBP": "Resting Blood Pressure", "Cholesterol": "Cholesterol Level",
+    "MaxHR": "Maximum Heart Rate", "Oldpeak": "ST Depression (Oldpeak)",
+    "FastingBS": "Fasting Blood Sugar > 120", "Sex_M": "Biological Sex", "ChestPainType": "Chest Pain Pattern",
+    "RestingECG": "Resting ECG", "ExerciseAngina_Y": "Exercise-Induced Angina", "ST_Slope": "ST Slope Pattern",
+}
+FACTOR_VALUES = {"Sex_M": {0.0: "Female", 1.0: "Male"}}
 
 # ---------------- HEADER ----------------
 st.markdown("<h1 class='main-header'>❤️ Heart Attack Risk Assessment</h1>", unsafe_allow_html=True)
@@ -232,6 +115,18 @@ with form_col:
             use_container_width=True
         )
 
+@st.fragment(run_every="1s")
+def report_download():
+    future = st.session_state.get("report_future")
+    if future is None:
+        return
+    if future.done():
+        st.download_button("📄 Download Assessment Report", future.result(),
+                           file_name="heart_attack_risk_report.html", mime="text/html", on_click="ignore")
+    else:
+        st.caption("📄 Preparing the downloadable report…")
+
+
 # ---------------- PREDICTION & RESULTS ----------------
 with result_col:
     if not submit:
@@ -264,7 +159,19 @@ with result_col:
         }
 
         X = pd.DataFrame([input_data])
-        prob = model.predict_proba(X)[0, 1]
+        cached = store.get(HEART_ATTACK, input_data, live.version) if store is not None else None
+        if cached is not None:
+            prob = cached["probability"]
+        else:
+            try:
+                prob = executor.predict_proba(X)[0, 1]
+            except InferenceBusy:
+                st.warning("⏳ The assessment service is busy right now. Please submit again in a moment.")
+                st.stop()
+        if shadow is not None:
+            shadow.submit(input_data, prob)
+        if monitor is not None:
+            monitor.update(input_data)
         prediction = int(prob >= THRESHOLD)
 
         st.markdown("### 📊 Assessment Result")
@@ -291,12 +198,15 @@ if submit:
     st.markdown("### 🎯 Risk Factor Analysis")
     st.markdown("Understanding what's influencing your assessment")
 
+    factors = []
+    contributions = cached["explanation"] if cached is not None else None
     try:
-        actual_model = model[-1]
-        explainer = shap.Explainer(actual_model)
-        shap_v = explainer(X)
-        values = shap_v.values[0]
-        feature_names = X.columns.tolist()
+        # contributions to the probability, per clinical factor (one-hot groups summed)
+        if contributions is None:
+            # background stored by `python -m corvigil.attribution fit heart_attack`
+            contributions = live.explainer().explain_factors(X)
+        values = [c["impact"] for c in contributions]
+        feature_names = [c["factor"] for c in contributions]
 
         # Feature information dictionary
         feature_info = {
@@ -456,10 +366,9 @@ if submit:
                         st.write(f['protective_desc'])
 
                 with col2:
-                    impact_magnitude = min(abs(f['impact']), 1.0)
                     st.metric(
-                        "Strength",
-                        f"{impact_magnitude * 100:.0f}%",
+                        "Effect on Risk",
+                        f"{f['impact'] * 100:+.1f} pts",
                         delta="Higher" if is_risk else "Lower",
                         delta_color="inverse" if is_risk else "normal"
                     )
@@ -490,6 +399,53 @@ if submit:
             "Continue regular health monitoring and maintain heart-healthy lifestyle habits."
         )
 
+    if store is not None and cached is None:
+        store.put(HEART_ATTACK, input_data, {"probability": float(prob),
+                                             "risk_zone": LABELS[risk_zone_codes([prob])[0]],
+                                             "explanation": contributions}, live.version)
+
+    # ---------------- POPULATION COMPARISON ----------------
+    if population is not None:
+        zone = LABELS[risk_zone_codes([prob])[0]]
+        st.markdown("### 👥 How You Compare")
+        caption = f"Against {population['rows']} training patients, most influential factors first."
+        if zone in population["zones"]:
+            caption += (f" {zone} patients there scored "
+                        f"{population['zones'][zone]['mean_probability'] * 100:.0f}% on average.")
+        st.caption(caption)
+        for entry in compare(population, HEART_ATTACK, X, zone).head(6).to_dict("records"):
+            st.markdown("• " + describe(entry, zone, FACTOR_NAMES.get(entry["factor"]),
+                                        FACTOR_VALUES.get(entry["factor"])))
+
+    # ---------------- COUNTERFACTUALS ----------------
+    form = {"age": age, "sex": sex, "chest_pain": chest_pain, "resting_bp": resting_bp,
+            "cholesterol": cholesterol, "fasting_bs": fasting_bs, "max_hr": max_hr, "oldpeak": oldpeak,
+            "exercise_angina": exercise_angina, "resting_ecg": resting_ecg, "st_slope": st_slope}
+    if prob >= THRESHOLD:
+        st.markdown("### 🧭 What Would Lower Your Risk")
+        try:
+            # candidate batches queue on the bounded inference pool like every other request
+            outcome = search_changes("heart_attack", model, form, THRESHOLD, executor=executor)
+        except InferenceBusy:
+            st.warning("⏳ The assessment service is busy right now. Please submit again in a moment.")
+        else:
+            if outcome.solutions:
+                for option in outcome.solutions:
+                    st.markdown(f"• {'; '.join(describe_changes('heart_attack', option))} → "
+                                f"estimated risk **{option.probability * 100:.1f}%**")
+            else:
+                st.info("Lowering cholesterol or resting blood pressure alone doesn't bring the estimate under "
+                        f"{THRESHOLD * 100:.0f}% — the other factors weigh more. "
+                        "Discuss next steps with a clinician.")
+            st.caption(f"Smallest changes first; {outcome.scored:,} of {outcome.candidates:,} candidate "
+                       f"combinations scored in {outcome.elapsed_s * 1000:.0f} ms.")
+
+    # ---------------- DOWNLOADABLE REPORT ----------------
+    st.session_state.report_future = submit_report(
+        render_heart_attack_report, form, float(prob), THRESHOLD,
+        [(f["name"], float(f["impact"])) for f in factors[:4]])
+    report_download()
+
 # ---------------- FOOTER ----------------
 st.markdown("---")
 st.markdown(
@@ -499,4 +455,6 @@ st.markdown(
     "Please consult with a qualified healthcare provider for medical concerns."
     "</p>",
     unsafe_allow_html=True
-)
\ No newline at end of file
+)
+st.caption(f"Model version {live.label} · loaded {live.loaded_at:%Y-%m-%d %H:%M}"
+           + (f" · promoted {live.promoted_at}" if live.promoted_at else ""))
\ No newline at end of file
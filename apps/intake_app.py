@@ -0,0 +1,213 @@
+import sys
+from pathlib import Path
+
+import streamlit as st
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from corvigil.assets import stylesheet
+from corvigil.batch import risk_zone_codes
+from corvigil.encoding import HEART_ATTACK_CHOICES
+from corvigil.inference import InferenceBusy
+from corvigil.intake import INTAKE_DEFAULTS, assess
+from corvigil.reload import ModelWatcher
+from corvigil.results import ResultStore
+from corvigil.schema import CARDIAC, HEART_ATTACK, LABELS
+
+st.set_page_config(
+    page_title="Patient Intake",
+    page_icon="🩺",
+    layout="wide",
+    initial_sidebar_state="collapsed"
+)
+
+# same look as the cardiac app (apps/styles/cardiac.css)
+st.markdown(stylesheet("cardiac", st.get_option("server.enableStaticServing")), unsafe_allow_html=True)
+
+MODELS = {
+    CARDIAC.name: ("❤️‍🩹 Cardiac Risk", "Cardiovascular disease risk from vitals, labs and lifestyle."),
+    HEART_ATTACK.name: ("💔 Heart Attack Risk", "Heart disease probability from clinical and ECG findings."),
+}
+FACTOR_NAMES = {
+    "age": "Age", "gender": "Sex", "height": "Height", "weight": "Weight", "bmi": "BMI",
+    "ap_hi": "Systolic BP", "ap_lo": "Diastolic BP", "cholesterol": "Cholesterol", "gluc": "Glucose",
+    "smoke": "Smoking", "alco": "Alcohol Use", "active": "Physical Activity",
+    "Age": "Age", "Sex_M": "Sex", "RestingBP": "Resting BP", "Cholesterol": "Cholesterol",
+    "FastingBS": "Fasting Blood Sugar > 120", "MaxHR": "Maximum Heart Rate", "Oldpeak": "ST Depression (Oldpeak)",
+    "ChestPainType": "Chest Pain Pattern", "RestingECG": "Resting ECG", "ExerciseAngina_Y": "Exercise-Induced Angina",
+    "ST_Slope": "ST Slope Pattern",
+}
+
+
+@st.cache_resource
+def load_watchers():
+    # each swaps in a new model file once it is loaded, warmed up and validated, as in the single-model apps;
+    # clip bounds, drift monitor and shadow evaluator (CORVIGIL_SHADOW=1) come with the loaded version
+    watchers = {}
+    for spec in (CARDIAC, HEART_ATTACK):
+        try:
+            watchers[spec.name] = ModelWatcher(spec)
+        except FileNotFoundError:
+            watchers[spec.name] = None
+    return watchers
+
+
+@st.cache_resource
+def load_result_store():
+    # CORVIGIL_RESULT_STORE shares scored results with the single-model apps on this host
+    return ResultStore.from_env()
+
+
+def intake_form():
+    """The form; returns the intake values once submitted, else ``None``."""
+    d = INTAKE_DEFAULTS
+    with st.form("intake_form"):
+        st.markdown('<p class="section-header">📋 Patient Information</p>', unsafe_allow_html=True)
+
+        st.markdown("#### 👤 Shared by both assessments")
+        c1, c2, c3, c4, c5 = st.columns(5)
+        with c1:
+            age = st.number_input("Age", min_value=1, max_value=120, value=d["age"], step=1)
+        with c2:
+            sex = st.selectbox("Sex", HEART_ATTACK_CHOICES["sex"])
+        with c3:
+            systolic_bp = st.number_input("Systolic BP (mmHg)", min_value=80, max_value=250, value=d["systolic_bp"],
+                                          help="Resting upper blood pressure reading")
+        with c4:
+            cholesterol = st.number_input("Total Cholesterol (mg/dL)", min_value=100, max_value=600,
+                                          value=d["cholesterol"],
+                                          help="Cardiac levels: below 200 normal, 200-239 above normal, "
+                                               "240 and up well above normal")
+        with c5:
+            glucose = st.number_input("Fasting Glucose (mg/dL)", min_value=50, max_value=400, value=d["glucose"],
+                                      help="Cardiac levels: below 100 normal, 100-125 above normal, "
+                                           "126 and up well above normal; above 120 counts as high fasting "
+                                           "blood sugar for the heart attack model")
+
+        st.markdown("#### 🩺 Cardiac risk details")
+        c1, c2, c3, c4, c5, c6 = st.columns(6)
+        with c1:
+            height = st.number_input("Height (cm)", min_value=100, max_value=250, value=d["height"], step=1)
+        with c2:
+            weight = st.number_input("Weight (kg)", min_value=30.0, max_value=300.0, value=d["weight"], step=0.5)
+        with c3:
+            diastolic_bp = st.number_input("Diastolic BP (mmHg)", min_value=40, max_value=150,
+                                           value=d["diastolic_bp"])
+        with c4:
+            smoke = st.checkbox("🚬 Current Smoker")
+        with c5:
+            alco = st.checkbox("🍷 Alcohol Consumer")
+        with c6:
+            active = st.checkbox("💪 Physically Active", value=True)
+
+        st.markdown("#### 📈 Heart attack risk details")
+        c1, c2, c3, c4, c5, c6 = st.columns(6)
+        with c1:
+            chest_pain = st.selectbox("Chest Pain Type", HEART_ATTACK_CHOICES["chest_pain"],
+                                      index=HEART_ATTACK_CHOICES["chest_pain"].index(d["chest_pain"]))
+        with c2:
+            max_hr = st.number_input("Max Heart Rate", min_value=60, max_value=220, value=d["max_hr"])
+        with c3:
+            oldpeak = st.number_input("Oldpeak", min_value=0.0, max_value=10.0, value=d["oldpeak"])
+        with c4:
+            exercise_angina = st.selectbox("Exercise Angina", HEART_ATTACK_CHOICES["exercise_angina"])
+        with c5:
+            resting_ecg = st.selectbox("Resting ECG", HEART_ATTACK_CHOICES["resting_ecg"])
+        with c6:
+            st_slope = st.selectbox("ST Slope", HEART_ATTACK_CHOICES["st_slope"])
+
+        col1, col2, col3 = st.columns([1, 1, 1])
+        with col2:
+            submitted = st.form_submit_button("🔍 Assess Both Risks", type="primary", use_container_width=True)
+    if not submitted:
+        return None
+    return {"age": age, "sex": sex, "systolic_bp": systolic_bp, "cholesterol": cholesterol, "glucose": glucose,
+            "height": height, "weight": weight, "diastolic_bp": diastolic_bp,
+            "smoke": int(smoke), "alco": int(alco), "active": int(active),
+            "chest_pain": chest_pain, "max_hr": max_hr, "oldpeak": oldpeak, "exercise_angina": exercise_angina,
+            "resting_ecg": resting_ecg, "st_slope": st_slope}
+
+
+def model_result(name, assessment):
+    title, description = MODELS[name]
+    st.markdown(f"### {title}")
+    st.caption(description)
+    if assessment is None:
+        st.warning("This model is not available right now.")
+        return
+    prob, threshold = assessment.probability, assessment.spec.threshold
+    zone = LABELS[risk_zone_codes([prob])[0]]
+    message = f"**{zone}**\n\nRisk Probability: **{prob * 100:.1f}%**\n\nThreshold: {threshold * 100:.0f}%"
+    if assessment.flagged:
+        st.error(f"**⚠️ Elevated Risk Detected** · {message}")
+    else:
+        st.success(f"**✅ Below the Screening Threshold** · {message}")
+    if assessment.explanation:
+        st.markdown("**Main factors**")
+        if assessment.reference:
+            st.caption(f"Percentage points against the average of {assessment.reference}.")
+        for f in assessment.explanation[:4]:
+            arrow = "🔺" if f["impact"] > 0 else "🔻"
+            st.markdown(f"{arrow} {FACTOR_NAMES.get(f['factor'], f['factor'])}: "
+                        f"{f['impact'] * 100:+.1f} pts")
+    st.caption(f"Model version {assessment.version[:8]}")
+
+
+def main():
+    st.markdown('<div class="main-header">🩺 Patient Intake</div>', unsafe_allow_html=True)
+    st.markdown('<div class="sub-header">One form, both CorVigil risk assessments</div>', unsafe_allow_html=True)
+
+    # one model version per model for the whole run, even if a new one is swapped in meanwhile
+    models = {name: w.current if w is not None else None for name, w in load_watchers().items()}
+    if not any(models.values()):
+        st.error("🚨 No model files found. Please ensure the models are in the models/ directory.")
+        st.stop()
+
+    values = intake_form()
+    if values is None:
+        st.info("Fill out the form once and click **Assess Both Risks**: shared answers (age, sex, blood pressure, "
+                "cholesterol, blood sugar) are mapped to each model's own encoding.")
+        return
+
+    with st.spinner("🔄 Running both assessments..."):
+        try:
+            # both scores and both explanations run concurrently; see corvigil.intake
+            result = assess(values, models, load_result_store())
+        except InferenceBusy:
+            st.warning("⏳ The assessment service is busy right now. Please submit again in a moment.")
+            st.stop()
+
+    st.markdown('<p class="section-header">📊 Combined Results</p>', unsafe_allow_html=True)
+    flagged = [MODELS[name][0].split(" ", 1)[1] for name, a in result.items() if a.flagged]
+    if len(flagged) == len(MODELS):
+        st.error("**Both assessments indicate elevated risk.** Please consult a healthcare provider "
+                 "for further evaluation.")
+    elif flagged:
+        st.warning(f"**{flagged[0]}** is elevated; the other assessment is below its threshold. "
+                   "Consider discussing the result with a healthcare provider.")
+    else:
+        st.success("**Both assessments are below their screening thresholds.** Continue maintaining "
+                   "healthy lifestyle habits.")
+
+    cols = st.columns(len(MODELS), gap="large")
+    for col, name in zip(cols, MODELS):
+        with col:
+            model_result(name, result.get(name))
+
+    elapsed = max(a.elapsed_s for a in result.values())
+    cached = sum(a.cached for a in result.values())
+    st.caption(f"Both assessments in {elapsed * 1000:.0f} ms"
+               + (f" ({cached} from stored results)" if cached else ""))
+
+    st.markdown("---")
+    st.markdown(
+        "<p class='footer-text'>"
+        "⚕️ Medical Disclaimer: This tool is for educational and screening purposes only. "
+        "It does not replace professional medical diagnosis or advice. "
+        "Please consult with a qualified healthcare provider for medical concerns."
+        "</p>",
+        unsafe_allow_html=True
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""End-to-end load test of the Streamlit apps through Streamlit's in-process AppTest.
+
+    python benchmarks/app_load.py --app cardiac --sessions 16 --submits 10
+    python benchmarks/app_load.py --app all
+
+Each simulated session is a thread with its own AppTest (its own session
+state, sharing ``st.cache_resource`` with the others as a real server does).
+It renders the page, fills the form with random values inside every
+widget's min/max/options, submits, and times the full rerun: CSS injection,
+inference, Plotly serialisation and SHAP included.
+
+Reported per app: reruns/sec over the whole run, p50/p99 submit-to-result
+latency, and resident memory growth per session, followed by each distinct
+exception a rerun raised with how often it occurred.
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+from corvigil.timing import summarize  # noqa: E402
+
+APPS = {
+    "cardiac": ROOT / "apps" / "cardiac_test_app.py",
+    "heart_attack": ROOT / "apps" / "heart_attack_test_app.py",
+    "intake": ROOT / "apps" / "intake_app.py",
+}
+
+
+def rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def randomize(at: AppTest, rng: random.Random):
+    for w in at.number_input:
+        if isinstance(w.value, int):
+            w.set_value(rng.randint(int(w.min), int(w.max)))
+        else:
+            steps = int((w.max - w.min) / w.step)
+            w.set_value(round(w.min + rng.randint(0, steps) * w.step, 6))
+    for w in at.selectbox:
+        w.select_index(rng.randrange(len(w.options)))
+    for w in at.checkbox:
+        w.set_value(rng.random() < 0.5)
+
+
+def describe(exc) -> str:
+    return f"{exc.proto.type}: {exc.message}" if exc.proto.type else exc.message
+
+
+def session(app_path, submits, seed, latencies, reruns, errors):
+    rng = random.Random(seed)
+    at = AppTest.from_file(str(app_path), default_timeout=120)
+    at.run()
+    reruns.append(1)
+    if at.exception:                    # no form to submit
+        errors.append(f"first render: {describe(at.exception[0])}")
+        return
+    for _ in range(submits):
+        randomize(at, rng)
+        start = time.perf_counter()
+        at.button[0].click().run()
+        latencies.append(time.perf_counter() - start)
+        reruns.append(1)
+        if at.exception:
+            errors.append(describe(at.exception[0]))
+
+
+def load_test(app_path, sessions, submits, seed=0) -> dict:
+    latencies, reruns, errors = [], [], []
+    # warm the shared model cache so the first session does not pay the load alone
+    AppTest.from_file(str(app_path), default_timeout=120).run()
+    rss_before = rss_bytes()
+    threads = [threading.Thread(target=session, args=(app_path, submits, seed + i, latencies, reruns, errors))
+               for i in range(sessions)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+    stats = summarize(latencies)
+    stats.update({
+        "reruns_per_s": len(reruns) / wall,
+        "mem_per_session_mb": (rss_bytes() - rss_before) / sessions / 1e6,
+        "errors": len(errors),
+        "messages": Counter(errors),
+    })
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--app", choices=sorted(APPS) + ["all"], default="all")
+    parser.add_argument("--sessions", type=int, default=8)
+    parser.add_argument("--submits", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    # the apps load their models relative to the repository root
+    os.chdir(ROOT)
+    names = sorted(APPS) if args.app == "all" else [args.app]
+    print(f"{args.sessions} sessions x {args.submits} submits, {os.cpu_count()} cores")
+    for name in names:
+        s = load_test(APPS[name], args.sessions, args.submits, args.seed)
+        print(f"{name:<13} {s['reruns_per_s']:6.1f} reruns/s  submit p50 {s['p50_ms']:7.1f} ms  "
+              f"p99 {s['p99_ms']:7.1f} ms  {s['mem_per_session_mb']:6.2f} MB/session  "
+              f"errors {s['errors']}")
+        for message, count in s["messages"].most_common():
+            print(f"  {count:>5} x {message}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Bootstrap confidence intervals: vectorized count matrices vs. a loop of sklearn metric calls.
+
+    python benchmarks/bootstrap_ci.py --resamples 5000 --rows 150 10000 100000
+
+Scores synthetic cardiac patients (:mod:`corvigil.synth`) with the
+exported pipeline and times :func:`corvigil.evaluation.bootstrap` for two
+models (paired differences included) at each test-set size, on one thread
+and on every core.  The baseline resamples with a Python loop calling
+``roc_auc_score`` and ``confusion_matrix`` per draw; it is timed on
+``--loop-resamples`` draws and scaled up.  Also checks the vectorized
+metrics against sklearn on the same draws.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import joblib  # noqa: E402
+import numpy as np  # noqa: E402
+from sklearn.metrics import confusion_matrix, roc_auc_score  # noqa: E402
+
+from corvigil.evaluation import _Scores, bootstrap, resample_indices  # noqa: E402
+from corvigil.scheduler import available_cores  # noqa: E402
+from corvigil.schema import CARDIAC  # noqa: E402
+from corvigil.synth import fit_model, to_table  # noqa: E402
+
+
+def loop_bootstrap(y, probs, threshold, resamples, seed=0):
+    rng = np.random.default_rng(seed)
+    for _ in range(resamples):
+        idx = rng.integers(0, len(y), len(y))
+        for prob in probs:
+            yy, pp = y[idx], prob[idx]
+            roc_auc_score(yy, pp)
+            confusion_matrix(yy, pp >= threshold, labels=[0, 1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[150, 10_000, 100_000])
+    parser.add_argument("--resamples", type=int, default=5000)
+    parser.add_argument("--loop-resamples", type=int, default=100)
+    args = parser.parse_args(argv)
+
+    spec = CARDIAC
+    pipeline = joblib.load(spec.model_path)
+    frame = to_table(next(fit_model(spec).iter_chunks(max(args.rows), seed=31)), spec).to_pandas()
+    y_all = frame[spec.target].to_numpy().astype(bool)
+    prob_all = pipeline.predict_proba(frame[list(spec.features)])[:, 1]
+    # a second "model": the same scores with noise, so the paired difference is not trivially 0
+    other_all = np.clip(prob_all + np.random.default_rng(1).normal(0, 0.05, len(prob_all)), 0, 1)
+
+    draws = resample_indices(np.random.default_rng(2), 500, 50)
+    y, prob = y_all[:500], prob_all[:500]
+    m = _Scores(y.astype(np.int32), prob, spec.threshold).metrics(draws)
+    err = 0.0
+    for b, idx in enumerate(draws):
+        tn, fp, fn, tp = confusion_matrix(y[idx], prob[idx] >= spec.threshold).ravel()
+        err = max(err, abs(m["roc_auc"][b] - roc_auc_score(y[idx], prob[idx])), abs(m["false_positives"][b] - fp),
+                  abs(m["false_negatives"][b] - fn), abs(m["recall"][b] - tp / (tp + fn)))
+    print(f"max |vectorized - sklearn| over 50 draws: {err:.2e}")
+
+    cores = available_cores()
+    print(f"{args.resamples} resamples, 2 models, {cores} core(s)")
+    for rows in args.rows:
+        y, probs = y_all[:rows], {"production": prob_all[:rows], "other": other_all[:rows]}
+        start = time.perf_counter()
+        loop_bootstrap(y, list(probs.values()), spec.threshold, args.loop_resamples)
+        loop_s = (time.perf_counter() - start) * args.resamples / args.loop_resamples
+        timings = {}
+        for jobs in sorted({1, cores}):
+            start = time.perf_counter()
+            result = bootstrap(y, probs, spec.threshold, args.resamples, n_jobs=jobs)
+            timings[jobs] = time.perf_counter() - start
+        auc = result["production"]["roc_auc"]
+        line = "  ".join(f"{jobs} thread(s) {s:7.2f} s" for jobs, s in timings.items())
+        print(f"  {rows:>7} rows  loop ~{loop_s:8.1f} s  vectorized {line}  "
+              f"({loop_s / min(timings.values()):.0f}x)  AUC {auc}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Cohort breakdowns from a count cube vs. re-grouping the scored frame.
+
+    python benchmarks/cohort_queries.py --rows 1000000
+
+Resamples the heart attack data to ``--rows`` patients, scores them, then
+answers the same drill-downs (risk-zone counts by one or two dimensions,
+with and without a filter) with ``pandas.groupby`` over the scored frame and
+with ``CohortCube.query``, and checks that the counts agree.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import joblib  # noqa: E402
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from corvigil.batch import risk_zone_codes  # noqa: E402
+from corvigil.cohorts import CohortCube  # noqa: E402
+from corvigil.schema import HEART_ATTACK, LABELS  # noqa: E402
+from corvigil.timing import summarize, time_calls  # noqa: E402
+
+QUERIES = [
+    (["age_band"], None),
+    (["sex", "chest_pain"], None),
+    (["age_band"], {"exercise_angina": ["Yes"], "sex": ["Male"]}),
+]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--chunk", type=int, default=65_536)
+    args = parser.parse_args(argv)
+
+    spec = HEART_ATTACK
+    base = pd.read_csv(spec.data_path)
+    rng = np.random.default_rng(0)
+    X = base[list(spec.features)].astype(float).iloc[rng.integers(0, len(base), args.rows)].reset_index(drop=True)
+    prob = joblib.load(spec.model_path).predict_proba(X)[:, 1]
+    zones = risk_zone_codes(prob)
+
+    cube = CohortCube(spec.name)
+    start = time.perf_counter()
+    for i in range(0, args.rows, args.chunk):
+        cube.update(X.iloc[i:i + args.chunk], prob[i:i + args.chunk], zones[i:i + args.chunk])
+    per_chunk = (time.perf_counter() - start) / -(-args.rows // args.chunk)
+    print(f"{args.rows:,} patients, cube update {per_chunk * 1000:.1f} ms per {args.chunk:,}-row chunk")
+
+    # the scored frame a dashboard would otherwise re-group on every widget change
+    scored = pd.DataFrame({d.name: pd.Categorical.from_codes(np.clip(np.asarray(d.encode(X), int), 0,
+                                                                     len(d.labels) - 1), d.labels)
+                           for d in cube.dims})
+    scored["risk_zone"] = pd.Categorical.from_codes(zones, LABELS)
+
+    for by, where in QUERIES:
+        def with_pandas():
+            frame = scored
+            for name, values in (where or {}).items():
+                frame = frame[frame[name].isin(values)]
+            return frame.groupby(by + ["risk_zone"], observed=False).size().unstack()
+
+        expected = with_pandas()
+        got = cube.query(by, where)[LABELS]
+        assert (expected.loc[got.index, LABELS].to_numpy() == got.to_numpy()).all()
+        pd_stats = summarize(time_calls(with_pandas, n=10, warmup=1))
+        cube_stats = summarize(time_calls(lambda: cube.query(by, where), n=200))
+        label = " x ".join(by) + (f" where {where}" if where else "")
+        print(f"{label:<70} groupby p50 {pd_stats['p50_ms']:7.1f} ms   cube p50 {cube_stats['p50_ms']:5.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
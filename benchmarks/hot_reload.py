@@ -0,0 +1,157 @@
+"""Requests served while new model versions are deployed under them.
+
+    python benchmarks/hot_reload.py --model heart_attack --sessions 8 --deploys 6
+
+Copies the exported model to a temporary ``models/`` directory and serves it
+through a :class:`ModelWatcher` while session threads score single rows
+without pause.  Meanwhile it deploys, in turn, a candidate with extra
+boosting rounds and the original again (``os.replace``, as ``update
+--promote`` does), then a broken artifact that scores every patient the
+same, and a candidate copied in place in slow chunks.  Reports failed
+requests (none allowed), latency away from and around swaps, time
+from deploy to swap, and whether the broken one was kept out.
+"""
+import argparse
+import copy
+import dataclasses
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import joblib  # noqa: E402
+import numpy as np  # noqa: E402
+from xgboost import XGBClassifier  # noqa: E402
+
+from corvigil.artifacts import meta_path  # noqa: E402
+from corvigil.reload import ModelWatcher  # noqa: E402
+from corvigil.schema import SPECS, get_spec  # noqa: E402
+from corvigil.synth import fit_model, to_table  # noqa: E402
+from corvigil.timing import summarize  # noqa: E402
+from corvigil.update import continue_boosting  # noqa: E402
+
+
+def deploy(artifact, path, chunked=False):
+    """Put ``artifact`` (a file) at ``path``: atomically, or rewritten in place in slow chunks."""
+    if not chunked:
+        tmp = path.with_name(f".{path.name}.tmp")
+        shutil.copyfile(artifact, tmp)
+        os.replace(tmp, path)
+        return
+    data = Path(artifact).read_bytes()
+    with open(path, "wb") as fh:
+        for i in range(0, len(data), len(data) // 8 + 1):
+            fh.write(data[i:i + len(data) // 8 + 1])
+            fh.flush()
+            time.sleep(0.05)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", choices=sorted(SPECS), default="heart_attack")
+    parser.add_argument("--sessions", type=int, default=8)
+    parser.add_argument("--deploys", type=int, default=6, help="good versions deployed, alternating")
+    parser.add_argument("--interval", type=float, default=0.25, help="watcher poll interval (s)")
+    parser.add_argument("--settle", type=float, default=3.0, help="seconds between deploys")
+    args = parser.parse_args(argv)
+
+    spec = get_spec(args.model)
+    production = joblib.load(spec.model_path)
+    synth = fit_model(spec)
+    batch = to_table(next(synth.iter_chunks(5_000, seed=21)), spec).to_pandas()
+    live = to_table(next(synth.iter_chunks(2_000, seed=22)), spec).to_pandas()[list(spec.features)]
+    rows = [live.iloc[[i]] for i in range(len(live))]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        served = dataclasses.replace(spec, model_path=tmp / spec.model_path.name)
+        shutil.copyfile(spec.model_path, served.model_path)
+        if meta_path(spec.model_path).exists():
+            shutil.copyfile(meta_path(spec.model_path), meta_path(served.model_path))
+        original, candidate, broken = tmp / "original.pkl", tmp / "candidate.pkl", tmp / "broken.pkl"
+        shutil.copyfile(spec.model_path, original)
+        joblib.dump(continue_boosting(production, batch[list(spec.features)], batch[spec.target], 30), candidate)
+        # a learning rate of 0 leaves every patient at the base score
+        flat = copy.deepcopy(production)
+        stump = XGBClassifier(n_estimators=1, learning_rate=0.0)
+        flat.steps[-1] = (flat.steps[-1][0], stump.fit(flat[0].transform(batch[list(spec.features)]),
+                                                       batch[spec.target]))
+        joblib.dump(flat, broken)
+
+        watcher = ModelWatcher(served, interval=args.interval, grace=2.0, timeout=30)
+        stop = threading.Event()
+        samples, failures, versions = [], [], set()
+        lock = threading.Lock()
+
+        def session(i):
+            k = i
+            while not stop.is_set():
+                model = watcher.current
+                start = time.perf_counter()
+                try:
+                    model.executor.predict_proba(rows[k % len(rows)])
+                except Exception as exc:
+                    with lock:
+                        failures.append(repr(exc))
+                else:
+                    with lock:
+                        samples.append((time.perf_counter(), time.perf_counter() - start))
+                        versions.add(model.label)
+                k += args.sessions
+
+        threads = [threading.Thread(target=session, args=(i,)) for i in range(args.sessions)]
+        for t in threads:
+            t.start()
+        time.sleep(args.settle)
+
+        swaps, rejections = [], []          # (deployed at, swapped at), last_error
+        plan = [(candidate if d % 2 == 0 else original, False) for d in range(args.deploys)]
+        plan += [(broken, False), (candidate if args.deploys % 2 == 0 else original, True)]
+        for artifact, chunked in plan:
+            before = watcher.current.version
+            rejected = watcher.last_error
+            start = time.perf_counter()
+            deploy(artifact, served.model_path, chunked)
+            while time.perf_counter() - start < args.settle * 2:
+                if watcher.current.version != before or watcher.last_error not in (None, rejected):
+                    break
+                time.sleep(0.01)
+            if watcher.current.version != before:
+                swaps.append((start, time.perf_counter()))
+            elif watcher.last_error not in (None, rejected):
+                rejections.append(watcher.last_error)
+            time.sleep(args.settle)
+        stop.set()
+        for t in threads:
+            t.join()
+        watcher.close()
+
+    at = np.array([t for t, _ in samples])
+    lat = np.array([s for _, s in samples])
+    near = np.zeros(len(at), dtype=bool)
+    for deployed, swapped in swaps:
+        near |= (at >= deployed) & (at < swapped + 0.5)
+    print(f"{spec.name}: {args.sessions} sessions, {len(plan)} deploys ({len(swaps)} swapped), "
+          f"{len(samples)} requests served by {len(versions)} versions, {len(failures)} failed")
+    for label, mask in (("steady", ~near), ("loading / swapping", near)):
+        if mask.any():
+            s = summarize(lat[mask])
+            print(f"  {label:<18} p50 {s['p50_ms']:6.2f} ms  p99 {s['p99_ms']:6.2f} ms  max {s['max_ms']:7.2f} ms")
+    if swaps:
+        took = [swapped - deployed for deployed, swapped in swaps]
+        print(f"  deploy to swap: median {np.median(took):.2f} s, max {max(took):.2f} s "
+              f"(poll every {args.interval:.2f} s, two stable polls, load, warm-up, checks)")
+    print(f"  broken artifact kept out: {'yes' if len(swaps) == len(plan) - 1 else 'NO'}"
+          + (f" ({rejections[0]})" if rejections else ""))
+    if failures:
+        print("  first failure:", failures[0])
+
+
+if __name__ == "__main__":
+    main()
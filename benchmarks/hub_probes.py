@@ -0,0 +1,50 @@
+"""Hub status checks against the local stand-in server.
+
+    python benchmarks/hub_probes.py --timeout 1
+
+Probes a healthy, a slow, a failing, a hanging and a closed target one by
+one and then concurrently with :func:`corvigil.probes.probe_all`, and times
+``HealthCache.get`` (what every hub rerun pays) while a refresh is running.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from corvigil.probes import HealthCache, StandInServer, probe_all  # noqa: E402
+from corvigil.timing import summarize, time_calls  # noqa: E402
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--timeout", type=float, default=1.0)
+    args = parser.parse_args(argv)
+
+    with StandInServer() as server:
+        urls = [server.url("/ok"), server.url("/slow?ms=400"), server.url("/status/503"),
+                server.url("/hang"), "http://127.0.0.1:9/"]
+
+        start = time.perf_counter()
+        for url in urls:
+            probe_all([url], args.timeout)
+        sequential = time.perf_counter() - start
+
+        start = time.perf_counter()
+        results = probe_all(urls, args.timeout)
+        concurrent = time.perf_counter() - start
+        for r in results.values():
+            state = f"up   {r.status} {r.latency_ms:6.1f} ms" if r.up else f"down {r.status or '-'} {r.error}"
+            print(f"  {state:<45} {r.url}")
+        print(f"sequential {sequential * 1000:7.0f} ms   concurrent {concurrent * 1000:7.0f} ms")
+
+        cache = HealthCache(ttl=0.0, timeout=args.timeout)   # every get() finds the results stale
+        stats = summarize(time_calls(lambda: cache.get(urls), n=2000))
+        print(f"HealthCache.get with refreshes in flight: p50 {stats['p50_ms'] * 1000:.0f} us  "
+              f"p99 {stats['p99_ms'] * 1000:.0f} us  max {stats['max_ms']:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
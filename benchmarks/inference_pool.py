@@ -0,0 +1,78 @@
+"""Concurrent-session load test: shared pipeline vs InferenceExecutor.
+
+    python benchmarks/inference_pool.py --sessions 32 --requests 50
+
+Every simulated session is a thread issuing single-row ``predict_proba``
+calls back to back, like Streamlit sessions scoring form submissions.
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from corvigil.featcache import FeatureCache  # noqa: E402
+from corvigil.inference import InferenceExecutor  # noqa: E402
+from corvigil.schema import SPECS, get_spec  # noqa: E402
+from corvigil.timing import summarize  # noqa: E402
+
+
+def run_sessions(predict, rows, sessions, requests):
+    latencies = [[] for _ in range(sessions)]
+    barrier = threading.Barrier(sessions)
+
+    def session(i):
+        barrier.wait()
+        for k in range(requests):
+            row = rows[(i * requests + k) % len(rows)]
+            start = time.perf_counter()
+            predict(row)
+            latencies[i].append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(sessions)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+    stats = summarize(np.concatenate(latencies))
+    stats["req_per_s"] = sessions * requests / wall
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", choices=sorted(SPECS), default="heart_attack")
+    parser.add_argument("--sessions", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--nthread", type=int, default=1)
+    args = parser.parse_args()
+
+    spec = get_spec(args.model)
+    model = joblib.load(spec.model_path)
+    X_test = FeatureCache().load(spec).frame("X_test")
+    rows = [X_test.iloc[[i]] for i in range(len(X_test))]
+
+    results = {"shared pipeline (all cores)": run_sessions(lambda r: model.predict_proba(r), rows,
+                                                            args.sessions, args.requests)}
+    executor = InferenceExecutor(model, workers=args.workers, nthread=args.nthread, timeout=60)
+    label = f"executor {executor.workers}w x {executor.nthread}t"
+    results[label] = run_sessions(executor.predict_proba, rows, args.sessions, args.requests)
+    executor.shutdown()
+
+    print(f"{os.cpu_count()} cores, {args.sessions} sessions x {args.requests} requests")
+    for name, s in results.items():
+        print(f"{name:<30} p50 {s['p50_ms']:7.2f} ms  p99 {s['p99_ms']:7.2f} ms  "
+              f"max {s['max_ms']:7.2f} ms  {s['req_per_s']:7.1f} req/s")
+
+
+if __name__ == "__main__":
+    main()
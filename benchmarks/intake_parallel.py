@@ -0,0 +1,75 @@
+"""Unified intake: both models scored and explained concurrently vs. one after the other.
+
+    python benchmarks/intake_parallel.py --patients 200
+
+Loads both exported models as the apps serve them (:class:`LoadedModel`,
+explainers built and warmed up first), draws random intakes in clinical
+ranges and times :func:`corvigil.intake.assess` on each, sequentially
+(score, explain, next model -- what filling in both apps amounts to) and
+concurrently, alternating per patient so both see the same machine load.
+No result store, so every call does the full work.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import numpy as np  # noqa: E402
+
+from corvigil.encoding import HEART_ATTACK_CHOICES  # noqa: E402
+from corvigil.intake import assess  # noqa: E402
+from corvigil.reload import LoadedModel  # noqa: E402
+from corvigil.scheduler import available_cores  # noqa: E402
+from corvigil.schema import CARDIAC, HEART_ATTACK  # noqa: E402
+from corvigil.timing import summarize  # noqa: E402
+
+
+def random_intakes(n, seed=0):
+    rng = np.random.default_rng(seed)
+    for _ in range(n):
+        yield {
+            "age": int(rng.integers(30, 80)), "systolic_bp": int(rng.integers(95, 190)),
+            "diastolic_bp": int(rng.integers(60, 110)), "cholesterol": int(rng.integers(140, 330)),
+            "glucose": int(rng.integers(70, 200)), "height": int(rng.integers(150, 195)),
+            "weight": float(rng.integers(50, 120)), "max_hr": int(rng.integers(90, 200)),
+            "oldpeak": float(rng.choice([0.0, 0.5, 1.0, 2.0, 3.0])),
+            "smoke": int(rng.random() < 0.2), "alco": int(rng.random() < 0.1), "active": int(rng.random() < 0.7),
+            **{field: str(rng.choice(options)) for field, options in HEART_ATTACK_CHOICES.items()},
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--patients", type=int, default=200)
+    parser.add_argument("--no-explain", action="store_true", help="scores only")
+    args = parser.parse_args(argv)
+
+    models = {spec.name: LoadedModel.load(spec) for spec in (CARDIAC, HEART_ATTACK)}
+    explain = not args.no_explain
+    try:
+        for values in random_intakes(5, seed=1):            # explainers built, executors warm
+            assess(values, models, explain=explain)
+        timings = {True: [], False: []}
+        for i, values in enumerate(random_intakes(args.patients)):
+            for parallel in ((True, False) if i % 2 else (False, True)):
+                start = time.perf_counter()
+                assess(values, models, explain=explain, parallel=parallel)
+                timings[parallel].append(time.perf_counter() - start)
+    finally:
+        for live in models.values():
+            live.close()
+
+    workers = {name: live.executor.workers for name, live in models.items()}
+    print(f"{args.patients} intakes, {'scores and explanations' if explain else 'scores only'}, "
+          f"{available_cores()} core(s), inference workers {workers}")
+    for parallel, label in ((False, "sequential"), (True, "concurrent")):
+        s = summarize(np.array(timings[parallel]))
+        print(f"  {label:<10}  p50 {s['p50_ms']:7.2f} ms  p99 {s['p99_ms']:7.2f} ms  max {s['max_ms']:7.2f} ms")
+    print(f"  median speed-up {np.median(timings[False]) / np.median(timings[True]):.2f}x")
+
+
+if __name__ == "__main__":
+    main()
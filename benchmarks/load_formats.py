@@ -0,0 +1,72 @@
+"""Load-time benchmark: CSV through pandas vs Parquet through Arrow.
+
+    python benchmarks/load_formats.py --rows 1000000
+
+The heart attack CSV (with its True/False one-hot strings) is tiled up to
+``--rows`` rows, converted once, and both files are loaded into the float32
+feature matrix the model consumes.
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from corvigil.convert import convert_csv  # noqa: E402
+from corvigil.datasets import iter_feature_batches, load_features  # noqa: E402
+from corvigil.schema import DATA_DIR, HEART_ATTACK  # noqa: E402
+
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def pandas_csv(path):
+    df = pd.read_csv(path)
+    return df[list(HEART_ATTACK.features)].to_numpy(dtype=np.float32)
+
+
+def stream_parquet(path):
+    for _ in iter_feature_batches(path, HEART_ATTACK):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    base = pd.read_csv(DATA_DIR / "heart_processed.csv", dtype=str)
+    reps = -(-args.rows // len(base))
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = Path(tmp) / "heart.csv"
+        pd.concat([base] * reps, ignore_index=True).iloc[:args.rows].to_csv(csv_path, index=False)
+        pq_path, _ = convert_csv(csv_path, Path(tmp) / "heart.parquet")
+
+        results = {
+            "pandas read_csv": best_of(lambda: pandas_csv(csv_path), args.repeat),
+            "arrow read_csv": best_of(lambda: load_features(csv_path, HEART_ATTACK), args.repeat),
+            "parquet": best_of(lambda: load_features(pq_path, HEART_ATTACK), args.repeat),
+            "parquet streamed": best_of(lambda: stream_parquet(pq_path), args.repeat),
+        }
+        sizes = {"csv": csv_path.stat().st_size, "parquet": pq_path.stat().st_size}
+
+    print(f"{args.rows:,} rows, csv {sizes['csv'] / 1e6:.1f} MB, parquet {sizes['parquet'] / 1e6:.1f} MB")
+    baseline = results["pandas read_csv"]
+    for name, seconds in results.items():
+        print(f"{name:<18} {seconds * 1000:8.1f} ms  ({baseline / seconds:5.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
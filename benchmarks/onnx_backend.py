@@ -0,0 +1,53 @@
+"""joblib pipeline vs. the exported ONNX graph under onnxruntime.
+
+    python benchmarks/onnx_backend.py --rows 100000
+
+For both models: single-patient ``predict_proba`` latency (the apps' call,
+a one-row DataFrame) and batch throughput over ``--rows`` resampled
+patients, one thread each.  Export the graphs first with
+``python -m corvigil.onnx_backend export <model>``.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import joblib  # noqa: E402
+import numpy as np  # noqa: E402
+
+from corvigil.inference import set_nthread  # noqa: E402
+from corvigil.onnx_backend import OnnxPipeline, parity, parity_samples  # noqa: E402
+from corvigil.schema import SPECS  # noqa: E402
+from corvigil.timing import summarize, time_calls  # noqa: E402
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--calls", type=int, default=500)
+    args = parser.parse_args(argv)
+
+    for name, spec in sorted(SPECS.items()):
+        pipeline = joblib.load(spec.model_path)
+        set_nthread(pipeline, 1)
+        backend = OnnxPipeline.load(spec, nthread=1)
+        X = parity_samples(spec, n=args.rows, seed=1)
+        report = parity(pipeline, backend, X.iloc[:2000])
+        print(f"{name}: max |diff| {report['max_abs_diff']:.1e}, zone agreement {report['zone_agreement']:.4f}")
+
+        row = X.iloc[[0]]
+        for label, model in (("joblib", pipeline), ("onnx", backend)):
+            stats = summarize(time_calls(lambda: model.predict_proba(row), n=args.calls, warmup=20))
+            start = time.perf_counter()
+            model.predict_proba(X)
+            elapsed = time.perf_counter() - start
+            print(f"  {label:<7} single row p50 {stats['p50_ms']:6.3f} ms  p99 {stats['p99_ms']:6.3f} ms   "
+                  f"batch {args.rows:,} rows {elapsed * 1000:7.1f} ms ({args.rows / elapsed / 1e3:,.0f}k rows/s)")
+        assert np.allclose(pipeline.predict_proba(row), backend.predict_proba(row), atol=1e-5)
+
+
+if __name__ == "__main__":
+    main()
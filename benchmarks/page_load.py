@@ -0,0 +1,99 @@
+"""What a browser has to fetch before each app page is styled.
+
+    python benchmarks/page_load.py
+    python benchmarks/page_load.py --timeout 10
+
+Runs every app once through AppTest and inspects what it sends:
+
+* time for the first script run and for a plain rerun,
+* bytes of HTML/CSS the page re-sends on every rerun (``st.markdown``
+  bodies),
+* render-blocking external requests (``@import url(...)``/``<link href>``
+  to another host), each fetched once to time it; in an air-gapped clinic
+  these hang until the browser gives up,
+* local static files referenced from ``app/static/`` and their size (fetched
+  once, then served from the browser cache).
+"""
+import argparse
+import re
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+APPS = {
+    "hub": ROOT / "apps" / "app_hub.py",
+    "cardiac": ROOT / "apps" / "cardiac_test_app.py",
+    "heart_attack": ROOT / "apps" / "heart_attack_test_app.py",
+    "intake": ROOT / "apps" / "intake_app.py",
+}
+URL_RE = re.compile(r"""(?:@import\s+url\(|<link[^>]+href=)['"]?([^'")\s>]+)""")
+
+
+def markdown_bodies(at: AppTest):
+    return [m.value for m in at.markdown]
+
+
+def fetch_time(url, timeout):
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as resp:
+            resp.read()
+        status = "ok"
+    except Exception as exc:  # noqa: BLE001 - any failure blocks the page the same way
+        status = type(exc).__name__
+    return time.perf_counter() - start, status
+
+
+def measure(path, timeout):
+    at = AppTest.from_file(str(path), default_timeout=120)
+    start = time.perf_counter()
+    at.run()
+    first = time.perf_counter() - start
+    start = time.perf_counter()
+    at.run()
+    rerun = time.perf_counter() - start
+
+    bodies = markdown_bodies(at)
+    urls = sorted({u for body in bodies for u in URL_RE.findall(body)})
+    external = [u for u in urls if u.startswith(("http://", "https://", "//"))]
+    static = [u.split("?")[0] for u in urls if u.startswith("app/static/")]
+    static_bytes = 0
+    for u in static:
+        f = path.parent / "static" / u[len("app/static/"):]
+        if not f.exists():
+            continue
+        static_bytes += f.stat().st_size
+        if f.suffix == ".css":  # fonts and images the stylesheet pulls in
+            for ref in re.findall(r"url\(([^)]+)\)", f.read_text()):
+                dep = f.parent / ref.strip("'\"")
+                static_bytes += dep.stat().st_size if dep.exists() else 0
+    return {
+        "first_run_ms": first * 1000,
+        "rerun_ms": rerun * 1000,
+        "markdown_kb": sum(len(b.encode()) for b in bodies) / 1024,
+        "external": [(u, *fetch_time(u, timeout)) for u in external],
+        "static_kb": static_bytes / 1024,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--timeout", type=float, default=5.0, help="seconds before an external fetch gives up")
+    args = parser.parse_args(argv)
+
+    for name, path in APPS.items():
+        r = measure(path, args.timeout)
+        print(f"{name:<13} first run {r['first_run_ms']:7.1f} ms  rerun {r['rerun_ms']:6.1f} ms  "
+              f"html/css per rerun {r['markdown_kb']:5.1f} KB  cached static {r['static_kb']:5.1f} KB")
+        for url, seconds, status in r["external"]:
+            print(f"{'':<13} blocking fetch {seconds * 1000:7.1f} ms  {status:<10} {url}")
+
+
+if __name__ == "__main__":
+    main()
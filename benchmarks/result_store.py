@@ -0,0 +1,94 @@
+"""Shared result store: lookup vs. scoring, with several replica processes on one file.
+
+    python benchmarks/result_store.py --replicas 4 --requests 2000
+
+Each replica process draws heart attack patients from a small pool (so
+replicas keep hitting what the others stored), looks them up, and on a
+miss scores and explains them and writes the result back.  Reports hit
+rate, lookup and miss latency per replica, lost writes (none allowed) and
+an eviction pass over the limits.
+"""
+import argparse
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import numpy as np  # noqa: E402
+
+from corvigil.schema import HEART_ATTACK  # noqa: E402
+from corvigil.timing import summarize  # noqa: E402
+
+
+def replica(path, requests, pool, seed):
+    import joblib
+
+    from corvigil.attribution import PatientExplainer
+    from corvigil.batch import risk_zone_codes
+    from corvigil.featcache import FeatureCache
+    from corvigil.results import ResultStore
+    from corvigil.schema import LABELS
+
+    spec = HEART_ATTACK
+    pipeline = joblib.load(spec.model_path)
+    explainer = PatientExplainer.for_model(spec, pipeline)
+    patients = FeatureCache().load(spec).frame("X_test")[list(spec.features)].iloc[:pool]
+    store = ResultStore(path)
+    rng = np.random.default_rng(seed)
+    hits, misses, failed = [], [], 0
+    for i in rng.integers(0, len(patients), requests):
+        X = patients.iloc[[i]]
+        start = time.perf_counter()
+        result = store.get(spec, X)
+        if result is not None:
+            hits.append(time.perf_counter() - start)
+            continue
+        prob = float(pipeline.predict_proba(X)[0, 1])
+        result = {"probability": prob, "risk_zone": LABELS[risk_zone_codes([prob])[0]],
+                  "explanation": explainer.explain_factors(X) if explainer else None}
+        store.put(spec, X, result)
+        misses.append(time.perf_counter() - start)
+        failed += store.get(spec, X) is None
+    return hits, misses, failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--replicas", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=2000, help="per replica")
+    parser.add_argument("--pool", type=int, default=150, help="distinct patients")
+    args = parser.parse_args(argv)
+
+    from corvigil.results import ResultStore
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "results.sqlite"
+        ResultStore(path)
+        start = time.perf_counter()
+        with ProcessPoolExecutor(args.replicas, mp_context=get_context("spawn")) as pool:
+            outs = list(pool.map(replica, [path] * args.replicas, [args.requests] * args.replicas,
+                                 [args.pool] * args.replicas, range(args.replicas)))
+        elapsed = time.perf_counter() - start
+        hits = [t for h, _, _ in outs for t in h]
+        misses = [t for _, m, _ in outs for t in m]
+        failed = sum(f for _, _, f in outs)
+        h, m = summarize(hits), summarize(misses)
+        total = args.replicas * args.requests
+        print(f"{args.replicas} replicas x {args.requests} requests over {args.pool} patients in {elapsed:.1f} s")
+        print(f"  hits   {len(hits):6d} ({len(hits) / total:.1%})  p50 {h['p50_ms']:6.2f} ms  p99 {h['p99_ms']:6.2f} ms")
+        print(f"  misses {len(misses):6d}          p50 {m['p50_ms']:6.2f} ms  p99 {m['p99_ms']:6.2f} ms "
+              "(score + explain + write)")
+        store = ResultStore(path, max_entries=args.pool // 2)
+        stats = store.stats()
+        print(f"  stored {stats['entries']} results ({stats['bytes'] / 1e3:.0f} kB), lost writes {failed}")
+        print(f"  evicted {store.evict()} over max_entries={store.max_entries}, "
+              f"{store.stats()['entries']} left")
+
+
+if __name__ == "__main__":
+    main()
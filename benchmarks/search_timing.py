@@ -0,0 +1,59 @@
+"""Timing breakdown: GridSearchCV vs corvigil.training.fold_cached_search.
+
+    python benchmarks/search_timing.py --model heart_attack
+    python benchmarks/search_timing.py --quick
+
+Both searches run the notebook grid over the same 5 stratified folds on the
+cached training split and must agree on every mean CV score.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sklearn.model_selection import GridSearchCV  # noqa: E402
+
+from corvigil.featcache import FeatureCache  # noqa: E402
+from corvigil.schema import SPECS, get_spec  # noqa: E402
+from corvigil.training import PARAM_GRIDS, fold_cached_search, make_pipeline  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", choices=sorted(SPECS), default="heart_attack")
+    parser.add_argument("--data", help="raw training data (defaults to the model's Data/ file)")
+    parser.add_argument("--n-jobs", type=int, default=1)
+    parser.add_argument("--quick", action="store_true", help="only the first two max_depth values")
+    args = parser.parse_args()
+
+    spec = get_spec(args.model)
+    split = FeatureCache().load(spec, raw_path=args.data)
+    X, y = split.frame("X_train"), np.asarray(split["y_train"])
+    grid = dict(PARAM_GRIDS[spec.name])
+    if args.quick:
+        grid["model__max_depth"] = grid["model__max_depth"][:2]
+
+    start = time.perf_counter()
+    gs = GridSearchCV(make_pipeline(spec), grid, scoring="recall", cv=5, n_jobs=args.n_jobs).fit(X, y)
+    gs_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    fc = fold_cached_search(spec, X, y, grid, cv=5, n_jobs=args.n_jobs)
+    fc_time = time.perf_counter() - start
+
+    n = len(fc.candidates)
+    print(f"{spec.name}: {n} candidates x 5 folds = {n * 5} fits")
+    print(f"GridSearchCV          {gs_time:8.2f} s")
+    print(f"fold_cached_search    {fc_time:8.2f} s  ({gs_time / fc_time:.1f}x)")
+    for step, seconds in fc.timings.items():
+        print(f"  {step:<18}  {seconds:8.2f} s")
+    print("same scores:", np.allclose(gs.cv_results_["mean_test_score"], fc.mean_test_score),
+          "| same best:", gs.best_params_ == fc.best_params_)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""User-facing latency with and without a shadow candidate scoring the same requests.
+
+    python benchmarks/shadow_latency.py --model cardiac --sessions 8 --requests 200
+
+The candidate is the production pipeline plus ``--rounds`` boosting rounds
+fitted on a synthetic batch (:mod:`corvigil.synth`), as
+``python -m corvigil.update`` would build it.  Sessions are threads
+scoring single rows through the app's ``InferenceExecutor``; in the shadow
+run each answered row is also handed to a :class:`ShadowEvaluator`.
+Rounds alternate off/on so both see the same machine state.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import joblib  # noqa: E402
+import numpy as np  # noqa: E402
+
+from corvigil.inference import InferenceExecutor  # noqa: E402
+from corvigil.schema import SPECS, get_spec  # noqa: E402
+from corvigil.shadow import ShadowEvaluator  # noqa: E402
+from corvigil.synth import fit_model, to_table  # noqa: E402
+from corvigil.timing import summarize  # noqa: E402
+from corvigil.update import continue_boosting  # noqa: E402
+
+
+def run_sessions(executor, rows, sessions, requests, shadow=None):
+    latencies = [[] for _ in range(sessions)]
+    barrier = threading.Barrier(sessions)
+
+    def session(i):
+        barrier.wait()
+        for k in range(requests):
+            row = rows[(i * requests + k) % len(rows)]
+            start = time.perf_counter()
+            prob = executor.predict_proba(row)[0, 1]
+            if shadow is not None:
+                shadow.submit(row, prob)
+            latencies[i].append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(sessions)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return np.concatenate(latencies)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", choices=sorted(SPECS), default="cardiac")
+    parser.add_argument("--sessions", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200, help="per session and round")
+    parser.add_argument("--rounds", type=int, default=50, help="extra boosting rounds in the candidate")
+    parser.add_argument("--repeat", type=int, default=2)
+    args = parser.parse_args(argv)
+
+    spec = get_spec(args.model)
+    production = joblib.load(spec.model_path)
+    synth = fit_model(spec)
+    batch = to_table(next(synth.iter_chunks(20_000, seed=11)), spec).to_pandas()
+    candidate = continue_boosting(production, batch[list(spec.features)], batch[spec.target], args.rounds)
+    live = to_table(next(synth.iter_chunks(2_000, seed=12)), spec).to_pandas()[list(spec.features)]
+    rows = [live.iloc[[i]] for i in range(len(live))]
+
+    executor = InferenceExecutor(production, timeout=60)
+    off, on = [], []
+    with tempfile.TemporaryDirectory() as tmp:
+        shadow = ShadowEvaluator(candidate, spec, log_path=Path(tmp) / "shadow.jsonl", report_every=10 ** 9)
+        run_sessions(executor, rows, args.sessions, 20)     # warm-up
+        for _ in range(args.repeat):
+            off.append(run_sessions(executor, rows, args.sessions, args.requests))
+            on.append(run_sessions(executor, rows, args.sessions, args.requests, shadow))
+        shadow.close()
+        summary = shadow.summary()
+    executor.shutdown()
+
+    print(f"{spec.name}: {os.cpu_count()} cores, {args.sessions} sessions x {args.requests} requests "
+          f"x {args.repeat} rounds")
+    for label, samples in (("production only", off), ("with shadow", on)):
+        s = summarize(np.concatenate(samples))
+        print(f"  {label:<16} p50 {s['p50_ms']:6.2f} ms  p99 {s['p99_ms']:6.2f} ms  max {s['max_ms']:7.2f} ms")
+    print(f"  shadow scored {summary['rows']} rows, dropped {summary['dropped']}, "
+          f"same decision at {spec.threshold:.2f}: {summary['agreement']:.1%} "
+          f"({summary['production_only']} production-only, {summary['candidate_only']} candidate-only), "
+          f"mean |delta| {summary['mean_abs_delta']:.4f}, max {summary['max_abs_delta']:.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Training parallelism: every split of the cores vs. the notebooks' oversubscription.
+
+    python benchmarks/training_schedule.py --model heart_attack --quick
+
+Times one fold of the grid's candidate groups under each
+``n_jobs x nthread`` split of the cores and under the notebook setup
+(``n_jobs=-1`` around XGBoost's all-core default, cores x cores threads),
+with the CPU utilisation of each, then runs the full search with
+``n_jobs="auto"`` and shows the plan it picked.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np  # noqa: E402
+from sklearn.model_selection import ParameterGrid  # noqa: E402
+
+from corvigil.featcache import FeatureCache  # noqa: E402
+from corvigil.scheduler import (Plan, available_cores, configurations, grid_shape, plan,  # noqa: E402
+                                run_groups)
+from corvigil.schema import SPECS, get_spec  # noqa: E402
+from corvigil.training import PARAM_GRIDS, _groups, cv_folds, fold_cached_search, prepare_fold  # noqa: E402
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", choices=sorted(SPECS), default="heart_attack")
+    parser.add_argument("--data", help="raw training data (defaults to the model's Data/ file)")
+    parser.add_argument("--quick", action="store_true", help="only the first two max_depth values")
+    args = parser.parse_args(argv)
+
+    spec = get_spec(args.model)
+    split = FeatureCache().load(spec, raw_path=args.data)
+    X, y = split.frame("X_train"), np.asarray(split["y_train"])
+    grid = dict(PARAM_GRIDS[spec.name])
+    if args.quick:
+        grid["model__max_depth"] = grid["model__max_depth"][:2]
+
+    cores = available_cores()
+    rows, depth, tasks = grid_shape(X, grid)
+    candidates = list(ParameterGrid(grid))
+    groups = [[candidates[i] for i in g] for g in _groups(candidates)]
+    train_idx, val_idx = cv_folds(X, y)[0]
+    dtrain, dval, y_val = prepare_fold(spec, X, y, train_idx, val_idx)
+    heuristic = plan(rows, depth, tasks, cores)
+    print(f"{spec.name}: {cores} cores, {rows} rows per fit, max_depth up to {depth}, {tasks} groups per fold; "
+          f"heuristic plan {heuristic.n_jobs} x {heuristic.nthread}")
+
+    setups = [(f"{c.n_jobs} x {c.nthread}", c) for c in configurations(cores, tasks)]
+    setups.append((f"notebook {cores} x {cores}", Plan(cores, cores, "notebook")))
+    print(f"{'setup':<18} {'wall s':>8} {'cpu s':>8} {'cpu util':>8}")
+    for label, c in setups:
+        m = run_groups(groups, dtrain, dval, y_val, c.n_jobs, c.nthread, cores)
+        print(f"{label:<18} {m.wall_s:8.2f} {m.cpu_s:8.2f} {m.utilization:8.0%}")
+
+    start = time.perf_counter()
+    result = fold_cached_search(spec, X, y, grid, refit=False)
+    print(f"fold_cached_search(n_jobs='auto'): {result.plan.n_jobs} x {result.plan.nthread} "
+          f"({result.plan.source}) in {time.perf_counter() - start:.2f} s, "
+          f"CPU utilisation {result.cpu_utilization:.0%}")
+
+
+if __name__ == "__main__":
+    main()
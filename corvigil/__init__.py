@@ -0,0 +1 @@
+"""Shared data, training and serving tooling for the CorVigil screening apps."""
@@ -0,0 +1,34 @@
+"""Metadata stored next to an exported model.
+
+``models/<name>.pkl`` keeps the sklearn pipeline exactly as the notebooks
+export it; anything computed alongside it at training time (reference
+sketches, clip bounds, explanations, ...) lives in ``models/<name>.meta.json``
+under one top-level key per producer.
+"""
+import json
+import os
+from pathlib import Path
+
+
+def meta_path(model_path) -> Path:
+    model_path = Path(model_path)
+    return model_path.with_name(f"{model_path.stem}.meta.json")
+
+
+def load_meta(model_path) -> dict:
+    try:
+        return json.loads(meta_path(model_path).read_text())
+    except FileNotFoundError:
+        return {}
+
+
+def update_meta(model_path, **sections) -> dict:
+    """Replace the given top-level sections (``None`` removes one) and rewrite the sidecar atomically."""
+    meta = load_meta(model_path)
+    meta.update(sections)
+    meta = {k: v for k, v in meta.items() if v is not None}
+    path = meta_path(model_path)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(meta, indent=1))
+    os.replace(tmp, path)
+    return meta
@@ -0,0 +1,205 @@
+"""Build step for the static files the apps serve from ``apps/static/``.
+
+    python -m corvigil.assets build
+    python -m corvigil.assets build --font ~/Downloads/InterVariable.ttf
+
+* ``apps/styles/<app>.css`` are minified and merged into one stylesheet,
+  ``apps/static/corvigil.min.css``.  A rule that several apps share is
+  written once; rules are scoped to the pages that use them, so the apps
+  can keep conflicting definitions of ``.main-header`` and friends.
+* The UI font is subset to Latin text and saved as a local woff2 file, so
+  no page waits on fonts.googleapis.com.  The source is ``--font``, else the
+  first font in ``assets/fonts/``, else the Source Sans variable font that
+  ships inside the Streamlit wheel.
+* Every image in ``assets/`` gets a card-sized thumbnail in
+  ``apps/static/thumbs/`` for the hub.
+
+Static serving is switched on in ``.streamlit/config.toml``; the browser
+fetches the stylesheet and font once and then reuses its cached copy, and
+each rerun only re-sends the short ``<link>`` tag from :func:`stylesheet`.
+"""
+import argparse
+import hashlib
+import re
+from functools import lru_cache
+from pathlib import Path
+
+from corvigil.schema import ROOT
+
+ASSETS_DIR = ROOT / "assets"
+STYLES_DIR = ROOT / "apps" / "styles"
+STATIC_DIR = ROOT / "apps" / "static"
+BUNDLE = STATIC_DIR / "corvigil.min.css"
+FONT_FILE = STATIC_DIR / "fonts" / "corvigil-sans.woff2"
+THUMBS_DIR = STATIC_DIR / "thumbs"
+
+APPS = ("hub", "cardiac", "heart_attack")
+FONT_FAMILY = "CorVigil Sans"
+# Basic Latin, Latin-1, general punctuation (dashes, quotes, bullet, ellipsis), euro
+FONT_UNICODES = "U+0000-00FF,U+2013-2014,U+2018-201D,U+2022,U+2026,U+20AC"
+# cards show a 160px high thumbnail about 400px wide; twice that for high-dpi screens
+THUMB_SIZE = (800, 320)
+
+
+def _squeeze(css: str) -> str:
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css).strip()
+    return re.sub(r"\s*([{}:;,>!])\s*", r"\1", css)
+
+
+def parse_rules(css: str):
+    """Minified ``[(selector, body), ...]`` in source order; ``@media`` blocks stay whole."""
+    css = _squeeze(css)
+    rules, i = [], 0
+    while i < len(css):
+        start = css.index("{", i)
+        selector = css[i:start]
+        depth, j = 1, start + 1
+        while depth:
+            depth += {"{": 1, "}": -1}.get(css[j], 0)
+            j += 1
+        body = css[start + 1:j - 1]
+        if not selector.startswith("@"):
+            # a property set twice in one rule: the last one wins, as in the browser
+            decls = {}
+            for decl in filter(None, body.split(";")):
+                prop = decl.split(":", 1)[0]
+                decls.pop(prop, None)
+                decls[prop] = decl
+            body = ";".join(decls.values())
+        rules.append((selector, body))
+        i = j
+    return rules
+
+
+def _marker(app):
+    return f"cv-{app}"
+
+
+def scope(selector: str, apps, all_apps=APPS) -> str:
+    """Restrict ``selector`` to pages that render the marker of one of ``apps``."""
+    if set(apps) == set(all_apps) or selector.startswith("@"):
+        return selector
+    has = [f":has(.{_marker(a)})" for a in apps]
+    page = "body" + (has[0] if len(has) == 1 else f":is({','.join(has)})")
+    parts = []
+    for part in selector.split(","):
+        if part == "body":
+            parts.append(page)
+        elif part in ("html", ":root"):
+            parts.append(part)
+        else:
+            parts.append(f"{page} {part}")
+    return ",".join(parts)
+
+
+def font_face(font_path=FONT_FILE) -> str:
+    weight = "400"
+    if font_path.exists():
+        from fontTools.ttLib import TTFont
+
+        font = TTFont(font_path)
+        if "fvar" in font:
+            axis = next((a for a in font["fvar"].axes if a.axisTag == "wght"), None)
+            if axis is not None:
+                weight = f"{axis.minValue:g} {axis.maxValue:g}"
+    url = font_path.relative_to(BUNDLE.parent).as_posix()
+    return (f'@font-face{{font-family:"{FONT_FAMILY}";src:url({url}) format("woff2");'
+            f"font-weight:{weight};font-display:swap}}")
+
+
+def build_css(styles_dir=STYLES_DIR, out=BUNDLE):
+    """Merge the per-app sources; returns ``(source_bytes, bundle_bytes)``."""
+    owners, order, source_bytes = {}, [], 0
+    for app in APPS:
+        text = (styles_dir / f"{app}.css").read_text()
+        source_bytes += len(text.encode())
+        for rule in parse_rules(text):
+            if rule not in owners:
+                owners[rule] = []
+                order.append(rule)
+            if app not in owners[rule]:
+                owners[rule].append(app)
+    css = font_face() + "".join(f"{scope(sel, owners[(sel, body)])}{{{body}}}" for sel, body in order)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(css + "\n")
+    return source_bytes, len(css.encode()) + 1
+
+
+def default_font_source():
+    local = sorted(p for ext in ("ttf", "otf", "woff2") for p in (ASSETS_DIR / "fonts").glob(f"*.{ext}"))
+    if local:
+        return local[0]
+    import streamlit
+
+    media = Path(streamlit.__file__).parent / "static" / "static" / "media"
+    return next(media.glob("SourceSansVF-Upright*.woff2"))
+
+
+def build_font(src=None, out=FONT_FILE, unicodes=FONT_UNICODES):
+    """Latin subset of ``src`` as woff2 (needs ``fonttools`` and ``brotli``); returns its size."""
+    from fontTools import subset
+
+    src = Path(src or default_font_source())
+    out.parent.mkdir(parents=True, exist_ok=True)
+    subset.main([str(src), f"--unicodes={unicodes}", "--layout-features=*", "--flavor=woff2",
+                 f"--output-file={out}"])
+    return out.stat().st_size
+
+
+def build_thumbnails(src_dir=ASSETS_DIR, out_dir=THUMBS_DIR, size=THUMB_SIZE):
+    """Centre-cropped JPEG thumbnails; returns ``{name: (source_bytes, thumb_bytes)}``."""
+    from PIL import Image, ImageOps
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    sizes = {}
+    for path in sorted(src_dir.glob("*")):
+        if path.suffix.lower() not in (".jpg", ".jpeg", ".png", ".webp"):
+            continue
+        dst = out_dir / f"{path.stem}.jpg"
+        with Image.open(path) as img:
+            # crop to the card's aspect ratio but never upscale small sources
+            k = min(1.0, img.width / size[0], img.height / size[1])
+            thumb = ImageOps.fit(img.convert("RGB"), (round(size[0] * k), round(size[1] * k)))
+        thumb.save(dst, format="JPEG", quality=82, optimize=True, progressive=True)
+        sizes[path.name] = (path.stat().st_size, dst.stat().st_size)
+    return sizes
+
+
+def thumbnail_url(name: str) -> str:
+    return f"app/static/thumbs/{Path(name).stem}.jpg"
+
+
+@lru_cache(maxsize=None)
+def stylesheet(app: str, static_serving: bool = True) -> str:
+    """Markup an app puts at the top of every run to pick up the shared stylesheet.
+
+    Without static serving the minified bundle is inlined instead (the local
+    font is then unavailable and the system sans-serif is used).
+    """
+    marker = f'<span class="{_marker(app)}"></span>'
+    css = BUNDLE.read_text()
+    if static_serving:
+        version = hashlib.sha256(css.encode()).hexdigest()[:10]
+        return f'<link rel="stylesheet" href="app/static/{BUNDLE.name}?v={version}">{marker}'
+    return f"<style>{css}</style>{marker}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the apps' static files")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="font subset, CSS bundle and thumbnails")
+    build.add_argument("--font", help="TTF/OTF/woff2 to subset (default: assets/fonts/ or Streamlit's Source Sans)")
+    build.add_argument("--skip-font", action="store_true", help="keep the existing font file")
+    args = parser.parse_args(argv)
+
+    if not args.skip_font:
+        print(f"font   {build_font(args.font) / 1024:6.1f} KB -> {FONT_FILE.relative_to(ROOT)}")
+    source, bundle = build_css()
+    print(f"css    {source / 1024:6.1f} KB of sources -> {bundle / 1024:.1f} KB {BUNDLE.relative_to(ROOT)}")
+    for name, (before, after) in build_thumbnails().items():
+        print(f"thumb  {name:<24} {before / 1024:6.1f} KB -> {after / 1024:.1f} KB")
+
+
+if __name__ == "__main__":
+    main()
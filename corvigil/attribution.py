@@ -0,0 +1,229 @@
+"""Per-patient explanations in the pipeline's input columns, against a stored background.
+
+Interventional TreeSHAP attributes ``predict_proba`` to each input column
+by swapping the patient's values into rows of a background set.  The
+preprocessor is a per-column map (``RobustScaler`` on the measurements,
+passthrough on the flags), so the contributions the explainer computes on
+the transformed columns are exactly those of the pipeline's input columns
+-- age in the model's units, not its scaled value.  In ``log_odds`` they
+are exact Shapley values of the margin; in ``probability`` (what the apps
+show) shap rescales each background row's log-odds contributions to the
+sigmoid, so they add up to the probability minus the background average.
+
+The background is computed once at training time and stored in the model
+sidecar (``models/<name>.meta.json``, key ``background``):
+
+* ``kmeans`` (default) clusters the preprocessed training rows and keeps,
+  per cluster, the real row nearest the centre, with a repeat count
+  proportional to the cluster's size (TreeSHAP takes no weights, so the
+  ``BACKGROUND_ROWS`` rows it sees are the medoids repeated);
+* ``stratified`` samples ``BACKGROUND_ROWS`` training rows in proportion
+  to every (label, risk zone) stratum.
+
+The repo ships no cardiac training data; ``--synthetic`` draws the rows to
+summarise from :mod:`corvigil.synth` instead.  The background records its
+``source`` and the apps say when they explain against simulated patients.
+
+    python -m corvigil.attribution fit heart_attack
+    python -m corvigil.attribution fit cardiac --synthetic 50000
+    python -m corvigil.attribution show heart_attack
+"""
+import argparse
+import json
+
+import numpy as np
+import pandas as pd
+
+from corvigil.artifacts import load_meta, update_meta
+from corvigil.explain import clinical_factors, feature_names
+from corvigil.schema import SPECS, get_spec
+
+BACKGROUND_ROWS = 100
+DEFAULT_CLUSTERS = 32
+
+
+def _allocate(weights, total) -> np.ndarray:
+    """Integer counts proportional to ``weights`` summing to ``total`` (at least one each while ``total`` allows)."""
+    share = np.asarray(weights, dtype=float) / np.sum(weights) * total
+    counts = np.maximum(np.floor(share).astype(int), 1)
+    short = total - counts.sum()
+    if short > 0:
+        counts[np.argsort(counts - share, kind="stable")[:short]] += 1
+    for _ in range(-short):             # the ones raised to 1 overshot: take it back from the largest
+        counts[np.argmax(counts)] -= 1
+    return counts
+
+
+def build_background(pipeline, spec, X: pd.DataFrame, y=None, method="kmeans", clusters=DEFAULT_CLUSTERS,
+                     rows=BACKGROUND_ROWS, seed=0) -> dict:
+    """A compact summary of ``X`` (model-ready rows) for :class:`PatientExplainer`."""
+    X = X[list(spec.features)].astype(float).reset_index(drop=True)
+    if method == "kmeans":
+        from sklearn.cluster import KMeans
+
+        Xt = np.asarray(pipeline[0].transform(X), dtype=np.float64)
+        km = KMeans(n_clusters=min(clusters, len(X)), n_init=4, random_state=seed).fit(Xt)
+        picked, sizes = [], []
+        for c, centre in enumerate(km.cluster_centers_):
+            members = np.flatnonzero(km.labels_ == c)
+            picked.append(members[np.argmin(((Xt[members] - centre) ** 2).sum(axis=1))])
+            sizes.append(len(members))
+        counts = _allocate(sizes, rows)
+    elif method == "stratified":
+        from corvigil.batch import risk_zone_codes
+
+        strata = risk_zone_codes(pipeline.predict_proba(X)[:, 1]) * 2
+        if y is not None:
+            strata = strata + np.asarray(y, dtype=int)
+        rng = np.random.default_rng(seed)
+        codes, sizes = np.unique(strata, return_counts=True)
+        picked = []
+        for code, n in zip(codes, _allocate(sizes, min(rows, len(X)))):
+            members = np.flatnonzero(strata == code)
+            picked.extend(rng.choice(members, size=min(n, len(members)), replace=False))
+        counts = np.ones(len(picked), dtype=int)
+    else:
+        raise ValueError(f"unknown background method {method!r}")
+    return {
+        "method": method,
+        "source_rows": int(len(X)),
+        "columns": list(spec.features),
+        "rows": X.iloc[picked].round(6).to_numpy().tolist(),
+        "counts": [int(c) for c in counts],
+    }
+
+
+def load_background(spec, meta=None):
+    """The stored background of ``spec``'s model (or in ``meta``), or ``None`` if ``fit`` was never run."""
+    return (load_meta(spec.model_path) if meta is None else meta).get("background")
+
+
+def reference_population(background) -> str:
+    """What an explanation over ``background`` is measured against, worded for the apps."""
+    if background.get("source") == "synthetic":
+        return "a synthetic reference population (simulated patients, not real training data)"
+    return "the training population"
+
+
+class PatientExplainer:
+    """Interventional TreeSHAP of a fitted pipeline over a stored background.
+
+    ``output`` is ``"probability"`` or ``"log_odds"``.
+    """
+
+    def __init__(self, pipeline, spec, background: dict, output="probability"):
+        import shap
+
+        self.pipeline = pipeline
+        self.spec = spec
+        frame = pd.DataFrame(background["rows"], columns=background["columns"])[list(spec.features)]
+        data = np.repeat(np.asarray(pipeline[0].transform(frame), dtype=np.float64),
+                         background["counts"], axis=0)
+        self._explainer = shap.TreeExplainer(pipeline[-1], data=data, feature_perturbation="interventional",
+                                             model_output={"probability": "probability", "log_odds": "raw"}[output])
+        self.output = output
+        # mean output over the background: a probability or a log-odds, as ``output``
+        self.base_value = float(np.ravel(self._explainer.expected_value)[0])
+        # "training split", or "synthetic" for rows drawn from corvigil.synth (``fit --synthetic``)
+        self.source = background.get("source", "training split")
+        self.reference = reference_population(background)
+        self._names = feature_names(pipeline)
+        self.factors = clinical_factors(spec)
+
+    @classmethod
+    def for_model(cls, spec, pipeline=None, output="probability", meta=None):
+        """Explainer for ``spec``'s exported model, or ``None`` without a stored background."""
+        background = load_background(spec, meta)
+        if background is None:
+            return None
+        if pipeline is None:
+            import joblib
+
+            pipeline = joblib.load(spec.model_path)
+        return cls(pipeline, spec, background, output)
+
+    def explain(self, X: pd.DataFrame) -> pd.DataFrame:
+        """Contribution of every input column to each row's output (rows sum to it minus ``base_value``)."""
+        X = X[list(self.spec.features)].astype(float)
+        values = self._explainer.shap_values(np.asarray(self.pipeline[0].transform(X), dtype=np.float64))
+        return pd.DataFrame(values, columns=self._names, index=X.index)[list(self.spec.features)]
+
+    def explain_factors(self, X_row) -> list:
+        """One patient's contributions per clinical factor (one-hot groups summed), largest first.
+
+        ``X_row`` is the model-ready feature row (dict or one-row DataFrame).
+        """
+        frame = pd.DataFrame([X_row]) if isinstance(X_row, dict) else X_row.iloc[:1]
+        contrib = self.explain(frame).iloc[0]
+        row = frame.iloc[0]
+        out = [{"factor": factor, "impact": float(contrib[members].sum()),
+                "value": float(row[members[0]]) if len(members) == 1 else None}
+               for factor, members in self.factors.items()]
+        return sorted(out, key=lambda f: abs(f["impact"]), reverse=True)
+
+
+def training_rows(spec, data=None, synthetic=None, seed=0):
+    """``(X, y)`` a background is fitted on: the training split, or ``synthetic`` corvigil.synth patients.
+
+    Without ``data`` or the model's ``Data/`` file the most recent cached split is used.
+    """
+    if synthetic:
+        from corvigil.synth import fit_model, to_table
+
+        chunk = next(fit_model(spec).iter_chunks(synthetic, chunk_rows=synthetic, seed=seed))
+        frame = to_table(chunk, spec).to_pandas()
+        return frame[list(spec.features)], frame[spec.target].to_numpy()
+    from corvigil.featcache import FeatureCache
+
+    cache = FeatureCache()
+    split = cache.load(spec, raw_path=data) if data or spec.data_path.exists() else cache.latest(spec)
+    if split is None:
+        raise FileNotFoundError(spec.data_path)
+    return split.frame("X_train"), np.asarray(split["y_train"])
+
+
+def main(argv=None):
+    import joblib
+
+    parser = argparse.ArgumentParser(description="Fit or show the stored explanation background")
+    sub = parser.add_subparsers(dest="command", required=True)
+    fit = sub.add_parser("fit", help="summarise the training split and store it in the model sidecar")
+    fit.add_argument("model", choices=sorted(SPECS))
+    fit.add_argument("--method", choices=["kmeans", "stratified"], default="kmeans")
+    fit.add_argument("--clusters", type=int, default=DEFAULT_CLUSTERS)
+    fit.add_argument("--rows", type=int, default=BACKGROUND_ROWS, help="background rows the explainer sees")
+    source = fit.add_mutually_exclusive_group()
+    source.add_argument("--data", help="raw training data (defaults to the model's Data/ file)")
+    source.add_argument("--synthetic", type=int, help="summarise this many corvigil.synth patients instead")
+    show = sub.add_parser("show", help="print the stored background and explain one patient")
+    show.add_argument("model", choices=sorted(SPECS))
+    show.add_argument("patient", nargs="?", help="JSON object of model-ready features")
+    args = parser.parse_args(argv)
+
+    spec = get_spec(args.model)
+    pipeline = joblib.load(spec.model_path)
+    if args.command == "fit":
+        X, y = training_rows(spec, args.data, args.synthetic)
+        background = build_background(pipeline, spec, X, y, args.method, args.clusters, args.rows)
+        background["source"] = "synthetic" if args.synthetic else "training split"
+        update_meta(spec.model_path, background=background)
+        print(f"Stored a {args.method} background of {len(background['rows'])} rows "
+              f"({sum(background['counts'])} weighted) from {background['source_rows']} {background['source']} rows")
+        return
+
+    background = load_background(spec)
+    if background is None:
+        parser.error(f"{spec.name} has no stored background, run 'fit' first")
+    explainer = PatientExplainer(pipeline, spec, background)
+    print(f"{background['method']} background, {len(background['rows'])} rows from "
+          f"{background['source_rows']} {background.get('source', 'training split')} rows; "
+          f"base probability {explainer.base_value:.3f}")
+    if args.patient:
+        row = json.loads(args.patient)
+        print(f"probability {pipeline.predict_proba(pd.DataFrame([row])[list(spec.features)])[0, 1]:.3f}")
+        for f in explainer.explain_factors(row):
+            print(f"  {f['factor']:<18} {f['impact']:+.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Batch scoring of CSV / Parquet files with the exported pipelines.
+
+    python -m corvigil.batch heart_attack patients.parquet -o scored.parquet
+    python -m corvigil.batch heart_attack patients.parquet -o scored.parquet --cube cohorts.npz
+
+``--cube`` also adds every scored chunk to a cohort count cube (see
+``corvigil.cohorts``), extending the file if it already exists.
+"""
+import argparse
+import os
+
+import joblib
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from corvigil.cohorts import CohortCube
+from corvigil.datasets import as_frame, iter_feature_batches
+from corvigil.schema import BINS, LABELS, SPECS, get_spec
+
+
+def risk_zone_codes(prob: np.ndarray) -> np.ndarray:
+    """Vectorised ``pd.cut(prob, BINS, labels=LABELS, include_lowest=True)`` codes."""
+    return np.clip(np.searchsorted(BINS, prob, side="left") - 1, 0, len(LABELS) - 1).astype(np.int8)
+
+
+def clip_matrix(X: np.ndarray, spec, bounds) -> np.ndarray:
+    """``X`` (columns in ``spec.features`` order) clipped to ``bounds`` like :func:`corvigil.preprocess.apply_clip`."""
+    if not bounds:
+        return X
+    X = np.array(X, dtype=np.float64)      # a copy: Arrow chunks can be read-only views
+    index = {c: j for j, c in enumerate(spec.features)}
+    for col, (lower, upper) in bounds.items():
+        np.clip(X[:, index[col]], lower, upper, out=X[:, index[col]])
+    return X
+
+
+def score_batches(src, spec, model=None, batch_rows=65_536, bounds=None):
+    """Yield ``(X, prob)`` for each streamed chunk of ``src``.
+
+    Rows are clipped to ``bounds`` (default: the model's serving bounds)
+    before scoring, as the apps do, and ``X`` is the clipped chunk.
+    """
+    from corvigil.cleaning import serving_bounds
+
+    model = model if model is not None else joblib.load(spec.model_path)
+    bounds = serving_bounds(spec) if bounds is None else bounds
+    for X, _ in iter_feature_batches(src, spec, batch_rows=batch_rows, dtype=np.float64):
+        X = clip_matrix(X, spec, bounds)
+        yield X, model.predict_proba(as_frame(X, spec.features))[:, 1]
+
+
+def score_file(src, dst, spec, model=None, batch_rows=65_536, cube=None):
+    """Score ``src`` chunk by chunk and write probability, decision and risk zone to Parquet.
+
+    Each chunk is also added to ``cube`` (a ``CohortCube``) when one is given.
+    """
+    zone_type = pa.dictionary(pa.int8(), pa.string())
+    schema = pa.schema([
+        ("probability", pa.float32()),
+        ("screening_prediction", pa.int8()),
+        ("risk_zone", zone_type),
+    ])
+    labels = pa.array(LABELS)
+    rows = 0
+    with pq.ParquetWriter(dst, schema) as writer:
+        for X, prob in score_batches(src, spec, model, batch_rows):
+            codes = risk_zone_codes(prob)
+            if cube is not None:
+                cube.update(as_frame(X, spec.features), prob, codes)
+            zones = pa.DictionaryArray.from_arrays(pa.array(codes), labels)
+            writer.write_table(pa.table({
+                "probability": pa.array(prob.astype(np.float32)),
+                "screening_prediction": pa.array((prob >= spec.threshold).astype(np.int8)),
+                "risk_zone": zones,
+            }, schema=schema))
+            rows += len(prob)
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a CSV or Parquet file of patients")
+    parser.add_argument("model", choices=sorted(SPECS))
+    parser.add_argument("src")
+    parser.add_argument("-o", "--output", required=True, help="Parquet file for the scores")
+    parser.add_argument("--batch-rows", type=int, default=65_536)
+    parser.add_argument("--cube", help="cohort cube (.npz) to create or extend with these patients")
+    args = parser.parse_args(argv)
+
+    spec = get_spec(args.model)
+    cube = None
+    if args.cube:
+        cube = CohortCube.load(args.cube) if os.path.exists(args.cube) else CohortCube(spec.name)
+    rows = score_file(args.src, args.output, spec, batch_rows=args.batch_rows, cube=cube)
+    print(f"Scored {rows} rows -> {args.output}")
+    if cube is not None:
+        cube.save(args.cube)
+        print(f"Cohort cube now covers {cube.rows} patients -> {args.cube}")
+
+
+if __name__ == "__main__":
+    main()
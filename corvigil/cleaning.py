@@ -0,0 +1,175 @@
+"""Streaming version of the notebook cleaning stage.
+
+The cardiac notebook clips ``ap_hi``/``height``/``weight`` at their 1st/99th
+percentiles and ``ap_lo`` at 1st/98th with exact ``quantile`` calls on a
+fully loaded frame.  Here the bounds come from one streaming pass that feeds
+a mergeable :class:`QuantileSketch` per column (chunks can be sketched in
+parallel and merged), and a second streaming pass encodes, clips and writes
+the model-ready Parquet file.
+
+    python -m corvigil.cleaning cardiac raw.csv -o cleaned.parquet --store-bounds
+
+``--store-bounds`` saves the bounds in the model sidecar so the app clips
+incoming values exactly as training did.
+"""
+import argparse
+import math
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from corvigil.artifacts import load_meta, update_meta
+from corvigil.datasets import column_names, iter_tables
+from corvigil.preprocess import CARDIAC_CLIP, apply_clip, default_params, encode_cardiac
+from corvigil.schema import SPECS, get_spec
+
+RELATIVE_ACCURACY = 0.005
+
+
+class QuantileSketch:
+    """Log-bucketed quantile sketch (DDSketch) with bounded relative error.
+
+    Every value lands in bucket ``ceil(log_gamma |x|)`` on its sign's side, so
+    a quantile is returned within ``relative_accuracy`` of an exact value of
+    the data, memory grows with the log of the value range rather than the
+    row count, and two sketches merge by adding bucket counts.
+    """
+
+    def __init__(self, relative_accuracy=RELATIVE_ACCURACY):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.positive = {}
+        self.negative = {}
+        self.zeros = 0
+        self.count = 0
+
+    def add(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        self.count += values.size
+        self.zeros += int(np.count_nonzero(values == 0))
+        for store, part in ((self.positive, values[values > 0]), (self.negative, -values[values < 0])):
+            if part.size:
+                keys, counts = np.unique(np.ceil(np.log(part) / self._log_gamma).astype(np.int64),
+                                         return_counts=True)
+                for k, c in zip(keys.tolist(), counts.tolist()):
+                    store[k] = store.get(k, 0) + c
+        return self
+
+    def merge(self, other: "QuantileSketch"):
+        if other.gamma != self.gamma:
+            raise ValueError("cannot merge sketches with different accuracy")
+        for mine, theirs in ((self.positive, other.positive), (self.negative, other.negative)):
+            for k, c in theirs.items():
+                mine[k] = mine.get(k, 0) + c
+        self.zeros += other.zeros
+        self.count += other.count
+        return self
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return float("nan")
+        rank = q * (self.count - 1)
+        seen = 0
+        for k in sorted(self.negative, reverse=True):
+            seen += self.negative[k]
+            if seen > rank:
+                return -self._value(k)
+        seen += self.zeros
+        if seen > rank:
+            return 0.0
+        for k in sorted(self.positive):
+            seen += self.positive[k]
+            if seen > rank:
+                return self._value(k)
+        return self._value(max(self.positive))
+
+    def _value(self, key) -> float:
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+
+def _sketch_table(table, columns, relative_accuracy):
+    return {c: QuantileSketch(relative_accuracy).add(table.column(c).to_numpy()) for c in columns}
+
+
+def sketch_columns(path, columns, batch_rows=262_144, workers=1, relative_accuracy=RELATIVE_ACCURACY):
+    """One streaming pass over ``path``; returns a merged sketch per column."""
+    columns = list(columns)
+    workers = max(1, workers)
+    merged = {c: QuantileSketch(relative_accuracy) for c in columns}
+
+    def merge(partial):
+        for c in columns:
+            merged[c].merge(partial[c])
+
+    # at most two chunks per worker are held in memory at once
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for table in iter_tables(path, columns, batch_rows):
+            pending.append(pool.submit(_sketch_table, table, columns, relative_accuracy))
+            if len(pending) >= 2 * workers:
+                merge(pending.popleft().result())
+        while pending:
+            merge(pending.popleft().result())
+    return merged
+
+
+def sketch_bounds(path, clip=CARDIAC_CLIP, **kwargs) -> dict:
+    """Approximate ``{column: (lower, upper)}`` clip bounds for a raw data file."""
+    sketches = sketch_columns(path, clip, **kwargs)
+    return {c: (sketches[c].quantile(lo), sketches[c].quantile(hi)) for c, (lo, hi) in clip.items()}
+
+
+def clean_file(src, dst, spec, bounds, batch_rows=262_144):
+    """Second pass: encode, clip and write the model-ready features and label to Parquet."""
+    names = column_names(src)
+    wanted = [c for c in names if c not in spec.drop_cols]
+    schema = pa.schema([pa.field(c, pa.float64(), nullable=False) for c in spec.features]
+                       + [pa.field(spec.target, pa.int8(), nullable=False)])
+    rows = 0
+    with pq.ParquetWriter(dst, schema, compression="zstd") as writer:
+        for table in iter_tables(src, wanted, batch_rows):
+            df = table.to_pandas()
+            if spec.name == "cardiac":
+                df = encode_cardiac(df)
+            df = apply_clip(df, bounds)
+            out = {c: pa.array(df[c].to_numpy(dtype=np.float64)) for c in spec.features}
+            out[spec.target] = pa.array(df[spec.target].to_numpy(dtype=np.int8))
+            writer.write_table(pa.table(out, schema=schema))
+            rows += len(df)
+    return rows
+
+
+def serving_bounds(spec, meta=None) -> dict:
+    """Clip bounds stored with the model (or in ``meta``, its sidecar), ``{}`` if it was trained without them."""
+    meta = load_meta(spec.model_path) if meta is None else meta
+    return {c: tuple(b) for c, b in meta.get("clip_bounds", {}).items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compute clip bounds and write a cleaned dataset")
+    parser.add_argument("model", choices=sorted(SPECS))
+    parser.add_argument("src", help="raw CSV/Parquet training data")
+    parser.add_argument("-o", "--output", help="cleaned Parquet output (skip to only compute bounds)")
+    parser.add_argument("--workers", type=int, default=1, help="threads sketching chunks in parallel")
+    parser.add_argument("--store-bounds", action="store_true", help="save the bounds in the model sidecar")
+    args = parser.parse_args(argv)
+
+    spec = get_spec(args.model)
+    clip = default_params(spec)["clip"]
+    bounds = sketch_bounds(args.src, clip, workers=args.workers) if clip else {}
+    for col, (lower, upper) in bounds.items():
+        print(f"{col:<8} [{lower:.3f}, {upper:.3f}]")
+    if args.store_bounds:
+        update_meta(spec.model_path, clip_bounds=bounds)
+    if args.output:
+        rows = clean_file(args.src, args.output, spec, bounds)
+        print(f"Wrote {rows} cleaned rows -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""Risk-zone counts per cohort, kept as a dense count cube.
+
+Every scored patient falls in one cell of ``risk zone × dimension codes``
+(age band, sex, smoking, chest-pain type, ...; see ``DIMENSIONS``).  The
+cube holds the patient count and the summed probability of every cell, so
+a scored chunk is added with one ``bincount`` and any filter or drill-down
+is a slice and a sum over a few thousand cells, however many patients were
+scored.
+
+    python -m corvigil.cohorts build heart_attack patients.parquet -o cohorts.npz
+    python -m corvigil.cohorts show cohorts.npz --by age_band sex --where exercise_angina=Yes
+
+``corvigil.batch`` can maintain a cube while it scores (``--cube``), and
+``apps/cohort_dashboard.py`` browses one.
+"""
+import argparse
+import json
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from corvigil.schema import LABELS, SPECS, get_spec
+
+AGE_EDGES = [30, 40, 50, 60, 70, 80]
+AGE_BANDS = ["<30", "30-39", "40-49", "50-59", "60-69", "70-79", "80+"]
+NO_YES = ["No", "Yes"]
+
+
+@dataclass(frozen=True)
+class Dimension:
+    name: str
+    labels: tuple
+    encode: object     # model-ready feature frame -> integer codes into ``labels``
+
+
+def _flag(col):
+    return lambda X: X[col].to_numpy() > 0.5
+
+
+def _onehot(*members):
+    # code 0 is the implicit category (all members 0), member i is code i + 1
+    return lambda X: sum((i + 1) * (X[m].to_numpy() > 0.5) for i, m in enumerate(members))
+
+
+DIMENSIONS = {
+    "cardiac": (
+        # the cardiac pipeline takes age in years / 100, as the app sends it
+        Dimension("age_band", tuple(AGE_BANDS), lambda X: np.digitize(X["age"].to_numpy() * 100, AGE_EDGES)),
+        Dimension("gender", ("Female", "Male"), _flag("gender")),
+        Dimension("cholesterol", ("Normal", "Above Normal", "Well Above Normal"),
+                  lambda X: np.rint(X["cholesterol"].to_numpy() * 2)),
+        Dimension("glucose", ("Normal", "Above Normal", "Well Above Normal"), lambda X: X["gluc"].to_numpy() - 1),
+        Dimension("smoking", tuple(NO_YES), _flag("smoke")),
+        Dimension("alcohol", tuple(NO_YES), _flag("alco")),
+        Dimension("active", tuple(NO_YES), _flag("active")),
+    ),
+    "heart_attack": (
+        Dimension("age_band", tuple(AGE_BANDS), lambda X: np.digitize(X["Age"].to_numpy(), AGE_EDGES)),
+        Dimension("sex", ("Female", "Male"), _flag("Sex_M")),
+        Dimension("chest_pain", ("ASY", "ATA", "NAP", "TA"),
+                  _onehot("ChestPainType_ATA", "ChestPainType_NAP", "ChestPainType_TA")),
+        Dimension("fasting_bs", tuple(NO_YES), _flag("FastingBS")),
+        Dimension("exercise_angina", tuple(NO_YES), _flag("ExerciseAngina_Y")),
+        Dimension("resting_ecg", ("LVH", "Normal", "ST"), _onehot("RestingECG_Normal", "RestingECG_ST")),
+        Dimension("st_slope", ("Down", "Flat", "Up"), _onehot("ST_Slope_Flat", "ST_Slope_Up")),
+    ),
+}
+
+
+class CohortCube:
+    """Patient counts and probability sums over ``risk zone × dimensions``."""
+
+    def __init__(self, model: str):
+        self.model = model
+        self.dims = DIMENSIONS[model]
+        self.shape = (len(LABELS),) + tuple(len(d.labels) for d in self.dims)
+        self.counts = np.zeros(self.shape, dtype=np.int64)
+        self.prob_sum = np.zeros(self.shape, dtype=np.float64)
+
+    @property
+    def dim_names(self):
+        return [d.name for d in self.dims]
+
+    @property
+    def rows(self) -> int:
+        return int(self.counts.sum())
+
+    def update(self, X: pd.DataFrame, prob, zones):
+        """Add a scored chunk: model-ready features, probabilities and risk-zone codes."""
+        codes = [np.asarray(zones, dtype=np.intp)]
+        for d in self.dims:
+            codes.append(np.clip(np.asarray(d.encode(X), dtype=np.intp), 0, len(d.labels) - 1))
+        flat = np.ravel_multi_index(codes, self.shape)
+        size = self.counts.size
+        self.counts += np.bincount(flat, minlength=size).reshape(self.shape)
+        self.prob_sum += np.bincount(flat, weights=np.asarray(prob, dtype=np.float64),
+                                     minlength=size).reshape(self.shape)
+        return self
+
+    def merge(self, other: "CohortCube"):
+        if other.model != self.model:
+            raise ValueError(f"cannot merge a {other.model} cube into a {self.model} cube")
+        self.counts += other.counts
+        self.prob_sum += other.prob_sum
+        return self
+
+    def _select(self, where):
+        index = [slice(None)]
+        for d in self.dims:
+            wanted = (where or {}).get(d.name)
+            if wanted is None:
+                index.append(slice(None))
+            else:
+                unknown = set(wanted) - set(d.labels)
+                if unknown:
+                    raise ValueError(f"unknown {d.name} values {sorted(unknown)}, expected {list(d.labels)}")
+                index.append(sorted(d.labels.index(v) for v in set(wanted)))
+        counts, prob_sum = self.counts, self.prob_sum
+        # one axis at a time: numpy would broadcast several index lists together
+        for axis, idx in enumerate(index):
+            if not isinstance(idx, slice):
+                counts = np.take(counts, idx, axis=axis)
+                prob_sum = np.take(prob_sum, idx, axis=axis)
+        return counts, prob_sum
+
+    def query(self, by=(), where=None) -> pd.DataFrame:
+        """Risk-zone counts and mean probability per cohort.
+
+        ``by`` names the dimensions to break down by (none: one overall
+        row); ``where`` keeps only ``{dimension: [labels, ...]}``.
+        """
+        by = list(by)
+        for name in by:
+            if name not in self.dim_names:
+                raise ValueError(f"unknown dimension '{name}', expected one of {self.dim_names}")
+        counts, prob_sum = self._select(where)
+        axes = [1 + self.dim_names.index(n) for n in by]
+        drop = tuple(a for a in range(1, counts.ndim) if a not in axes)
+        remaining = [0] + sorted(axes)
+        # zones first, then the ``by`` dimensions in the order they were asked for
+        order = [remaining.index(a) for a in [0] + axes]
+        counts = counts.sum(axis=drop).transpose(order).reshape(len(LABELS), -1).T
+        prob_sum = prob_sum.sum(axis=drop).transpose(order).reshape(len(LABELS), -1).T
+
+        wanted = {d.name: (where or {}).get(d.name, d.labels) for d in self.dims}
+        labels = [[v for v in self.dims[self.dim_names.index(n)].labels if v in wanted[n]] for n in by]
+        if len(by) > 1:
+            index = pd.MultiIndex.from_product(labels, names=by)
+        else:
+            index = pd.Index(labels[0], name=by[0]) if by else pd.Index(["All"], name="cohort")
+        table = pd.DataFrame(counts, index=index, columns=LABELS)
+        patients = counts.sum(axis=1)
+        table.insert(0, "patients", patients)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            table["mean_probability"] = prob_sum.sum(axis=1) / patients
+        return table[table["patients"] > 0]
+
+    def shares(self, by=(), where=None) -> pd.DataFrame:
+        """Like :meth:`query`, with each zone as a fraction of the cohort."""
+        table = self.query(by, where)
+        out = table[LABELS].div(table["patients"], axis=0)
+        out.insert(0, "patients", table["patients"])
+        return out
+
+    def save(self, path):
+        meta = {"model": self.model, "dims": {d.name: list(d.labels) for d in self.dims}, "zones": LABELS}
+        np.savez_compressed(path, counts=self.counts, prob_sum=self.prob_sum, meta=json.dumps(meta))
+
+    @classmethod
+    def load(cls, path) -> "CohortCube":
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            cube = cls(meta["model"])
+            if meta["dims"] != {d.name: list(d.labels) for d in cube.dims} or meta["zones"] != LABELS:
+                raise ValueError(f"{path} was built with different cohort dimensions; rebuild it")
+            cube.counts = data["counts"]
+            cube.prob_sum = data["prob_sum"]
+        return cube
+
+
+def build_cube(src, spec, model=None, batch_rows=65_536) -> CohortCube:
+    """Score ``src`` chunk by chunk and add every chunk to a new cube."""
+    from corvigil.batch import risk_zone_codes, score_batches
+    from corvigil.datasets import as_frame
+
+    cube = CohortCube(spec.name)
+    for X, prob in score_batches(src, spec, model, batch_rows):
+        cube.update(as_frame(X, spec.features), prob, risk_zone_codes(prob))
+    return cube
+
+
+def _parse_where(items):
+    where = {}
+    for item in items or ():
+        name, _, values = item.partition("=")
+        where[name] = values.split(",")
+    return where
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or query a cohort count cube")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="score a patient file into a cube")
+    build.add_argument("model", choices=sorted(SPECS))
+    build.add_argument("src")
+    build.add_argument("-o", "--output", required=True, help=".npz file for the cube")
+    show = sub.add_parser("show", help="print risk-zone shares per cohort")
+    show.add_argument("cube")
+    show.add_argument("--by", nargs="*", default=[])
+    show.add_argument("--where", nargs="*", metavar="DIM=V1,V2", help="keep only these values")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        cube = build_cube(args.src, get_spec(args.model))
+        cube.save(args.output)
+        print(f"{cube.rows} patients -> {args.output} ({cube.counts.size} cells)")
+    else:
+        cube = CohortCube.load(args.cube)
+        with pd.option_context("display.width", 200, "display.max_rows", 200):
+            print(cube.shares(args.by, _parse_where(args.where)).round(3))
+
+
+if __name__ == "__main__":
+    main()
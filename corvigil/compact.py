@@ -0,0 +1,173 @@
+"""Build smaller variants of an exported pipeline and compare them.
+
+    python -m corvigil.compact heart_attack
+    python -m corvigil.compact heart_attack --export truncate-50% -o models/heart_attack_small.pkl
+    python -m corvigil.compact cardiac --data path/to/cardiac_failure_processed.csv --export auto
+
+Three kinds of variant are produced from the trained booster:
+
+* ``truncate-N%``  keeps the first N% of the boosting rounds,
+* ``prune-N%``     keeps the N% of trees with the largest total split gain,
+* ``distill-dD``   a depth-D booster trained on the production model's
+                   probabilities for the training split.
+
+Each variant is reported with recall at the model's production threshold,
+ROC-AUC on the held-out split, pickled artifact size and single-row p99
+latency through the full pipeline.  ``--export auto`` picks the fastest
+variant whose recall and ROC-AUC are within ``--tolerance`` of the original.
+"""
+import argparse
+import copy
+import io
+import json
+
+import joblib
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.metrics import recall_score, roc_auc_score
+from xgboost import XGBClassifier
+
+from corvigil.featcache import FeatureCache
+from corvigil.schema import SPECS, get_spec
+from corvigil.timing import summarize, time_calls
+
+KEEP_FRACTIONS = (0.25, 0.5, 0.75)
+DISTILL_DEPTHS = (2, 3)
+
+
+def with_booster(pipeline, booster):
+    """Copy of ``pipeline`` whose final XGBClassifier runs ``booster``."""
+    clf = pipeline[-1]
+    params = clf.get_params()
+    params["n_estimators"] = booster.num_boosted_rounds()
+    new_clf = XGBClassifier(**params)
+    new_clf.load_model(bytearray(booster.save_raw("json")))
+    new = copy.deepcopy(pipeline)
+    new.steps[-1] = (pipeline.steps[-1][0], new_clf)
+    return new
+
+
+def truncate(pipeline, keep: float):
+    booster = pipeline[-1].get_booster()
+    rounds = max(1, int(round(booster.num_boosted_rounds() * keep)))
+    return with_booster(pipeline, booster[:rounds])
+
+
+def tree_gains(booster) -> np.ndarray:
+    trees = json.loads(booster.save_raw("json"))["learner"]["gradient_booster"]["model"]["trees"]
+    gains = np.empty(len(trees))
+    for i, tree in enumerate(trees):
+        internal = np.asarray(tree["left_children"]) != -1
+        gains[i] = np.asarray(tree["loss_changes"])[internal].sum()
+    return gains
+
+
+def prune(pipeline, keep: float):
+    """Drop the trees with the lowest total gain, keeping ``keep`` of them in boosting order."""
+    booster = pipeline[-1].get_booster()
+    raw = json.loads(booster.save_raw("json"))
+    model = raw["learner"]["gradient_booster"]["model"]
+    if int(model["gbtree_model_param"]["num_parallel_tree"]) != 1:
+        raise ValueError("pruning only supports one tree per boosting round")
+    gains = tree_gains(booster)
+    n_keep = max(1, int(round(len(gains) * keep)))
+    kept = np.sort(np.argsort(gains)[::-1][:n_keep])
+
+    model["trees"] = [model["trees"][i] for i in kept]
+    for new_id, tree in enumerate(model["trees"]):
+        tree["id"] = new_id
+    model["tree_info"] = [model["tree_info"][i] for i in kept]
+    model["iteration_indptr"] = list(range(n_keep + 1))
+    model["gbtree_model_param"]["num_trees"] = str(n_keep)
+    pruned = xgb.Booster()
+    pruned.load_model(bytearray(json.dumps(raw).encode()))
+    return with_booster(pipeline, pruned)
+
+
+def distill(pipeline, X_train: pd.DataFrame, depth: int, rounds=200, learning_rate=0.1):
+    """Fit a shallow booster to the teacher pipeline's probabilities (soft labels)."""
+    teacher = pipeline.predict_proba(X_train)[:, 1]
+    Xt = pipeline[0].transform(X_train)
+    params = {"objective": "binary:logistic", "max_depth": depth, "eta": learning_rate,
+              "eval_metric": "logloss", "seed": 42}
+    booster = xgb.train(params, xgb.DMatrix(Xt, label=teacher), num_boost_round=rounds)
+    student = with_booster(pipeline, booster)
+    student[-1].set_params(max_depth=depth, learning_rate=learning_rate)
+    return student
+
+
+def artifact_size(pipeline) -> int:
+    buf = io.BytesIO()
+    joblib.dump(pipeline, buf)
+    return buf.tell()
+
+
+def evaluate(pipeline, X_test: pd.DataFrame, y_test, threshold, latency_calls=300) -> dict:
+    prob = pipeline.predict_proba(X_test)[:, 1]
+    row = X_test.iloc[[0]]
+    latency = summarize(time_calls(lambda: pipeline.predict_proba(row), n=latency_calls))
+    return {
+        "trees": pipeline[-1].get_booster().num_boosted_rounds(),
+        "recall": recall_score(y_test, (prob >= threshold).astype(int)),
+        "roc_auc": roc_auc_score(y_test, prob),
+        "size_kb": artifact_size(pipeline) / 1024,
+        "p50_ms": latency["p50_ms"],
+        "p99_ms": latency["p99_ms"],
+    }
+
+
+def build_variants(pipeline, X_train, keep_fractions=KEEP_FRACTIONS, distill_depths=DISTILL_DEPTHS):
+    variants = {"original": pipeline}
+    for keep in keep_fractions:
+        variants[f"truncate-{keep:.0%}"] = truncate(pipeline, keep)
+        variants[f"prune-{keep:.0%}"] = prune(pipeline, keep)
+    for depth in distill_depths:
+        variants[f"distill-d{depth}"] = distill(pipeline, X_train, depth)
+    return variants
+
+
+def report(spec, pipeline, split, **kwargs):
+    """Return ``(variants, DataFrame of metrics)`` for ``pipeline`` on a cached split."""
+    X_train, X_test = split.frame("X_train"), split.frame("X_test")
+    y_test = np.asarray(split["y_test"])
+    variants = build_variants(pipeline, X_train, **kwargs)
+    rows = {name: evaluate(p, X_test, y_test, spec.threshold) for name, p in variants.items()}
+    return variants, pd.DataFrame.from_dict(rows, orient="index")
+
+
+def pick(table: pd.DataFrame, tolerance: float) -> str:
+    base = table.loc["original"]
+    ok = table[(table["recall"] >= base["recall"] - tolerance) &
+               (table["roc_auc"] >= base["roc_auc"] - tolerance)]
+    return ok["p99_ms"].idxmin()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compact a trained pipeline and report the trade-offs")
+    parser.add_argument("model", choices=sorted(SPECS))
+    parser.add_argument("--data", help="raw training data (defaults to the model's Data/ file)")
+    parser.add_argument("--export", help="variant name to export, or 'auto'")
+    parser.add_argument("-o", "--output", help="where to write the exported variant")
+    parser.add_argument("--tolerance", type=float, default=0.01,
+                        help="allowed recall / ROC-AUC drop for --export auto")
+    args = parser.parse_args(argv)
+
+    spec = get_spec(args.model)
+    pipeline = joblib.load(spec.model_path)
+    split = FeatureCache().load(spec, raw_path=args.data)
+    variants, table = report(spec, pipeline, split)
+    with pd.option_context("display.float_format", "{:.4f}".format):
+        print(table.to_string())
+
+    if args.export:
+        name = pick(table, args.tolerance) if args.export == "auto" else args.export
+        if name not in variants:
+            parser.error(f"unknown variant '{name}', choose from {list(variants)}")
+        output = args.output or spec.model_path.with_name(f"{spec.model_path.stem}.{name}.pkl")
+        joblib.dump(variants[name], output)
+        print(f"Exported {name} -> {output}")
+
+
+if __name__ == "__main__":
+    main()
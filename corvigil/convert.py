@@ -0,0 +1,99 @@
+"""Convert the CSV datasets to Parquet.
+
+    python -m corvigil.convert Data/heart_processed.csv
+    python -m corvigil.convert Data/cardiac_failure_processed.csv --model cardiac
+
+Features are written as non-null float64 (the ``True``/``False`` strings in
+``heart_processed.csv`` become 1.0/0.0), the label as int8, and the file is
+split into row groups so batch scoring can stream it.  ``--float32`` halves
+the file for training-only copies, at the cost of exact scoring parity with
+the CSV (see ``corvigil.datasets``).
+"""
+import argparse
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+from corvigil.schema import SPECS, get_spec
+
+ROW_GROUP_ROWS = 128_000
+
+
+def guess_spec(columns):
+    for spec in SPECS.values():
+        if spec.target in columns:
+            return spec
+    raise ValueError("Could not tell which model this file belongs to, pass --model")
+
+
+def parquet_schema(csv_schema: pa.Schema, spec, feature_type=pa.float64()) -> pa.Schema:
+    fields = []
+    for field in csv_schema:
+        if field.name in spec.drop_cols:
+            continue
+        if field.name in spec.features:
+            fields.append(pa.field(field.name, feature_type, nullable=False))
+        elif field.name == spec.target:
+            fields.append(pa.field(field.name, pa.int8(), nullable=False))
+        else:
+            fields.append(field)
+    return pa.schema(fields)
+
+
+def convert_csv(src, dst=None, spec=None, row_group_rows=ROW_GROUP_ROWS, compression="zstd",
+                feature_type=pa.float64()):
+    src = Path(src)
+    dst = Path(dst) if dst else src.with_suffix(".parquet")
+    reader = pacsv.open_csv(src, read_options=pacsv.ReadOptions(block_size=1 << 24))
+    spec = spec or guess_spec(reader.schema.names)
+    schema = parquet_schema(reader.schema, spec, feature_type)
+
+    rows = 0
+    pending = []
+    with pq.ParquetWriter(dst, schema, compression=compression) as writer:
+        for batch in reader:
+            table = pa.Table.from_batches([batch]).select(schema.names)
+            if any(table.column(c).null_count for c in spec.features if c in schema.names):
+                raise ValueError(f"{src}: feature columns contain missing values")
+            pending.append(_cast(table, schema))
+            rows += batch.num_rows
+            if sum(t.num_rows for t in pending) >= row_group_rows:
+                writer.write_table(pa.concat_tables(pending), row_group_size=row_group_rows)
+                pending = []
+        if pending:
+            writer.write_table(pa.concat_tables(pending), row_group_size=row_group_rows)
+    return dst, rows
+
+
+def _cast(table: pa.Table, schema: pa.Schema) -> pa.Table:
+    columns = []
+    for field in schema:
+        column = table.column(field.name)
+        if pa.types.is_boolean(column.type) and field.type != column.type:
+            column = column.cast(pa.uint8())
+        columns.append(column.cast(field.type))
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert a CorVigil CSV dataset to Parquet")
+    parser.add_argument("src", nargs="+", help="CSV file(s) to convert")
+    parser.add_argument("-o", "--output", help="output path (single input only)")
+    parser.add_argument("--model", choices=sorted(SPECS), help="dataset schema, guessed from the label column")
+    parser.add_argument("--row-group-rows", type=int, default=ROW_GROUP_ROWS)
+    parser.add_argument("--float32", action="store_true", help="store features as float32")
+    args = parser.parse_args(argv)
+
+    if args.output and len(args.src) > 1:
+        parser.error("--output can only be used with a single input file")
+    spec = get_spec(args.model) if args.model else None
+    feature_type = pa.float32() if args.float32 else pa.float64()
+    for src in args.src:
+        dst, rows = convert_csv(src, args.output, spec, args.row_group_rows, feature_type=feature_type)
+        print(f"{src} -> {dst} ({rows} rows)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+"""What would bring a patient under the screening threshold: a batched counterfactual search.
+
+Only modifiable inputs move (``LEVERS``: smoking, alcohol, activity, weight,
+blood pressure and cholesterol for the cardiac form; cholesterol and resting
+BP for the heart attack form), each over a short grid of healthier values.
+A change costs ``|delta| / cost_unit`` per input (one for quitting smoking,
+one per 5 kg, per 10 mmHg, ...), and the search looks for the cheapest
+combinations whose probability falls below the threshold.
+
+The whole grid is enumerated as flat indices and sorted by cost with NumPy.
+Each lever's options are encoded and clipped once; candidates are then
+assembled from those rows by indexing and scored in batches (small first,
+doubling up to ``max_batch``), cheapest first, so the first hit is the
+cheapest solution.  The apps pass their ``InferenceExecutor``, so the
+batches queue behind the same bounded pool of pinned-thread workers as
+every other request and raise ``InferenceBusy`` when it is saturated.
+Batches are pruned before scoring: candidates that violate a constraint
+(diastolic below systolic) or that change a superset of the inputs of an
+already found solution -- the same moves taken further, plus extras -- are
+never scored.  Searches stop after ``k`` solutions or ``budget_s`` seconds.
+
+    python -m corvigil.counterfactual cardiac '{"age": 58, "gender": 2, "height": 170, ...}'
+"""
+import argparse
+import json
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from corvigil.encoding import CARDIAC_FORM, HEART_ATTACK_FORM, encode_cardiac_form, encode_heart_attack_form
+from corvigil.preprocess import apply_clip
+from corvigil.schema import SPECS, get_spec
+
+LEVELS = {1: "Normal", 2: "Above Normal", 3: "Well Above Normal"}
+
+
+@dataclass(frozen=True)
+class Lever:
+    name: str               # form key
+    label: str
+    options: object         # form dict -> healthier values to try, nearest first
+    cost_unit: float        # a change of this size costs 1
+    unit: str = ""
+    value_labels: dict = field(default_factory=dict)
+    action: str = ""        # wording for a yes/no change ("Stop smoking")
+
+
+def _to(target):
+    return lambda current: np.array([target] if current != target else [], dtype=float)
+
+
+def _down(step, floor, span):
+    """Lower ``current`` in ``step`` increments, at most ``span`` and not below ``floor``."""
+    def options(current):
+        lowest = max(floor, current - span)
+        return np.arange(current - step, lowest - 1e-9, -step, dtype=float)
+    return options
+
+
+def _levels_below(current):
+    return np.arange(current - 1, 0, -1, dtype=float)
+
+
+def _weight_options(form):
+    # not below a BMI of 18.5 at the patient's height, at most 30 kg
+    floor = np.ceil(18.5 * (form["height"] / 100) ** 2)
+    return _down(2, floor, 30)(form["weight"])
+
+
+LEVERS = {
+    "cardiac": (
+        Lever("smoke", "Smoking", lambda f: _to(0)(f["smoke"]), 1.0, action="Stop smoking"),
+        Lever("alco", "Alcohol", lambda f: _to(0)(f["alco"]), 1.0, action="Stop drinking alcohol"),
+        Lever("active", "Activity", lambda f: _to(1)(f["active"]), 1.0, action="Become physically active"),
+        Lever("weight", "Weight", _weight_options, 5.0, " kg"),
+        Lever("ap_hi", "Systolic BP", lambda f: _down(5, 110, 60)(f["ap_hi"]), 10.0, " mmHg"),
+        Lever("ap_lo", "Diastolic BP", lambda f: _down(5, 70, 40)(f["ap_lo"]), 10.0, " mmHg"),
+        Lever("cholesterol", "Cholesterol", lambda f: _levels_below(f["cholesterol"]), 1.0, value_labels=LEVELS),
+    ),
+    "heart_attack": (
+        Lever("cholesterol", "Cholesterol", lambda f: _down(10, 150, 120)(f["cholesterol"]), 20.0, " mg/dl"),
+        Lever("resting_bp", "Resting BP", lambda f: _down(5, 110, 50)(f["resting_bp"]), 10.0, " mmHg"),
+    ),
+}
+
+FORMS = {"cardiac": (CARDIAC_FORM, encode_cardiac_form), "heart_attack": (HEART_ATTACK_FORM, encode_heart_attack_form)}
+
+
+def _valid(model, values) -> np.ndarray:
+    """Candidates that make clinical sense; ``values`` maps lever names to arrays."""
+    if model == "cardiac":
+        return np.asarray(values["ap_lo"] < values["ap_hi"])
+    return True
+
+
+@dataclass(frozen=True)
+class Counterfactual:
+    changes: dict           # {form key: (before, after)}
+    probability: float
+    cost: float
+
+
+@dataclass
+class SearchOutcome:
+    probability: float      # before any change
+    solutions: list
+    candidates: int         # size of the cost-sorted grid
+    scored: int             # candidates actually scored
+    elapsed_s: float
+
+
+def _option_table(model, form, levers, options, bounds):
+    """Model-ready feature rows of the base form and of every single-lever option.
+
+    Encoding and clipping work column by column, and each feature column
+    is driven by at most one lever (``bmi`` by ``weight``), so any
+    combination of options can be assembled from these rows without going
+    through pandas again.
+    """
+    probe = [dict(form)]
+    for lever, values in zip(levers, options):
+        probe.extend(dict(form, **{lever.name: v}) for v in values)
+    columns, encode = FORMS[model]
+    X = encode(pd.DataFrame(probe)[list(columns)])
+    if bounds:
+        X = apply_clip(X, bounds)
+    table = X.to_numpy(dtype=np.float64)
+    offsets = np.cumsum([1] + [len(v) for v in options])[:-1]
+    driven = []
+    for offset, values in zip(offsets, options):
+        driven.append(np.flatnonzero((table[offset:offset + len(values)] != table[0]).any(axis=0)))
+    if len(np.concatenate(driven)) != len(np.unique(np.concatenate(driven))):
+        raise ValueError(f"{model} levers drive overlapping feature columns")
+    return table, offsets, driven
+
+
+def search(model, pipeline, form: dict, threshold, k=3, max_changes=3, first_batch=512, max_batch=2048,
+           budget_s=1.0, bounds=None, executor=None) -> SearchOutcome:
+    """Cheapest changes to ``LEVERS[model]`` that bring ``form`` below ``threshold``.
+
+    ``form`` holds the app's form values (``corvigil.encoding``),
+    ``pipeline`` is the exported sklearn pipeline and ``bounds`` the serving
+    clip bounds the app applies before scoring.  With ``executor`` (the
+    serving ``InferenceExecutor``) every batch is scored on its workers
+    instead of the calling thread, and :class:`corvigil.inference.InferenceBusy`
+    propagates to the caller.
+    """
+    start = time.perf_counter()
+    levers = LEVERS[model]
+    options = [np.concatenate([[float(form[lv.name])], lv.options(form)]) for lv in levers]
+    table, offsets, driven = _option_table(model, form, levers, options, bounds)
+    columns = list(get_spec(model).features)
+    scorer = executor if executor is not None else pipeline
+
+    def score(matrix):
+        return np.asarray(scorer.predict_proba(pd.DataFrame(matrix, columns=columns)))[:, 1]
+
+    probability = float(score(table[:1])[0])
+    if probability < threshold:
+        return SearchOutcome(probability, [], 0, 0, time.perf_counter() - start)
+
+    shape = tuple(len(o) for o in options)
+    cost = np.zeros(shape)
+    changed = np.zeros(shape, dtype=np.int8)
+    for axis, (lever, values) in enumerate(zip(levers, options)):
+        along = [1] * len(shape)
+        along[axis] = -1
+        cost += (np.abs(values - values[0]) / lever.cost_unit).reshape(along)
+        changed += (np.arange(len(values)) > 0).astype(np.int8).reshape(along)
+    cost, changed = cost.ravel(), changed.ravel()
+    flat = np.flatnonzero((changed > 0) & (changed <= max_changes))
+    order = flat[np.argsort(cost[flat], kind="stable")]
+
+    solutions, found = [], []      # found: boolean "inputs changed" masks of the solutions
+    pos, batch, scored = 0, first_batch, 0
+    while pos < len(order) and len(solutions) < k and time.perf_counter() - start < budget_s:
+        idx = order[pos:pos + batch]
+        pos += len(idx)
+        batch = min(batch * 2, max_batch)
+        codes = np.unravel_index(idx, shape)
+        moved = np.stack([c > 0 for c in codes], axis=1)
+        keep = np.ones(len(idx), dtype=bool)
+        for mask in found:
+            keep &= ~moved[:, mask].all(axis=1)
+        keep &= _valid(model, {lv.name: values[c] for lv, values, c in zip(levers, options, codes)})
+        rows = np.flatnonzero(keep)
+        if not len(rows):
+            continue
+        matrix = np.repeat(table[:1], len(rows), axis=0)
+        for offset, cols, c in zip(offsets, driven, codes):
+            matrix[:, cols] = table[offset + c[rows]][:, cols]
+        prob = score(matrix)
+        scored += len(rows)
+        for row, p in zip(rows, prob):
+            if p >= threshold or any(moved[row, mask].all() for mask in found):
+                continue
+            found.append(moved[row].copy())
+            solutions.append(Counterfactual(
+                {lv.name: (float(form[lv.name]), float(values[c[row]]))
+                 for lv, values, c in zip(levers, options, codes) if c[row] > 0},
+                float(p), float(cost[idx[row]])))
+            if len(solutions) == k:
+                break
+    return SearchOutcome(probability, solutions, len(order), scored, time.perf_counter() - start)
+
+
+def describe(model, solution: Counterfactual) -> list:
+    """Human-readable changes, e.g. ``["Stop smoking", "Weight 92 → 84 kg"]``."""
+    out = []
+    for lever in LEVERS[model]:
+        if lever.name not in solution.changes:
+            continue
+        before, after = solution.changes[lever.name]
+        if lever.action:
+            out.append(lever.action)
+        elif lever.value_labels:
+            out.append(f"{lever.label} {lever.value_labels[int(before)]} → {lever.value_labels[int(after)]}")
+        else:
+            out.append(f"{lever.label} {before:g} → {after:g}{lever.unit}")
+    return out
+
+
+def main(argv=None):
+    import joblib
+
+    from corvigil.cleaning import serving_bounds
+
+    parser = argparse.ArgumentParser(description="Search the cheapest changes that lower a patient's risk")
+    parser.add_argument("model", choices=sorted(SPECS))
+    parser.add_argument("form", help="JSON object with the app's form values")
+    parser.add_argument("--threshold", type=float, help="defaults to the model's screening threshold")
+    parser.add_argument("-k", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    spec = get_spec(args.model)
+    threshold = args.threshold if args.threshold is not None else spec.threshold
+    outcome = search(spec.name, joblib.load(spec.model_path), json.loads(args.form), threshold, k=args.k,
+                     bounds=serving_bounds(spec) if spec.name == "cardiac" else None)
+    print(f"probability {outcome.probability:.3f}, threshold {threshold:.2f}; scored {outcome.scored} of "
+          f"{outcome.candidates} candidates in {outcome.elapsed_s * 1000:.0f} ms")
+    for s in outcome.solutions:
+        print(f"  {s.probability:.3f}  cost {s.cost:4.1f}  " + "; ".join(describe(spec.name, s)))
+
+
+if __name__ == "__main__":
+    main()
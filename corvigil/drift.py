@@ -0,0 +1,220 @@
+"""Constant-memory drift monitoring of the features the apps receive.
+
+At training time ``python -m corvigil.drift fit <model>`` summarises the
+training split into a reference sketch stored in the model's sidecar
+(``models/<name>.meta.json``): decile bins for the numeric columns and
+category frequencies for the binary columns and one-hot groups.
+
+At serving time :class:`DriftMonitor` keeps one integer counter per bin, so
+``update`` is a handful of bisects and list increments (a few microseconds)
+whatever the traffic.  Every ``check_every`` requests the window is compared
+to the reference with PSI and a binned KS distance, logged, and reset.
+
+    python -m corvigil.drift fit heart_attack
+    python -m corvigil.drift check heart_attack incoming.parquet
+"""
+import argparse
+import logging
+import threading
+from bisect import bisect_right
+
+import numpy as np
+
+from corvigil.artifacts import load_meta, update_meta
+from corvigil.schema import SPECS, get_spec
+
+logger = logging.getLogger(__name__)
+
+N_BINS = 10
+PSI_ALERT = 0.2
+EPS = 1e-4
+
+
+def categorical_columns(spec):
+    """``[(factor, member columns, category labels)]`` for every non-numeric input."""
+    grouped = set()
+    factors = []
+    for factor, members, implicit in spec.onehot_groups:
+        labels = [m[len(factor) + 1:] for m in members] + [implicit]
+        factors.append((factor, list(members), labels))
+        grouped.update(members)
+    for col in spec.binary_cols:
+        if col not in grouped:
+            factors.append((col, [col], None))
+    return factors
+
+
+def build_reference(X: np.ndarray, spec, bins=N_BINS) -> dict:
+    """Reference sketch of a feature matrix whose columns follow ``spec.features``."""
+    index = {c: j for j, c in enumerate(spec.features)}
+    numeric = {}
+    for col in spec.numeric_cols:
+        x = X[:, index[col]]
+        edges = np.unique(np.quantile(x, np.linspace(0, 1, bins + 1)[1:-1]))
+        counts = np.bincount(np.searchsorted(edges, x, side="right"), minlength=len(edges) + 1)
+        numeric[col] = {"edges": edges.tolist(), "freq": (counts / len(x)).tolist()}
+
+    categorical = {}
+    for factor, members, labels in categorical_columns(spec):
+        if labels is None:
+            values = X[:, index[members[0]]]
+            labels = np.unique(values).tolist()
+            codes = np.searchsorted(labels, values)
+        else:
+            codes = _onehot_codes(X[:, [index[m] for m in members]])
+        counts = np.bincount(codes, minlength=len(labels) + 1)   # last slot: unseen category
+        categorical[factor] = {"columns": members, "categories": labels, "freq": (counts / len(X)).tolist()}
+    return {"rows": int(len(X)), "numeric": numeric, "categorical": categorical}
+
+
+def _onehot_codes(block: np.ndarray) -> np.ndarray:
+    hot = block == 1
+    # first active member, or len(members) for the implicit all-zero category
+    return np.where(hot.any(axis=1), hot.argmax(axis=1), block.shape[1])
+
+
+def psi(ref, cur) -> float:
+    ref = np.clip(np.asarray(ref, dtype=float), EPS, None)
+    cur = np.clip(np.asarray(cur, dtype=float), EPS, None)
+    return float(np.sum((cur - ref) * np.log(cur / ref)))
+
+
+class DriftMonitor:
+    def __init__(self, reference: dict, spec, check_every=500, psi_alert=PSI_ALERT, on_report=None):
+        self.reference = reference
+        self.spec = spec
+        self.check_every = check_every
+        self.psi_alert = psi_alert
+        self.on_report = on_report
+        self.last_report = None
+        self._lock = threading.Lock()
+
+        index = {c: j for j, c in enumerate(spec.features)}
+        self._slots = []     # (name, reference freq, offset, size)
+        self._numeric = []   # (column index, edges, offset)
+        self._categorical = []  # (column indices, value lookup or None, offset, unseen slot)
+        offset = 0
+        for col, ref in reference["numeric"].items():
+            size = len(ref["edges"]) + 1
+            self._numeric.append((index[col], ref["edges"], offset))
+            self._slots.append((col, ref["freq"], offset, size))
+            offset += size
+        for factor, ref in reference["categorical"].items():
+            size = len(ref["categories"]) + 1
+            cols = [index[c] for c in ref["columns"]]
+            lookup = None if len(cols) > 1 else {v: i for i, v in enumerate(ref["categories"])}
+            self._categorical.append((cols, lookup, offset, size - 1))
+            self._slots.append((factor, ref["freq"], offset, size))
+            offset += size
+        self._counts = [0] * offset
+        self.n = 0
+
+    @classmethod
+    def for_model(cls, spec, meta=None, **kwargs):
+        """Monitor backed by the reference in the model's sidecar (or ``meta``), or ``None`` if it has none."""
+        reference = (load_meta(spec.model_path) if meta is None else meta).get("drift_reference")
+        return cls(reference, spec, **kwargs) if reference else None
+
+    def update(self, row):
+        """Count one request; ``row`` is a mapping or a sequence in ``spec.features`` order."""
+        if isinstance(row, dict):
+            row = [row[c] for c in self.spec.features]
+        with self._lock:
+            counts = self._counts
+            for j, edges, offset in self._numeric:
+                counts[offset + bisect_right(edges, row[j])] += 1
+            for cols, lookup, offset, unseen in self._categorical:
+                if lookup is not None:
+                    counts[offset + lookup.get(row[cols[0]], unseen)] += 1
+                else:
+                    code = len(cols)
+                    for k, j in enumerate(cols):
+                        if row[j] == 1:
+                            code = k
+                            break
+                    counts[offset + code] += 1
+            self.n += 1
+            due = self.n >= self.check_every
+            if due:
+                window, self._counts, self.n = (self._counts, self.n), [0] * len(self._counts), 0
+        if due:
+            self._report(*window)
+
+    def update_many(self, X: np.ndarray):
+        """Vectorised update for a batch whose columns follow ``spec.features``."""
+        window = [0] * len(self._counts)
+        for j, edges, offset in self._numeric:
+            counts = np.bincount(np.searchsorted(edges, X[:, j], side="right"), minlength=len(edges) + 1)
+            window[offset:offset + len(counts)] = counts.tolist()
+        for cols, lookup, offset, unseen in self._categorical:
+            if lookup is not None:
+                values = X[:, cols[0]]
+                codes = np.full(len(X), unseen)
+                for value, code in lookup.items():
+                    codes[values == value] = code
+            else:
+                codes = _onehot_codes(X[:, cols])
+            counts = np.bincount(codes, minlength=unseen + 1)
+            window[offset:offset + len(counts)] = counts.tolist()
+        with self._lock:
+            self._counts = [a + b for a, b in zip(self._counts, window)]
+            self.n += len(X)
+
+    def flush(self):
+        """Report on whatever the current window holds and start a new one."""
+        with self._lock:
+            window, self._counts, self.n = (self._counts, self.n), [0] * len(self._counts), 0
+        return self._report(*window)
+
+    def _report(self, counts, n):
+        scores = {}
+        for name, ref, offset, size in self._slots:
+            cur = np.asarray(counts[offset:offset + size], dtype=float) / max(n, 1)
+            ref = np.asarray(ref, dtype=float)
+            scores[name] = {"psi": psi(ref, cur), "ks": float(np.abs(np.cumsum(cur) - np.cumsum(ref)).max())}
+        report = {"rows": n, "features": scores,
+                  "drifted": sorted(k for k, v in scores.items() if v["psi"] >= self.psi_alert)}
+        self.last_report = report
+        if report["drifted"]:
+            logger.warning("%s: input drift over the last %d requests in %s",
+                           self.spec.name, n, ", ".join(report["drifted"]))
+        if self.on_report is not None:
+            self.on_report(report)
+        return report
+
+
+def main(argv=None):
+    from corvigil.datasets import iter_feature_batches
+    from corvigil.featcache import FeatureCache
+
+    parser = argparse.ArgumentParser(description="Fit or check drift reference sketches")
+    sub = parser.add_subparsers(dest="command", required=True)
+    fit = sub.add_parser("fit", help="store the training-split reference in the model sidecar")
+    fit.add_argument("model", choices=sorted(SPECS))
+    fit.add_argument("--data", help="raw training data (defaults to the model's Data/ file)")
+    check = sub.add_parser("check", help="compare a CSV/Parquet batch against the reference")
+    check.add_argument("model", choices=sorted(SPECS))
+    check.add_argument("path")
+    args = parser.parse_args(argv)
+
+    spec = get_spec(args.model)
+    if args.command == "fit":
+        X_train = np.asarray(FeatureCache().load(spec, raw_path=args.data)["X_train"])
+        update_meta(spec.model_path, drift_reference=build_reference(X_train, spec))
+        print(f"Stored drift reference for {spec.name} ({len(X_train)} rows)")
+        return
+
+    monitor = DriftMonitor.for_model(spec)
+    if monitor is None:
+        parser.error(f"{spec.name} has no drift reference, run 'fit' first")
+    for X, _ in iter_feature_batches(args.path, spec, dtype=np.float64):
+        monitor.update_many(X)
+    report = monitor.flush()
+    print(f"{report['rows']} rows")
+    for name, s in sorted(report["features"].items(), key=lambda kv: -kv[1]["psi"]):
+        flag = "  DRIFT" if name in report["drifted"] else ""
+        print(f"{name:<16} psi {s['psi']:.4f}  ks {s['ks']:.4f}{flag}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Form values -> model features, shared by the apps, batch reports and tooling.
+
+Both functions accept one patient (a dict of form values, as collected by the
+Streamlit forms) or many (a DataFrame with the same keys as columns) and
+return a DataFrame in the column order the exported pipeline was fitted on.
+"""
+import pandas as pd
+
+from corvigil.schema import CARDIAC, HEART_ATTACK
+
+# cardiac_test_app.py form: gender 1=female/2=male, cholesterol/gluc 1..3, lifestyle flags 0/1
+CARDIAC_FORM = ("age", "gender", "height", "weight", "ap_hi", "ap_lo",
+                "cholesterol", "gluc", "smoke", "alco", "active")
+
+# heart_attack_test_app.py form, categorical answers as the selectboxes show them
+HEART_ATTACK_FORM = ("age", "sex", "chest_pain", "resting_bp", "cholesterol", "fasting_bs",
+                     "max_hr", "oldpeak", "exercise_angina", "resting_ecg", "st_slope")
+HEART_ATTACK_CHOICES = {
+    "sex": ["Female", "Male"],
+    "chest_pain": ["ATA", "NAP", "TA", "ASY"],
+    "fasting_bs": ["No", "Yes"],
+    "exercise_angina": ["No", "Yes"],
+    "resting_ecg": ["Normal", "ST", "LVH"],
+    "st_slope": ["Up", "Flat", "Down"],
+}
+
+
+def _frame(values, columns) -> pd.DataFrame:
+    if isinstance(values, pd.DataFrame):
+        return values.loc[:, list(columns)].reset_index(drop=True)
+    return pd.DataFrame([values], columns=list(columns))
+
+
+def encode_cardiac_form(values) -> pd.DataFrame:
+    form = _frame(values, CARDIAC_FORM)
+    X = form.astype(float)
+    X["age"] = form["age"] / 100.0
+    X["gender"] = form["gender"] - 1
+    X["cholesterol"] = (form["cholesterol"] - 1) / 2.0
+    X["bmi"] = form["weight"] / ((form["height"] * 0.01) ** 2)
+    return X[list(CARDIAC.features)]
+
+
+def encode_heart_attack_form(values) -> pd.DataFrame:
+    form = _frame(values, HEART_ATTACK_FORM)
+    X = pd.DataFrame({
+        "Age": form["age"],
+        "RestingBP": form["resting_bp"],
+        "Cholesterol": form["cholesterol"],
+        "FastingBS": (form["fasting_bs"] == "Yes").astype(int),
+        "MaxHR": form["max_hr"],
+        "Oldpeak": form["oldpeak"],
+        "Sex_M": (form["sex"] == "Male").astype(int),
+        "ChestPainType_ATA": (form["chest_pain"] == "ATA").astype(int),
+        "ChestPainType_NAP": (form["chest_pain"] == "NAP").astype(int),
+        "ChestPainType_TA": (form["chest_pain"] == "TA").astype(int),
+        "RestingECG_Normal": (form["resting_ecg"] == "Normal").astype(int),
+        "RestingECG_ST": (form["resting_ecg"] == "ST").astype(int),
+        "ExerciseAngina_Y": (form["exercise_angina"] == "Yes").astype(int),
+        "ST_Slope_Flat": (form["st_slope"] == "Flat").astype(int),
+        "ST_Slope_Up": (form["st_slope"] == "Up").astype(int),
+    })
+    return X[list(HEART_ATTACK.features)]
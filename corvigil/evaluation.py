@@ -0,0 +1,188 @@
+"""Bootstrap confidence intervals for the screening metrics.
+
+The test splits hold a few hundred patients, so a single recall or ROC-AUC
+is a noisy number and two models are rarely told apart by one.
+:func:`bootstrap` reports each metric at the production threshold with a
+percentile interval over ``resamples`` bootstrap draws of the test set;
+given several models it scores them all on the *same* draws and adds
+paired intervals of each model's difference to the first, which is the
+comparison a promotion decision needs.
+
+All draws of a block are one ``(resamples, rows)`` index matrix, shared by
+every model.  Each row of the test set maps to a (distinct score, label)
+cell, so one ``bincount`` of the drawn cells gives every draw's count of
+positives and negatives per score, and every metric is array arithmetic on
+those counts: confusion counts are sums over the flagged (highest)
+scores, and ROC-AUC is the Mann-Whitney statistic from negatives
+cumulated in score order (ties count one half).  There is no Python loop
+over resamples.
+Blocks are sized to ``MAX_CELLS`` index entries and, on large test sets,
+run on a thread per core; each block has its own seed, so the intervals
+do not depend on the number of threads.
+
+    python -m corvigil.evaluation heart_attack
+    python -m corvigil.evaluation cardiac --data holdout.parquet --candidate models/cardiac_failure_detection.candidate.pkl
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+
+from corvigil.schema import SPECS, get_spec
+
+DEFAULT_RESAMPLES = 5000
+BLOCK_RESAMPLES = 500
+MAX_CELLS = 1 << 22             # index entries per block (resamples x rows)
+PARALLEL_CELLS = 1 << 24        # total work below which one thread is faster
+METRICS = ("roc_auc", "recall", "specificity", "accuracy", "false_positives", "false_negatives")
+COUNTS = ("false_positives", "false_negatives")
+
+
+@dataclass(frozen=True)
+class Interval:
+    estimate: float
+    low: float
+    high: float
+
+    def __format__(self, spec):
+        spec = spec or ".4f"
+        return f"{self.estimate:{spec}} [{self.low:{spec}}, {self.high:{spec}}]"
+
+    def __str__(self):
+        return format(self)
+
+
+class _Scores:
+    """One model's rows as (tie group, label) cells, tie groups in increasing score order."""
+
+    def __init__(self, y, prob, threshold):
+        values, group = np.unique(prob, return_inverse=True)
+        self.groups = len(values)
+        self.cells = (group * 2 + y).astype(np.int32)
+        self.first_flagged = int(np.searchsorted(values, threshold))     # flagged groups are a suffix
+
+    def metrics(self, idx) -> dict:
+        """Every metric for each row of ``idx`` (a resamples x rows bootstrap index matrix)."""
+        resamples, n = idx.shape
+        width = 2 * self.groups
+        cells = self.cells[idx]
+        cells += np.arange(resamples, dtype=np.int32)[:, None] * width
+        counts = np.bincount(cells.ravel(), minlength=resamples * width).reshape(resamples, self.groups, 2)
+        neg, pos = counts[:, :, 0], counts[:, :, 1]
+        positives = pos.sum(axis=1)
+        negatives = n - positives
+        tp = pos[:, self.first_flagged:].sum(axis=1)
+        fp = neg[:, self.first_flagged:].sum(axis=1)
+        fn, tn = positives - tp, negatives - fp
+        # Mann-Whitney: twice the negatives scored below each positive, ties counting once
+        twice_below = 2 * np.cumsum(neg, axis=1) - neg
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return {
+                "roc_auc": np.einsum("ij,ij->i", pos, twice_below) / (2.0 * positives * negatives),
+                "recall": tp / positives,
+                "specificity": tn / negatives,
+                "accuracy": (tp + tn) / n,
+                "false_positives": fp.astype(np.float64),
+                "false_negatives": fn.astype(np.float64),
+            }
+
+
+def resample_indices(rng, rows, resamples) -> np.ndarray:
+    """A ``(resamples, rows)`` bootstrap index matrix: row ``b`` holds the test rows of draw ``b``."""
+    return rng.integers(0, rows, size=(resamples, rows), dtype=np.int32)
+
+
+def _block(models, rows, resamples, seed):
+    idx = resample_indices(np.random.default_rng(seed), rows, resamples)
+    return [m.metrics(idx) for m in models]
+
+
+def bootstrap(y, probs, threshold, resamples=DEFAULT_RESAMPLES, confidence=0.95, seed=0, n_jobs=None) -> dict:
+    """Point estimates and bootstrap intervals of :data:`METRICS` at ``threshold``.
+
+    ``probs`` maps model name to positive-class probabilities on the same
+    rows as ``y`` (a bare array is named ``"model"``).  Returns
+    ``{name: {metric: Interval}}``; with more than one model, also
+    ``{"<name> - <first>": {metric: Interval}}`` for the paired differences.
+    ``n_jobs`` defaults to every available core once the test set is large.
+    """
+    from corvigil.scheduler import available_cores
+
+    if not isinstance(probs, dict):
+        probs = {"model": probs}
+    y = np.asarray(y).astype(np.int32)
+    models = [_Scores(y, np.asarray(p, dtype=np.float64), threshold) for p in probs.values()]
+    rows = len(y)
+    per_block = max(1, min(BLOCK_RESAMPLES, MAX_CELLS // rows))
+    sizes = [min(per_block, resamples - start) for start in range(0, resamples, per_block)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    if n_jobs is None:
+        n_jobs = available_cores() if rows * resamples >= PARALLEL_CELLS else 1
+    if n_jobs > 1 and len(sizes) > 1:
+        with ThreadPoolExecutor(max_workers=n_jobs) as pool:
+            blocks = list(pool.map(lambda a: _block(models, rows, *a), zip(sizes, seeds)))
+    else:
+        blocks = [_block(models, rows, size, s) for size, s in zip(sizes, seeds)]
+    draws = [{k: np.concatenate([b[i][k] for b in blocks]) for k in METRICS} for i in range(len(models))]
+    full = [m.metrics(np.arange(rows, dtype=np.int32)[None]) for m in models]
+
+    tail = (1 - confidence) / 2 * 100
+
+    def interval(point, values):
+        low, high = np.nanpercentile(values, [tail, 100 - tail])
+        return Interval(float(point), float(low), float(high))
+
+    names = list(probs)
+    out = {name: {k: interval(full[i][k][0], draws[i][k]) for k in METRICS} for i, name in enumerate(names)}
+    for i, name in enumerate(names[1:], start=1):
+        out[f"{name} - {names[0]}"] = {k: interval(full[i][k][0] - full[0][k][0], draws[i][k] - draws[0][k])
+                                       for k in METRICS}
+    return out
+
+
+def main(argv=None):
+    import joblib
+
+    from corvigil.datasets import as_frame, load_features
+    from corvigil.featcache import FeatureCache
+
+    parser = argparse.ArgumentParser(description="Bootstrap confidence intervals of the screening metrics")
+    parser.add_argument("model", choices=sorted(SPECS))
+    parser.add_argument("--data", help="labelled CSV/Parquet to evaluate on (defaults to the cached test split)")
+    parser.add_argument("--candidate", action="append", default=[], help="another .pkl to compare (repeatable)")
+    parser.add_argument("--resamples", type=int, default=DEFAULT_RESAMPLES)
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument("--threshold", type=float, help="defaults to the model's screening threshold")
+    parser.add_argument("--jobs", type=int, help="threads (defaults to every core on large test sets)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    spec = get_spec(args.model)
+    threshold = spec.threshold if args.threshold is None else args.threshold
+    if args.data:
+        X, y = load_features(args.data, spec, dtype=np.float64)
+        if y is None:
+            parser.error(f"{args.data} has no '{spec.target}' column")
+        X = as_frame(X, spec.features)
+    else:
+        split = FeatureCache().load(spec)
+        X, y = split.frame("X_test"), np.asarray(split["y_test"])
+    probs = {"production": joblib.load(spec.model_path).predict_proba(X)[:, 1]}
+    for path in args.candidate:
+        probs[path] = joblib.load(path).predict_proba(X)[:, 1]
+
+    start = time.perf_counter()
+    result = bootstrap(y, probs, threshold, args.resamples, args.confidence, args.seed, args.jobs)
+    elapsed = time.perf_counter() - start
+    print(f"{spec.name}: {len(y)} rows ({int(np.sum(y))} positive), threshold {threshold:.2f}, "
+          f"{args.resamples} resamples, {args.confidence:.0%} intervals in {elapsed:.2f}s")
+    for name, metrics in result.items():
+        print(name)
+        for metric, iv in metrics.items():
+            print(f"  {metric:<16} {iv:{'.0f' if metric in COUNTS else '.4f'}}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""Population-level explanations computed once at training time.
+
+``python -m corvigil.explain fit <model>`` explains the training split with
+the exported pipeline and stores the result in the model's sidecar
+(``models/<name>.meta.json``, key ``explanations``), under the real column
+names from the pipeline's ``get_feature_names_out`` rather than XGBoost's
+``f0..fN``:
+
+* gain importance per feature and per clinical factor (one-hot groups such
+  as ``ChestPainType`` summed),
+* mean |SHAP| per factor (log-odds) and the explainer's base value,
+* population deciles of every numeric feature and category shares of every
+  categorical factor,
+* per risk zone: patient count, mean probability, numeric means, category
+  shares and mean signed SHAP per factor.
+
+At serving time :func:`compare` lines one patient up against those numbers
+with a few interpolations -- nothing is explained or scored again.
+
+    python -m corvigil.explain fit heart_attack
+    python -m corvigil.explain show heart_attack
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from corvigil.artifacts import load_meta, update_meta
+from corvigil.drift import _onehot_codes, categorical_columns
+from corvigil.schema import LABELS, SPECS, get_spec
+
+QUANTILES = np.linspace(0, 1, 21)
+MAX_ROWS = 5000
+
+
+def feature_names(pipeline) -> list:
+    """Column names in the order the booster sees them (``num__Age`` -> ``Age``)."""
+    return [name.split("__", 1)[-1] for name in pipeline[0].get_feature_names_out()]
+
+
+def clinical_factors(spec) -> dict:
+    """``{factor: [member columns]}``: numeric columns alone, one-hot groups together."""
+    factors = {col: [col] for col in spec.numeric_cols}
+    for factor, members, _ in categorical_columns(spec):
+        factors[factor] = list(members)
+    return factors
+
+
+def _category_codes(X: pd.DataFrame, members, categories):
+    """Index into ``categories`` per row; ``len(categories)`` for a value training never saw."""
+    if len(members) == 1:
+        values = X[members[0]].to_numpy(dtype=float)
+        codes = np.searchsorted(categories, values)
+        seen = np.asarray(categories, dtype=float)[np.minimum(codes, len(categories) - 1)] == values
+        return np.where(seen, codes, len(categories))
+    return _onehot_codes(X[members].to_numpy())
+
+
+def _shares(codes, n):
+    return (np.bincount(codes, minlength=n)[:n] / max(len(codes), 1)).round(4).tolist()
+
+
+def build_explanations(pipeline, spec, X: pd.DataFrame, max_rows=MAX_ROWS, seed=0) -> dict:
+    """Global importance, mean |SHAP| and per-zone baselines of ``pipeline`` on ``X``."""
+    import shap
+
+    from corvigil.batch import risk_zone_codes
+
+    X = X[list(spec.features)].astype(float).reset_index(drop=True)
+    if len(X) > max_rows:
+        X = X.sample(max_rows, random_state=seed).reset_index(drop=True)
+    names = feature_names(pipeline)
+    booster = pipeline[-1].get_booster()
+    gain = booster.get_score(importance_type="gain")
+    total = sum(gain.values()) or 1.0
+    # the booster was fitted on a bare matrix, so its names are f<column index>
+    feature_gain = {name: gain.get(f"f{i}", 0.0) / total for i, name in enumerate(names)}
+
+    Xt = pipeline[0].transform(X)
+    explainer = shap.TreeExplainer(pipeline[-1])
+    shap_values = pd.DataFrame(explainer.shap_values(Xt), columns=names)
+    factors = clinical_factors(spec)
+    factor_shap = pd.DataFrame({f: shap_values[m].sum(axis=1) for f, m in factors.items()})
+    base = float(np.ravel(explainer.expected_value)[0])
+
+    prob = pipeline.predict_proba(X)[:, 1]
+    zones = risk_zone_codes(prob)
+    categorical = {factor: (members, labels if labels is not None else np.unique(X[members[0]]).tolist())
+                   for factor, members, labels in categorical_columns(spec)}
+    codes = {f: _category_codes(X, m, c) for f, (m, c) in categorical.items()}
+
+    def profile(mask):
+        return {
+            "patients": int(mask.sum()),
+            "mean_probability": round(float(prob[mask].mean()), 4),
+            "numeric_means": {c: round(float(X.loc[mask, c].mean()), 4) for c in spec.numeric_cols},
+            "category_shares": {f: _shares(codes[f][mask], len(c)) for f, (_, c) in categorical.items()},
+            "mean_shap": {f: round(float(factor_shap.loc[mask, f].mean()), 4) for f in factors},
+        }
+
+    mean_abs = factor_shap.abs().mean()
+    return {
+        "rows": int(len(X)),
+        "base_value": round(base, 6),
+        "base_probability": round(float(1 / (1 + np.exp(-base))), 4),
+        "features": names,
+        "factors": factors,
+        "gain": {name: round(v, 4) for name, v in feature_gain.items()},
+        "factor_gain": {f: round(sum(feature_gain[m] for m in members), 4) for f, members in factors.items()},
+        "mean_abs_shap": {f: round(float(mean_abs[f]), 4) for f in mean_abs.sort_values(ascending=False).index},
+        "quantiles": {c: np.quantile(X[c], QUANTILES).round(4).tolist() for c in spec.numeric_cols},
+        "categories": {f: list(c) for f, (_, c) in categorical.items()},
+        "population": profile(np.ones(len(X), dtype=bool)),
+        "zones": {label: profile(zones == z) for z, label in enumerate(LABELS) if (zones == z).any()},
+    }
+
+
+def load_explanations(spec, meta=None):
+    """The stored explanations of ``spec``'s model (or in ``meta``), or ``None`` if ``fit`` was never run."""
+    return (load_meta(spec.model_path) if meta is None else meta).get("explanations")
+
+
+def percentile(explanations, column, value) -> float:
+    """Share of the training population (0-100) at or below ``value``."""
+    return float(np.interp(value, explanations["quantiles"][column], QUANTILES * 100))
+
+
+def compare(explanations, spec, X_row, zone) -> pd.DataFrame:
+    """One patient against the population and their risk zone, factor by factor.
+
+    ``X_row`` is the model-ready feature row (dict or one-row DataFrame).
+    Rows come most important first; numeric factors get the patient's
+    percentile and the zone mean, categorical ones the share of the
+    population and of the zone answering like the patient.
+    """
+    row = X_row if isinstance(X_row, dict) else X_row.iloc[0].to_dict()
+    frame = pd.DataFrame([row])
+    zone_profile = explanations["zones"].get(zone, explanations["population"])
+    population = explanations["population"]
+    total = sum(explanations["mean_abs_shap"].values()) or 1.0
+    out = []
+    for factor, weight in explanations["mean_abs_shap"].items():
+        members = explanations["factors"][factor]
+        entry = {"factor": factor, "importance": weight / total}
+        if factor in explanations["quantiles"]:
+            entry.update(value=row[factor], percentile=percentile(explanations, factor, row[factor]),
+                         population_median=explanations["quantiles"][factor][len(QUANTILES) // 2],
+                         zone_mean=zone_profile["numeric_means"][factor])
+        else:
+            categories = explanations["categories"][factor]
+            code = int(_category_codes(frame, members, categories)[0])
+            known = code < len(categories)
+            entry.update(value=categories[code] if known else None,
+                         population_share=population["category_shares"][factor][code] if known else 0.0,
+                         zone_share=zone_profile["category_shares"][factor][code] if known else 0.0)
+        entry["zone_mean_shap"] = zone_profile["mean_shap"][factor]
+        out.append(entry)
+    return pd.DataFrame(out)
+
+
+def describe(entry, zone, name=None, value_labels=None, scale=1.0, unit="") -> str:
+    """One markdown line for a :func:`compare` row; ``scale``/``unit`` turn model units into display units."""
+    name = name or entry["factor"]
+    if "percentile" in entry and not pd.isna(entry.get("percentile")):
+        pct = entry["percentile"]
+        where = f"higher than {pct:.0f}%" if pct >= 50 else f"lower than {100 - pct:.0f}%"
+        return (f"**{name}** {entry['value'] * scale:.3g}{unit}: {where} of patients "
+                f"(median {entry['population_median'] * scale:.3g}{unit}, "
+                f"{zone} average {entry['zone_mean'] * scale:.3g}{unit})")
+    value = entry["value"]
+    if value is None:
+        return f"**{name}**: a value not seen in the training population"
+    label = (value_labels or {}).get(value, value if isinstance(value, str) else ("Yes" if value else "No"))
+    return (f"**{name}** {label}: like {entry['population_share']:.0%} of patients "
+            f"and {entry['zone_share']:.0%} of {zone} patients")
+
+
+def main(argv=None):
+    import joblib
+
+    from corvigil.featcache import FeatureCache
+
+    parser = argparse.ArgumentParser(description="Fit or show the stored population explanations")
+    sub = parser.add_subparsers(dest="command", required=True)
+    fit = sub.add_parser("fit", help="explain the training split and store it in the model sidecar")
+    fit.add_argument("model", choices=sorted(SPECS))
+    fit.add_argument("--data", help="raw training data (defaults to the model's Data/ file)")
+    show = sub.add_parser("show", help="print the stored explanations")
+    show.add_argument("model", choices=sorted(SPECS))
+    args = parser.parse_args(argv)
+
+    spec = get_spec(args.model)
+    if args.command == "fit":
+        X_train = FeatureCache().load(spec, raw_path=args.data).frame("X_train")
+        explanations = build_explanations(joblib.load(spec.model_path), spec, X_train)
+        update_meta(spec.model_path, explanations=explanations)
+        print(f"Stored explanations for {spec.name} ({explanations['rows']} rows)")
+        return
+
+    explanations = load_explanations(spec)
+    if explanations is None:
+        parser.error(f"{spec.name} has no stored explanations, run 'fit' first")
+    print(f"base probability {explanations['base_probability']:.3f} over {explanations['rows']} rows")
+    print(f"{'factor':<20} {'gain':>6} {'mean|SHAP|':>11}")
+    for factor, value in explanations["mean_abs_shap"].items():
+        print(f"{factor:<20} {explanations['factor_gain'][factor]:6.3f} {value:11.4f}")
+    for zone, p in explanations["zones"].items():
+        print(f"{zone:<16} {p['patients']:6d} patients  mean probability {p['mean_probability']:.3f}")
+
+
+if __name__ == "__main__":
+    main()
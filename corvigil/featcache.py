@@ -0,0 +1,156 @@
+"""Content-addressed cache of preprocessed train/test matrices.
+
+Entries are keyed by the SHA-256 of the raw data file plus the preprocessing
+parameters, and stored as plain ``.npy`` files that are opened with
+``mmap_mode="r"`` so every process working on the same split shares one
+page-cache copy.
+
+    from corvigil.featcache import FeatureCache
+    split = FeatureCache().load("cardiac")          # builds on first use
+    X_train = split.frame("X_train")
+
+    python -m corvigil.featcache build cardiac heart_attack
+    python -m corvigil.featcache clear
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from corvigil.datasets import read_table
+from corvigil.preprocess import default_params, prepare, split
+from corvigil.schema import ROOT, SPECS, get_spec
+
+CACHE_DIR = ROOT / ".cache" / "features"
+CACHE_VERSION = 1
+ARRAYS = ("X_train", "X_test", "y_train", "y_test")
+
+
+def file_digest(*paths, chunk_size=1 << 20) -> str:
+    """SHA-256 of the files' bytes, one after the other."""
+    h = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as fh:
+            for block in iter(lambda: fh.read(chunk_size), b""):
+                h.update(block)
+    return h.hexdigest()
+
+
+class CachedSplit:
+    """Memory-mapped train/test split produced by :class:`FeatureCache`."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.meta = json.loads((path / "meta.json").read_text())
+        self.columns = self.meta["columns"]
+        self.arrays = {name: np.load(path / f"{name}.npy", mmap_mode="r") for name in ARRAYS}
+
+    def __getitem__(self, name) -> np.ndarray:
+        return self.arrays[name]
+
+    def frame(self, name) -> pd.DataFrame:
+        """``X_*`` as the named DataFrame the pipelines expect (read-only view)."""
+        return pd.DataFrame(self.arrays[name], columns=self.columns, copy=False)
+
+    @property
+    def bounds(self) -> dict:
+        return {col: tuple(b) for col, b in self.meta["bounds"].items()}
+
+
+class FeatureCache:
+    def __init__(self, root=CACHE_DIR):
+        self.root = Path(root)
+
+    def key(self, raw_path, params) -> str:
+        payload = json.dumps({"data": self._raw_digest(raw_path), "params": params,
+                              "version": CACHE_VERSION}, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+    def load(self, spec, raw_path=None, params=None) -> CachedSplit:
+        """Return the cached split for ``spec``, building it if it is missing."""
+        spec = get_spec(spec) if isinstance(spec, str) else spec
+        raw_path = Path(raw_path or spec.data_path)
+        params = params or default_params(spec)
+        entry = self.root / spec.name / self.key(raw_path, params)
+        if not (entry / "meta.json").exists():
+            self._build(entry, spec, raw_path, params)
+        return CachedSplit(entry)
+
+    def latest(self, spec):
+        """The most recently built split for ``spec``, or ``None``; never builds (works without the raw data)."""
+        spec = get_spec(spec) if isinstance(spec, str) else spec
+        entries = sorted((self.root / spec.name).glob("*/meta.json"), key=lambda p: p.stat().st_mtime)
+        return CachedSplit(entries[-1].parent) if entries else None
+
+    def clear(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def _build(self, entry: Path, spec, raw_path, params):
+        df = read_table(raw_path).to_pandas()
+        X, y, bounds = prepare(df, spec, params)
+        X_train, X_test, y_train, y_test = split(X, y, params)
+
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        tmp = Path(tempfile.mkdtemp(dir=entry.parent, prefix=".build-"))
+        try:
+            for name, data in zip(ARRAYS, (X_train, X_test, y_train, y_test)):
+                dtype = np.float64 if name.startswith("X") else np.int8
+                np.save(tmp / f"{name}.npy", np.ascontiguousarray(data.to_numpy(dtype=dtype)))
+            (tmp / "meta.json").write_text(json.dumps({
+                "model": spec.name, "source": str(raw_path), "params": params,
+                "columns": list(X.columns), "bounds": bounds,
+                "rows": {"train": len(X_train), "test": len(X_test)},
+            }, indent=2))
+            # publishing is a single rename; a concurrent builder that loses the race just discards its copy
+            os.rename(tmp, entry)
+        except OSError:
+            if not (entry / "meta.json").exists():
+                raise
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    def _raw_digest(self, raw_path) -> str:
+        # hashing a large CSV on every call would cost a full read, so the
+        # digest is remembered per (path, size, mtime)
+        stat = os.stat(raw_path)
+        memo_key = f"{Path(raw_path).resolve()}:{stat.st_size}:{stat.st_mtime_ns}"
+        memo_path = self.root / "digests.json"
+        try:
+            memo = json.loads(memo_path.read_text())
+        except (FileNotFoundError, ValueError):
+            memo = {}
+        if memo_key not in memo:
+            memo[memo_key] = file_digest(raw_path)
+            self.root.mkdir(parents=True, exist_ok=True)
+            tmp = memo_path.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(memo, indent=2))
+            os.replace(tmp, memo_path)
+        return memo[memo_key]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the preprocessed feature cache")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="preprocess and cache the train/test split")
+    build.add_argument("models", nargs="+", choices=sorted(SPECS))
+    build.add_argument("--raw", help="raw data file (defaults to the model's Data/ file)")
+    sub.add_parser("clear", help="delete every cached entry")
+    args = parser.parse_args(argv)
+
+    cache = FeatureCache()
+    if args.command == "clear":
+        cache.clear()
+        return
+    for name in args.models:
+        cached = cache.load(name, raw_path=args.raw)
+        print(f"{name}: {cached.path} ({cached.meta['rows']})")
+
+
+if __name__ == "__main__":
+    main()
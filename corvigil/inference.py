@@ -0,0 +1,139 @@
+"""Bounded, thread-safe inference pool shared by every Streamlit session.
+
+Streamlit runs each session on its own thread; if every session calls
+``predict_proba`` on the shared pipeline, XGBoost starts one OpenMP team per
+call and N concurrent users end up with N x cores threads fighting for the
+CPU.  :class:`InferenceExecutor` funnels all calls through a fixed number of
+workers, each owning a private copy of the pipeline pinned to ``nthread``
+threads, behind a bounded queue with timeouts.
+
+    executor = InferenceExecutor(model, workers=4, nthread=1)
+    prob = executor.predict_proba(X)[0, 1]
+"""
+import copy
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+DEFAULT_QUEUE_SIZE = 64
+DEFAULT_TIMEOUT = 10.0
+
+
+class InferenceBusy(TimeoutError):
+    """Raised when a request cannot be queued or answered within its timeout."""
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+class InferenceExecutor:
+    def __init__(self, pipeline, workers=None, nthread=None, queue_size=None, timeout=DEFAULT_TIMEOUT):
+        self.nthread = nthread or _env_int("CORVIGIL_INFERENCE_NTHREAD", 1)
+        cores = os.cpu_count() or 1
+        self.workers = workers or _env_int("CORVIGIL_INFERENCE_WORKERS", max(1, cores // self.nthread))
+        self.timeout = timeout
+        self._closed = False
+        self._queue = queue.Queue(maxsize=queue_size or _env_int("CORVIGIL_INFERENCE_QUEUE", DEFAULT_QUEUE_SIZE))
+        self._threads = []
+        for i in range(self.workers):
+            model = copy.deepcopy(pipeline)
+            set_nthread(model, self.nthread)
+            thread = threading.Thread(target=self._work, args=(model,), name=f"inference-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, method, X, nthread=None, timeout=None) -> Future:
+        """Queue ``model.<method>(X)`` and return its future; raises :class:`InferenceBusy` if the queue stays full."""
+        if self._closed:
+            raise InferenceBusy("inference executor shut down")
+        future = Future()
+        try:
+            self._queue.put((future, method, X, nthread), timeout=self.timeout if timeout is None else timeout)
+        except queue.Full:
+            raise InferenceBusy("inference queue is full") from None
+        return future
+
+    def predict_proba(self, X, nthread=None, timeout=None):
+        return self._call("predict_proba", X, nthread, timeout)
+
+    def predict(self, X, nthread=None, timeout=None):
+        return self._call("predict", X, nthread, timeout)
+
+    def queued(self) -> int:
+        return self._queue.qsize()
+
+    def shutdown(self) -> int:
+        """Stop the workers without waiting for the queue to drain; returns the number of requests failed.
+
+        A request already running finishes; the ones still queued fail with :class:`InferenceBusy`.
+        """
+        self._closed = True
+        failed, sentinels = self._drain()
+        while sentinels < len(self._threads):
+            try:
+                self._queue.put_nowait(None)
+                sentinels += 1
+            except queue.Full:              # submits that raced past the closed check
+                more, taken = self._drain()
+                failed, sentinels = failed + more, sentinels - taken
+        for thread in self._threads:
+            thread.join()
+        return failed
+
+    def _drain(self):
+        """Fail every queued request; returns (requests failed, shutdown sentinels taken off the queue)."""
+        failed = sentinels = 0
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return failed, sentinels
+            if item is None:
+                sentinels += 1
+                continue
+            future = item[0]
+            if future.set_running_or_notify_cancel():
+                future.set_exception(InferenceBusy("inference executor shut down"))
+            failed += 1
+
+    def _call(self, method, X, nthread, timeout):
+        # one deadline for queueing and answering together
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        future = self.submit(method, X, nthread, timeout)
+        try:
+            return future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except TimeoutError:
+            future.cancel()
+            raise InferenceBusy(f"no inference result within {timeout:.1f}s") from None
+
+    def _work(self, model):
+        current = self.nthread
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            future, method, X, nthread = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                wanted = nthread or self.nthread
+                if wanted != current:
+                    set_nthread(model, wanted)
+                    current = wanted
+                future.set_result(getattr(model, method)(X))
+            except BaseException as exc:
+                future.set_exception(exc)
+
+
+def set_nthread(pipeline, nthread):
+    """Pin ``pipeline`` (sklearn/XGBoost or :class:`OnnxPipeline`) to ``nthread`` threads per call."""
+    if hasattr(pipeline, "set_nthread"):     # OnnxPipeline
+        pipeline.set_nthread(nthread)
+        return
+    # the booster picks its OpenMP team size from n_jobs at predict time
+    pipeline[-1].set_params(n_jobs=nthread)
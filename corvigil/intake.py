@@ -0,0 +1,207 @@
+"""One patient intake scored by both models at once.
+
+The cardiac and heart attack forms overlap (age, sex, systolic blood
+pressure, cholesterol, blood sugar) but encode those answers differently.
+:data:`INTAKE_FORM` asks for each shared value once, in clinical units, and
+:func:`split_intake` turns an intake into both apps' forms:
+
+* cholesterol in mg/dL is the heart attack model's ``Cholesterol``; the
+  cardiac model's 1..3 level uses the NCEP bands (< 200 normal, 200-239
+  above normal, >= 240 well above normal);
+* fasting glucose in mg/dL gives the cardiac ``gluc`` level by the ADA bands
+  (< 100, 100-125, >= 126) and the heart attack ``FastingBS`` flag (> 120);
+* systolic blood pressure is both ``ap_hi`` and ``RestingBP``.
+
+:func:`assess` then encodes each form (:mod:`corvigil.encoding`, clipped to
+the serving model's bounds like the cardiac app), queues both scores on the models'
+own inference executors and both explanations on a shared thread pool, and
+waits for all four, so a combined result takes about as long as the slower
+model rather than the sum of the two.
+
+    python -m corvigil.intake --age 61 --sex Male --systolic-bp 150 --cholesterol 260
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from corvigil.encoding import (CARDIAC_FORM, HEART_ATTACK_CHOICES, HEART_ATTACK_FORM, encode_cardiac_form,
+                               encode_heart_attack_form)
+from corvigil.schema import CARDIAC, HEART_ATTACK, SPECS
+
+# shared answers first, then each model's own
+INTAKE_FORM = ("age", "sex", "systolic_bp", "cholesterol", "glucose",
+               "height", "weight", "diastolic_bp", "smoke", "alco", "active",
+               "chest_pain", "max_hr", "oldpeak", "exercise_angina", "resting_ecg", "st_slope")
+INTAKE_DEFAULTS = {
+    "age": 55, "sex": "Female", "systolic_bp": 120, "cholesterol": 190, "glucose": 90,
+    "height": 165, "weight": 65.0, "diastolic_bp": 80, "smoke": 0, "alco": 0, "active": 1,
+    "chest_pain": "ASY", "max_hr": 150, "oldpeak": 0.0, "exercise_angina": "No", "resting_ecg": "Normal",
+    "st_slope": "Up",
+}
+CHOLESTEROL_BANDS = (200, 240)      # mg/dL where the cardiac levels 2 and 3 start
+GLUCOSE_BANDS = (100, 126)          # fasting mg/dL, same for the glucose levels
+FASTING_BS_CUTOFF = 120             # heart attack dataset: FastingBS = fasting glucose > 120 mg/dL
+
+
+def _level(value, bands) -> int:
+    return 1 + sum(value >= b for b in bands)
+
+
+def split_intake(values: dict) -> dict:
+    """The cardiac and heart attack forms (:mod:`corvigil.encoding` keys) for one intake."""
+    intake = {**INTAKE_DEFAULTS, **values}
+    male = intake["sex"] == "Male"
+    cardiac = {
+        "age": intake["age"], "gender": 2 if male else 1, "height": intake["height"], "weight": intake["weight"],
+        "ap_hi": intake["systolic_bp"], "ap_lo": intake["diastolic_bp"],
+        "cholesterol": _level(intake["cholesterol"], CHOLESTEROL_BANDS),
+        "gluc": _level(intake["glucose"], GLUCOSE_BANDS),
+        "smoke": int(intake["smoke"]), "alco": int(intake["alco"]), "active": int(intake["active"]),
+    }
+    heart_attack = {
+        "age": intake["age"], "sex": "Male" if male else "Female", "resting_bp": intake["systolic_bp"],
+        "cholesterol": intake["cholesterol"], "fasting_bs": "Yes" if intake["glucose"] > FASTING_BS_CUTOFF else "No",
+        **{k: intake[k] for k in ("chest_pain", "max_hr", "oldpeak", "exercise_angina", "resting_ecg", "st_slope")},
+    }
+    return {"cardiac": {k: cardiac[k] for k in CARDIAC_FORM},
+            "heart_attack": {k: heart_attack[k] for k in HEART_ATTACK_FORM}}
+
+
+def encode_intake(values: dict, bounds=None) -> dict:
+    """Model-ready one-row frames for both models; ``bounds`` clips the cardiac row like the app does."""
+    from corvigil.preprocess import apply_clip
+
+    forms = split_intake(values)
+    return {"cardiac": apply_clip(encode_cardiac_form(forms["cardiac"]), bounds or {}),
+            "heart_attack": encode_heart_attack_form(forms["heart_attack"])}
+
+
+@dataclass
+class Assessment:
+    """One model's answer to an intake."""
+    spec: object
+    form: dict
+    features: dict
+    probability: float
+    explanation: list
+    version: str
+    cached: bool
+    elapsed_s: float        # from the start of assess() until this model's answer was in
+    reference: str = None   # what the explanation is measured against (LoadedModel.reference)
+
+    @property
+    def flagged(self) -> bool:
+        return self.probability >= self.spec.threshold
+
+
+_pool = None
+
+
+def _explain_pool():
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(max_workers=2 * len(SPECS), thread_name_prefix="intake")
+    return _pool
+
+
+def assess(values: dict, models: dict, store=None, explain=True, parallel=True) -> dict:
+    """Score and explain one intake with every model in ``models``; returns ``{name: Assessment}``.
+
+    ``models`` maps ``"cardiac"`` / ``"heart_attack"`` to the serving
+    :class:`corvigil.reload.LoadedModel` (a missing one is skipped).  Results
+    already in ``store`` under that version are reused and new ones written
+    back, so the single-model apps and the intake share them.  Like in those
+    apps, every answer, stored or not, is counted in the model's drift
+    monitor and sent to its shadow evaluator, if it has them.  With
+    ``parallel=False`` each step waits for the previous one, which is what
+    the intake replaces.  Raises :class:`corvigil.inference.InferenceBusy`
+    like the apps' executors.
+    """
+    start = time.perf_counter()
+    forms = split_intake(values)
+    cardiac = models.get("cardiac")
+    frames = encode_intake(values, cardiac.bounds if cardiac is not None else None)
+    pending = {}
+    for name, live in models.items():
+        if live is None:
+            continue
+        spec, X = SPECS[name], frames[name]
+        cached = store.get(spec, X, live.version) if store is not None else None
+        if cached is not None:
+            pending[name] = (cached["probability"], cached["explanation"], True)
+            continue
+        explainer = live.explainer() if explain else None
+        score = live.executor.submit("predict_proba", X)
+        if not parallel:
+            _result(score, live.executor.timeout)
+        why = _explain_pool().submit(explainer.explain_factors, X) if explainer is not None else None
+        if why is not None and not parallel:
+            why.result()
+        pending[name] = (score, why, False)
+
+    out = {}
+    for name, (score, why, cached) in pending.items():
+        live, spec, X = models[name], SPECS[name], frames[name]
+        if cached:
+            prob, explanation = score, why
+        else:
+            prob = float(_result(score, live.executor.timeout)[0, 1])
+            explanation = why.result() if why is not None else None
+            if store is not None:
+                from corvigil.batch import risk_zone_codes
+                from corvigil.schema import LABELS
+
+                store.put(spec, X, {"probability": prob, "risk_zone": LABELS[risk_zone_codes([prob])[0]],
+                                    "explanation": explanation}, live.version)
+        shadow = live.shadow()
+        if shadow is not None:
+            shadow.submit(X, prob)
+        if live.monitor is not None:
+            live.monitor.update(X.iloc[0].to_dict())
+        # from the sidecar: a stored answer must not build the TreeSHAP explainer just for this
+        out[name] = Assessment(spec, forms[name], X.iloc[0].to_dict(), prob, explanation, live.version, cached,
+                               time.perf_counter() - start, live.reference if explain else None)
+    return out
+
+
+def _result(future, timeout):
+    from corvigil.inference import InferenceBusy
+
+    try:
+        return future.result(timeout=timeout)
+    except TimeoutError:
+        future.cancel()
+        raise InferenceBusy(f"no inference result within {timeout:.1f}s") from None
+
+
+def main(argv=None):
+    from corvigil.reload import LoadedModel
+
+    parser = argparse.ArgumentParser(description="Score one patient intake with both models")
+    for field in INTAKE_FORM:
+        default = INTAKE_DEFAULTS[field]
+        parser.add_argument(f"--{field.replace('_', '-')}", type=type(default), default=default,
+                            choices=HEART_ATTACK_CHOICES.get(field))
+    parser.add_argument("--sequential", action="store_true", help="one step after the other, for comparison")
+    args = parser.parse_args(argv)
+
+    models = {spec.name: LoadedModel.load(spec) for spec in (CARDIAC, HEART_ATTACK)}
+    try:
+        values = {field: getattr(args, field) for field in INTAKE_FORM}
+        start = time.perf_counter()
+        result = assess(values, models, parallel=not args.sequential)
+        elapsed = time.perf_counter() - start
+    finally:
+        for live in models.values():
+            live.close()
+    for name, a in result.items():
+        top = ", ".join(f"{f['factor']} {f['impact'] * 100:+.1f}" for f in (a.explanation or [])[:3])
+        print(f"{name:<13} {a.probability:.4f} ({'flagged' if a.flagged else 'below'} {a.spec.threshold:.2f}, "
+              f"version {a.version[:8]})" + (f"  {top}" if top else ""))
+    print(f"{'sequential' if args.sequential else 'concurrent'} in {elapsed * 1000:.0f} ms "
+          "(first call includes building the explainers)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""ONNX export of the exported pipelines and an onnxruntime inference backend.
+
+    python -m corvigil.onnx_backend export heart_attack     # -> models/heart_attack_detection.onnx
+    python -m corvigil.onnx_backend check heart_attack
+
+The graph takes the raw feature matrix in ``spec.features`` order as
+float64, applies the fitted RobustScaler in float64 (as sklearn does) and
+casts to float32 only in front of the tree ensemble, where XGBoost casts
+too; scaling in float32 instead moves probabilities by up to 0.04.
+``export`` refuses to write a graph that fails the parity check against
+``predict_proba``.
+
+:class:`OnnxPipeline` is a drop-in for the joblib pipeline's
+``predict_proba``/``predict``: one pre-created session, and a fixed
+IO binding over a preallocated one-row buffer for the single-patient calls
+the apps make.  The apps pick it with ``CORVIGIL_BACKEND=onnx`` (see
+:func:`load_backend`).  Serving needs ``onnxruntime`` (requirements.txt);
+exporting also needs ``onnx`` and ``onnxmltools`` (requirements-dev.txt).
+Parity is measured on the cached test split (:func:`parity_samples`).
+"""
+import argparse
+import os
+import threading
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from corvigil.schema import SPECS, get_spec
+
+OPSET = 15
+ML_OPSET = 1
+PARITY_ATOL = 1e-5
+
+
+def onnx_path(spec):
+    return spec.model_path.with_suffix(".onnx")
+
+
+def _preprocess_nodes(pipeline, spec):
+    """Nodes mapping ``input`` (float64, spec.features order) to ``features`` (float32, model order)."""
+    from onnx import TensorProto, helper, numpy_helper
+
+    nodes, inits, parts = [], [], []
+    for name, transformer, cols in pipeline[0].transformers_:
+        if transformer == "drop" or not len(cols):
+            continue
+        idx = numpy_helper.from_array(np.array([spec.features.index(c) for c in cols], dtype=np.int64),
+                                      f"{name}_idx")
+        inits.append(idx)
+        out = f"{name}_in"
+        nodes.append(helper.make_node("Gather", ["input", idx.name], [out], axis=1))
+        if hasattr(transformer, "center_"):     # RobustScaler
+            if transformer.with_centering:
+                inits.append(numpy_helper.from_array(transformer.center_.astype(np.float64), f"{name}_center"))
+                nodes.append(helper.make_node("Sub", [out, f"{name}_center"], [f"{name}_centered"]))
+                out = f"{name}_centered"
+            if transformer.with_scaling:
+                inits.append(numpy_helper.from_array(transformer.scale_.astype(np.float64), f"{name}_scale"))
+                nodes.append(helper.make_node("Div", [out, f"{name}_scale"], [f"{name}_scaled"]))
+                out = f"{name}_scaled"
+        elif transformer != "passthrough" and type(transformer).__name__ != "FunctionTransformer":
+            raise TypeError(f"no ONNX mapping for {type(transformer).__name__} in '{name}'")
+        parts.append(out)
+    nodes.append(helper.make_node("Concat", parts, ["concat"], axis=1))
+    nodes.append(helper.make_node("Cast", ["concat"], ["features"], to=TensorProto.FLOAT))
+    return nodes, inits
+
+
+def to_onnx(pipeline, spec):
+    """One ONNX model for RobustScaler + XGBClassifier; outputs ``label`` and ``probabilities``."""
+    from onnx import TensorProto, checker, helper
+    from onnxmltools.convert import convert_xgboost
+    from onnxmltools.convert.common.data_types import FloatTensorType
+
+    n = len(spec.features)
+    trees = convert_xgboost(pipeline[-1], initial_types=[("features", FloatTensorType([None, n]))],
+                            target_opset=OPSET).graph
+    nodes, inits = _preprocess_nodes(pipeline, spec)
+    graph = helper.make_graph(
+        nodes + list(trees.node), f"corvigil_{spec.name}",
+        [helper.make_tensor_value_info("input", TensorProto.DOUBLE, [None, n])],
+        list(trees.output), initializer=inits + list(trees.initializer))
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", OPSET),
+                                                    helper.make_opsetid("ai.onnx.ml", ML_OPSET)])
+    model.ir_version = 8
+    model.doc_string = f"{spec.name}: inputs in order {', '.join(spec.features)}"
+    checker.check_model(model)
+    return model
+
+
+class OnnxPipeline:
+    """onnxruntime stand-in for the sklearn pipeline (``predict_proba``/``predict`` only)."""
+
+    def __init__(self, model_bytes, spec, nthread=1):
+        self.model_bytes = model_bytes
+        self.spec = spec
+        self.threshold = 0.5     # like XGBClassifier.predict
+        self._local = threading.local()
+        self.set_nthread(nthread)
+
+    @classmethod
+    def load(cls, spec, path=None, nthread=1):
+        with open(path or onnx_path(spec), "rb") as fh:
+            return cls(fh.read(), spec, nthread)
+
+    def set_nthread(self, nthread):
+        import onnxruntime as ort
+
+        opts = ort.SessionOptions()
+        opts.intra_op_num_threads = nthread
+        opts.inter_op_num_threads = 1
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.nthread = nthread
+        self.session = ort.InferenceSession(self.model_bytes, opts, providers=["CPUExecutionProvider"])
+        self._local = threading.local()
+
+    def _single_row_binding(self):
+        # IO bindings are not thread-safe: one buffer + binding per calling thread
+        local = self._local
+        if not hasattr(local, "binding"):
+            local.row = np.zeros((1, len(self.spec.features)), dtype=np.float64)
+            local.binding = self.session.io_binding()
+            local.binding.bind_cpu_input("input", local.row)
+            local.binding.bind_output("probabilities")
+        return local.row, local.binding
+
+    def _matrix(self, X):
+        if isinstance(X, pd.DataFrame):
+            X = X[list(self.spec.features)]
+        return np.ascontiguousarray(X, dtype=np.float64)
+
+    def predict_proba(self, X):
+        X = self._matrix(X)
+        if X.shape[0] == 1:
+            row, binding = self._single_row_binding()
+            row[:] = X
+            self.session.run_with_iobinding(binding)
+            return binding.copy_outputs_to_cpu()[0]
+        return self.session.run(["probabilities"], {"input": X})[0]
+
+    def predict(self, X):
+        return (self.predict_proba(X)[:, 1] >= self.threshold).astype(int)
+
+    def __deepcopy__(self, memo):
+        # InferenceExecutor copies the model per worker: give each its own session
+        return OnnxPipeline(self.model_bytes, self.spec, self.nthread)
+
+
+def parity_samples(spec, n=2000, seed=0) -> pd.DataFrame:
+    """Up to ``n`` rows of the cached test split, or random app-form patients when there is none.
+
+    The split is built from ``Data/`` when the raw file is there; without it
+    the most recent cached split is used.  Only a cardiac model with neither
+    falls back to random forms, which cover the app's input ranges but not
+    the real data distribution.
+    """
+    from corvigil.featcache import FeatureCache
+
+    rng = np.random.default_rng(seed)
+    cache = FeatureCache()
+    split = cache.load(spec) if spec.data_path.exists() else cache.latest(spec)
+    if split is not None:
+        X = split.frame("X_test")[list(spec.features)]
+        rows = np.sort(rng.choice(len(X), n, replace=False)) if len(X) > n else np.arange(len(X))
+        return X.iloc[rows].astype(float).reset_index(drop=True)
+    from corvigil.encoding import encode_cardiac_form
+
+    if spec.name != "cardiac":
+        raise FileNotFoundError(spec.data_path)
+    forms = pd.DataFrame({
+        "age": rng.integers(18, 101, n), "gender": rng.integers(1, 3, n),
+        "height": rng.integers(120, 221, n), "weight": rng.integers(30, 201, n),
+        "ap_hi": rng.integers(80, 251, n), "ap_lo": rng.integers(40, 151, n),
+        "cholesterol": rng.integers(1, 4, n), "gluc": rng.integers(1, 4, n),
+        "smoke": rng.integers(0, 2, n), "alco": rng.integers(0, 2, n), "active": rng.integers(0, 2, n),
+    })
+    return encode_cardiac_form(forms)
+
+
+def parity(pipeline, backend, X) -> dict:
+    """Max/mean absolute probability difference and risk-zone agreement on ``X``."""
+    from corvigil.batch import risk_zone_codes
+
+    expected = pipeline.predict_proba(X)[:, 1]
+    got = backend.predict_proba(X)[:, 1]
+    single = np.array([backend.predict_proba(X.iloc[[i]])[0, 1] for i in range(min(len(X), 200))])
+    diff = np.abs(expected - got)
+    return {"rows": len(X), "max_abs_diff": float(diff.max()), "mean_abs_diff": float(diff.mean()),
+            "single_row_max_abs_diff": float(np.abs(expected[:len(single)] - single).max()),
+            "zone_agreement": float((risk_zone_codes(expected) == risk_zone_codes(got)).mean())}
+
+
+def export(spec, pipeline=None, path=None, atol=PARITY_ATOL):
+    pipeline = pipeline if pipeline is not None else joblib.load(spec.model_path)
+    model = to_onnx(pipeline, spec)
+    backend = OnnxPipeline(model.SerializeToString(), spec)
+    report = parity(pipeline, backend, parity_samples(spec))
+    if report["max_abs_diff"] > atol or report["single_row_max_abs_diff"] > atol:
+        raise ValueError(f"ONNX graph fails parity (atol {atol}): {report}")
+    path = path or onnx_path(spec)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as fh:
+        fh.write(backend.model_bytes)
+    os.replace(tmp, path)
+    return path, report
+
+
+def load_backend(spec, backend=None):
+    """The pipeline the apps score with: ``sklearn`` (joblib, default) or ``onnx``.
+
+    ``backend`` defaults to the ``CORVIGIL_BACKEND`` environment variable.
+    """
+    backend = (backend or os.environ.get("CORVIGIL_BACKEND") or "sklearn").lower()
+    if backend == "onnx":
+        return OnnxPipeline.load(spec)
+    if backend == "sklearn":
+        return joblib.load(spec.model_path)
+    raise ValueError(f"Unknown backend '{backend}', expected 'sklearn' or 'onnx'")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export a pipeline to ONNX or check an exported graph")
+    parser.add_argument("command", choices=["export", "check"])
+    parser.add_argument("model", choices=sorted(SPECS))
+    parser.add_argument("-o", "--output", help="ONNX file (default: next to the .pkl)")
+    args = parser.parse_args(argv)
+
+    spec = get_spec(args.model)
+    if args.command == "export":
+        path, report = export(spec, path=args.output)
+        print(f"Wrote {path} ({os.path.getsize(path) / 1024:.0f} KB)")
+    else:
+        report = parity(joblib.load(spec.model_path), OnnxPipeline.load(spec, args.output), parity_samples(spec))
+    for key, value in report.items():
+        print(f"{key:<24} {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""The notebook preprocessing steps, as plain functions with explicit parameters."""
+import pandas as pd
+from sklearn.model_selection import train_test_split
+
+# column -> (lower quantile, upper quantile), as in cardiac_failure_prediction_model.ipynb
+CARDIAC_CLIP = {
+    "ap_hi": (0.01, 0.99),
+    "height": (0.01, 0.99),
+    "weight": (0.01, 0.99),
+    "ap_lo": (0.01, 0.98),
+}
+
+DEFAULT_PARAMS = {
+    "cardiac": {"clip": CARDIAC_CLIP, "test_size": 0.2, "random_state": 42},
+    "heart_attack": {"clip": {}, "test_size": 0.2, "random_state": 42},
+}
+
+
+def default_params(spec) -> dict:
+    return {key: (dict(value) if isinstance(value, dict) else value)
+            for key, value in DEFAULT_PARAMS[spec.name].items()}
+
+
+def clip_bounds(df: pd.DataFrame, clip: dict) -> dict:
+    """Exact quantile clip bounds, ``{column: (lower, upper)}``."""
+    return {col: (float(df[col].quantile(lo)), float(df[col].quantile(hi)))
+            for col, (lo, hi) in clip.items()}
+
+
+def apply_clip(df: pd.DataFrame, bounds: dict) -> pd.DataFrame:
+    for col, (lower, upper) in bounds.items():
+        df[col] = df[col].clip(lower, upper)
+    return df
+
+
+def encode_cardiac(df: pd.DataFrame) -> pd.DataFrame:
+    df["gender"] = df["gender"] - 1
+    df["cholesterol"] = (df["cholesterol"] - 1) / 2
+    df["bmi"] = df["weight"] / ((df["height"] / 100) ** 2)
+    return df
+
+
+def prepare(df: pd.DataFrame, spec, params=None):
+    """Raw training frame -> ``(X, y, bounds)`` with the notebook's cleaning applied.
+
+    bmi is computed before height and weight are clipped, matching the notebook.
+    """
+    params = params or default_params(spec)
+    df = df.drop(columns=[c for c in spec.drop_cols if c in df.columns])
+    if spec.name == "cardiac":
+        df = encode_cardiac(df)
+    bounds = params.get("bounds") or clip_bounds(df, params.get("clip", {}))
+    df = apply_clip(df, bounds)
+    return df[list(spec.features)], df[spec.target], bounds
+
+
+def split(X, y, params):
+    return train_test_split(X, y, test_size=params["test_size"],
+                            random_state=params["random_state"], stratify=y)
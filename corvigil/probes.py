@@ -0,0 +1,216 @@
+"""Health and latency checks for the apps listed on the hub.
+
+:func:`probe_all` checks every target concurrently on one asyncio loop,
+each under its own timeout, so a hung app costs the page one timeout and
+not one per app.  :class:`HealthCache` keeps the latest results with a TTL
+and refreshes them on a background thread: ``get`` never waits on the
+network, it returns what it has (``None`` until the first check lands).
+
+    python -m corvigil.probes check https://example.org/ http://localhost:8501/_stcore/health
+    python -m corvigil.probes serve --port 8765
+
+``serve`` starts :class:`StandInServer`, a local target with healthy, slow,
+failing and hanging routes to exercise the checks without the real apps.
+"""
+import argparse
+import asyncio
+import ssl
+import statistics
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+@dataclass(frozen=True)
+class ProbeResult:
+    url: str
+    up: bool
+    status: int = 0            # HTTP status, 0 when no response arrived
+    latency_ms: float = 0.0    # connect + request + status line
+    error: str = ""
+    checked_at: float = 0.0
+
+
+async def probe(url: str, timeout: float = 3.0) -> ProbeResult:
+    """GET ``url`` and read the status line; any status below 500 counts as up."""
+    start = time.perf_counter()
+    try:
+        status = await asyncio.wait_for(_status(url), timeout)
+    except asyncio.TimeoutError:
+        return ProbeResult(url, False, error=f"timeout after {timeout:g}s", checked_at=time.time())
+    except (OSError, ValueError) as exc:
+        return ProbeResult(url, False, error=str(exc) or type(exc).__name__, checked_at=time.time())
+    latency = (time.perf_counter() - start) * 1000
+    return ProbeResult(url, status < 500, status, latency, checked_at=time.time())
+
+
+async def _status(url: str) -> int:
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https"):
+        raise ValueError(f"unsupported URL: {url!r}")
+    secure = parts.scheme == "https"
+    port = parts.port or (443 if secure else 80)
+    reader, writer = await asyncio.open_connection(
+        parts.hostname, port, ssl=ssl.create_default_context() if secure else None)
+    try:
+        path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: {parts.netloc}\r\nUser-Agent: corvigil-probe\r\n"
+                     f"Connection: close\r\n\r\n".encode())
+        await writer.drain()
+        line = await reader.readline()
+        fields = line.decode("latin-1").split()
+        if len(fields) < 2 or not fields[1].isdigit():
+            raise ValueError(f"bad status line {line[:40]!r}")
+        return int(fields[1])
+    finally:
+        writer.close()
+
+
+async def _probe_all(urls, timeout):
+    return await asyncio.gather(*(probe(u, timeout) for u in urls))
+
+
+def probe_all(urls, timeout: float = 3.0) -> dict:
+    """``{url: ProbeResult}``; takes about the slowest target's time, at most ``timeout``."""
+    urls = list(dict.fromkeys(urls))
+    return {r.url: r for r in asyncio.run(_probe_all(urls, timeout))}
+
+
+class HealthCache:
+    """Latest probe results with a TTL, refreshed off the caller's thread.
+
+    ``get(urls)`` returns ``{url: ProbeResult | None}`` straight from memory
+    and, when the results are older than ``ttl`` seconds, starts one
+    background refresh (never more than one at a time).  The last
+    ``history`` latencies per target back :meth:`recent_latency_ms`.
+    """
+
+    def __init__(self, ttl: float = 30.0, timeout: float = 3.0, history: int = 10):
+        self.ttl = ttl
+        self.timeout = timeout
+        self._results = {}
+        self._latencies = {}
+        self._history = history
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._urls = set()
+
+    def get(self, urls) -> dict:
+        urls = list(urls)
+        with self._lock:
+            new = set(urls) - self._urls
+            self._urls.update(urls)
+            stale = new or time.monotonic() - self._checked_at >= self.ttl
+            if stale and not self._refreshing:
+                self._refreshing = True
+                threading.Thread(target=self._refresh, name="health-probe", daemon=True).start()
+            return {u: self._results.get(u) for u in urls}
+
+    def recent_latency_ms(self, url):
+        """Median latency over the recent successful checks of ``url``."""
+        with self._lock:
+            samples = list(self._latencies.get(url, ()))
+        return statistics.median(samples) if samples else None
+
+    def refresh(self):
+        """Probe every known target now, on the calling thread."""
+        with self._lock:
+            urls = sorted(self._urls)
+        results = probe_all(urls, self.timeout)
+        with self._lock:
+            self._results.update(results)
+            for url, r in results.items():
+                if r.up:
+                    self._latencies.setdefault(url, deque(maxlen=self._history)).append(r.latency_ms)
+            self._checked_at = time.monotonic()
+        return results
+
+    def _refresh(self):
+        try:
+            self.refresh()
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+
+# ---------------- LOCAL STAND-IN ----------------
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    """``/ok``, ``/slow?ms=N``, ``/status/<code>``, ``/hang`` (never answers)."""
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        if parts.path == "/hang":
+            self.server.stopped.wait()
+            return
+        if parts.path == "/slow":
+            time.sleep(int(parse_qs(parts.query).get("ms", ["500"])[0]) / 1000)
+        code = int(parts.path.rsplit("/", 1)[1]) if parts.path.startswith("/status/") else 200
+        body = b"ok" if code < 400 else b"error"
+        self.send_response(code)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StandInServer:
+    """Local HTTP target on a background thread; use as a context manager.
+
+        with StandInServer() as server:
+            probe_all([server.url("/ok"), server.url("/hang")], timeout=0.5)
+    """
+
+    def __init__(self, host="127.0.0.1", port=0):
+        self.httpd = ThreadingHTTPServer((host, port), _StandInHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.stopped = threading.Event()
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def url(self, path="/ok") -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}{path}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.stopped.set()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Probe app health or run the local stand-in target")
+    sub = parser.add_subparsers(dest="command", required=True)
+    check = sub.add_parser("check", help="probe URLs concurrently")
+    check.add_argument("urls", nargs="+")
+    check.add_argument("--timeout", type=float, default=3.0)
+    serve = sub.add_parser("serve", help="run the stand-in server until interrupted")
+    serve.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args(argv)
+
+    if args.command == "check":
+        start = time.perf_counter()
+        for r in probe_all(args.urls, args.timeout).values():
+            state = f"up   {r.status} {r.latency_ms:7.1f} ms" if r.up else f"DOWN {r.status or '-'} {r.error}"
+            print(f"{state:<40} {r.url}")
+        print(f"checked {len(args.urls)} targets in {(time.perf_counter() - start) * 1000:.0f} ms")
+    else:
+        with StandInServer(port=args.port) as server:
+            print(f"Stand-in target on {server.url('/')} (/ok, /slow?ms=N, /status/<code>, /hang); Ctrl+C to stop")
+            try:
+                threading.Event().wait()
+            except KeyboardInterrupt:
+                pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+"""Hot reload of an exported model while the app keeps serving.
+
+``st.cache_resource`` keeps the first pipeline a process loads until it
+exits, so deploying a new ``.pkl`` used to mean a restart and a cold start
+for every user.  A :class:`ModelWatcher` owns the serving model instead:
+
+* a daemon thread polls the model's files every ``interval`` seconds --
+  ``models/<stem>.pkl``, its ``.meta.json`` sidecar and, with
+  ``CORVIGIL_BACKEND=onnx``, the ``.onnx`` graph -- and only acts once
+  their size and mtime are unchanged across two polls, so a file still
+  being copied is never loaded;
+* the new version is loaded into a fresh :class:`LoadedModel` (pipeline,
+  scoring backend and its own ``InferenceExecutor``), every executor
+  worker is warmed up on a smoke batch, and so is the explainer if the
+  serving version has built one;
+* it is validated on that batch: the pipeline takes ``spec.features``,
+  every probability is finite and in [0, 1], they are not all the same
+  and, with the ONNX backend, the graph agrees with the ``.pkl`` within
+  the export tolerance (a graph left over from an older ``.pkl`` does
+  not).  A version that fails is logged, kept in ``last_error`` and not
+  retried until the files change again; the old one keeps serving;
+* the swap is one reference assignment.  A request reads
+  ``watcher.current`` once and uses that snapshot throughout, so requests
+  in flight finish on the version they started on; the old executor is
+  shut down ``grace`` seconds after the swap.
+
+``python -m corvigil.update --promote`` replaces the ``.pkl`` with
+``os.replace``, which is what makes a deploy atomic on disk.
+:attr:`LoadedModel.version` is the result-store model key of the bytes
+that were loaded (pipeline and, for ONNX, graph digest, backend,
+explanation background), so
+cached results follow the version that produced them.
+
+The cardiac clip bounds, population explanations, drift monitor and
+shadow evaluator belong to the :class:`LoadedModel` too, so a swap never
+serves the new pipeline with the old model's sidecar.
+
+``CORVIGIL_RELOAD_INTERVAL`` sets the poll interval (default 5 s; ``0``
+turns watching off).
+
+    python -m corvigil.reload check heart_attack
+"""
+import argparse
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+import joblib
+import numpy as np
+
+from corvigil.artifacts import load_meta, meta_path
+from corvigil.inference import DEFAULT_TIMEOUT, InferenceExecutor
+from corvigil.onnx_backend import PARITY_ATOL, OnnxPipeline, load_backend, onnx_path, parity_samples
+from corvigil.schema import SPECS, get_spec
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL = 5.0
+DEFAULT_GRACE = 3 * DEFAULT_TIMEOUT
+SMOKE_ROWS = 256
+
+
+class ModelInvalid(ValueError):
+    """Raised when a loaded model fails the smoke-batch checks."""
+
+
+def _stat(path):
+    try:
+        st = os.stat(path)
+        return st.st_mtime_ns, st.st_size
+    except FileNotFoundError:
+        return None
+
+
+class LoadedModel:
+    """One loaded version of a model: the pipeline, its scoring backend and executor.
+
+    Everything the apps derive from the ``.meta.json`` sidecar comes from the
+    copy read with the pipeline and is swapped with it: the cardiac clip
+    ``bounds``, the ``population`` explanations, the drift ``monitor`` and
+    (built on first use, like the explainer) the ``shadow`` evaluator.
+    """
+
+    def __init__(self, spec, pipeline, scorer, version, backend="sklearn", meta=None, **executor_kwargs):
+        from corvigil.cleaning import serving_bounds
+        from corvigil.drift import DriftMonitor
+        from corvigil.explain import load_explanations
+
+        self.spec = spec
+        self.pipeline = pipeline
+        self.backend = backend
+        self.version = version
+        self.meta = load_meta(spec.model_path) if meta is None else meta
+        self.bounds = serving_bounds(spec, self.meta)
+        self.population = load_explanations(spec, self.meta)
+        self.monitor = DriftMonitor.for_model(spec, self.meta)
+        self.executor = InferenceExecutor(scorer, **executor_kwargs)
+        self.loaded_at = datetime.now()
+        updates = self.meta.get("updates") or [{}]
+        self.promoted_at = updates[-1].get("promoted_at")
+        self._explainer = None
+        self._explained = False
+        self._shadow = None
+        self._shadowed = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, spec, backend=None, **executor_kwargs):
+        """Load the artifacts currently on disk (each read once, so version and sidecar match what was loaded)."""
+        from corvigil.results import model_key
+
+        backend = (backend or os.environ.get("CORVIGIL_BACKEND") or "sklearn").lower()
+        data = spec.model_path.read_bytes()
+        try:
+            meta = json.loads(meta_path(spec.model_path).read_text())
+        except FileNotFoundError:
+            meta = {}
+        pipeline = joblib.load(io.BytesIO(data))
+        digest = hashlib.sha256(data)
+        if backend == "onnx":
+            graph = onnx_path(spec).read_bytes()
+            scorer = OnnxPipeline(graph, spec)
+            digest.update(graph)            # a re-exported graph is a new version too
+        else:
+            scorer = pipeline if backend == "sklearn" else load_backend(spec, backend)
+        version = model_key(spec, backend, digest.hexdigest(), meta)
+        return cls(spec, pipeline, scorer, version, backend, meta, **executor_kwargs)
+
+    @property
+    def label(self) -> str:
+        """Short version shown in the apps."""
+        return self.version[:8]
+
+    @property
+    def reference(self):
+        """What this version's explanations are measured against, without building the explainer."""
+        from corvigil.attribution import load_background, reference_population
+
+        background = load_background(self.spec, self.meta)
+        return reference_population(background) if background is not None else None
+
+    @property
+    def has_explainer(self) -> bool:
+        return self._explained
+
+    def explainer(self):
+        """This version's :class:`PatientExplainer` (``None`` without a stored background), built on first use."""
+        with self._lock:
+            if not self._explained:
+                from corvigil.attribution import PatientExplainer
+
+                self._explainer = PatientExplainer.for_model(self.spec, self.pipeline, meta=self.meta)
+                self._explained = True
+        return self._explainer
+
+    def shadow(self):
+        """This version's :class:`ShadowEvaluator` (``None`` unless ``CORVIGIL_SHADOW`` is on), started on first use."""
+        with self._lock:
+            if not self._shadowed:
+                from corvigil.shadow import ShadowEvaluator
+
+                self._shadow = ShadowEvaluator.for_model(self.spec, self.spec.threshold)
+                self._shadowed = True
+        return self._shadow
+
+    def close(self):
+        self.executor.shutdown()
+        with self._lock:
+            shadow, self._shadow, self._shadowed = self._shadow, None, True
+        if shadow is not None:
+            shadow.close(timeout=DEFAULT_TIMEOUT)
+
+
+def check(loaded: LoadedModel, X) -> np.ndarray:
+    """Warm up every executor worker on ``X`` and validate the probabilities; raises :class:`ModelInvalid`."""
+    expected = list(loaded.spec.features)
+    fitted = getattr(loaded.pipeline, "feature_names_in_", None)
+    if fitted is not None and sorted(fitted) != sorted(expected):
+        raise ModelInvalid(f"pipeline expects {list(fitted)}, the app sends {expected}")
+    futures = [loaded.executor.submit("predict_proba", X) for _ in range(loaded.executor.workers)]
+    prob = futures[0].result()
+    for future in futures[1:]:
+        future.result()
+    prob = np.asarray(prob)
+    if prob.shape != (len(X), 2):
+        raise ModelInvalid(f"predict_proba returned shape {prob.shape} for {len(X)} rows")
+    if not np.isfinite(prob).all() or prob.min() < 0 or prob.max() > 1:
+        raise ModelInvalid("predict_proba returned values outside [0, 1]")
+    if np.ptp(prob[:, 1]) == 0:
+        raise ModelInvalid(f"every smoke row scored {prob[0, 1]:.4f}")
+    if loaded.backend != "sklearn":
+        diff = float(np.abs(prob[:, 1] - loaded.pipeline.predict_proba(X)[:, 1]).max())
+        if diff > PARITY_ATOL:
+            raise ModelInvalid(f"{loaded.backend} and the pipeline disagree by up to {diff:.2g} "
+                               f"(tolerance {PARITY_ATOL:g}); was the graph exported from this .pkl?")
+    return prob[:, 1]
+
+
+class ModelWatcher:
+    """Serves the newest valid version of ``spec``'s model; see the module docstring."""
+
+    def __init__(self, spec, interval=None, grace=DEFAULT_GRACE, backend=None, smoke=None, **executor_kwargs):
+        self.spec = spec
+        self.backend = (backend or os.environ.get("CORVIGIL_BACKEND") or "sklearn").lower()
+        if interval is None:
+            interval = float(os.environ.get("CORVIGIL_RELOAD_INTERVAL", DEFAULT_INTERVAL))
+        self.interval = interval
+        self.grace = grace
+        self.last_error = None
+        self.reloads = 0
+        self._smoke = smoke
+        self._executor_kwargs = executor_kwargs
+        self._lock = threading.Lock()
+        self._retired = []                  # (shutdown after, LoadedModel)
+        self._failed = None                 # file state of the last version that failed
+        self._loaded = self._state()
+        self._current = self._load(None)
+        self._stop = threading.Event()
+        self._thread = None
+        if self.interval > 0:
+            self._thread = threading.Thread(target=self._watch, name=f"reload-{spec.name}", daemon=True)
+            self._thread.start()
+
+    @property
+    def current(self) -> LoadedModel:
+        """The serving version; take it once per request and use that snapshot throughout."""
+        return self._current
+
+    def smoke(self):
+        if self._smoke is None:
+            self._smoke = parity_samples(self.spec, SMOKE_ROWS)
+        return self._smoke
+
+    def reload(self) -> bool:
+        """Load, warm up and validate the files on disk now, and swap them in if they pass."""
+        state = self._state()
+        start = time.perf_counter()
+        try:
+            loaded = self._load(self._current)
+        except Exception as exc:
+            self._failed = state
+            self.last_error = f"{type(exc).__name__}: {exc}"
+            logger.error("%s: keeping model %s, new version rejected: %s", self.spec.name,
+                         self._current.label, self.last_error, exc_info=not isinstance(exc, ModelInvalid))
+            return False
+        with self._lock:
+            old, self._current = self._current, loaded
+            self._loaded, self._failed, self.last_error = state, None, None
+            self.reloads += 1
+            self._retired.append((time.monotonic() + self.grace, old))
+        logger.info("%s: swapped model %s -> %s (loaded, warmed up and validated in %.2f s)",
+                    self.spec.name, old.label, loaded.label, time.perf_counter() - start)
+        return True
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        with self._lock:
+            retired, self._retired = self._retired, []
+        for _, old in retired:
+            old.close()
+        self._current.close()
+
+    def _paths(self):
+        paths = [self.spec.model_path, meta_path(self.spec.model_path)]
+        if self.backend == "onnx":
+            paths.append(onnx_path(self.spec))
+        return paths
+
+    def _state(self):
+        return tuple(_stat(p) for p in self._paths())
+
+    def _load(self, serving):
+        loaded = LoadedModel.load(self.spec, self.backend, **self._executor_kwargs)
+        try:
+            check(loaded, self.smoke())
+            if serving is not None and serving.has_explainer:
+                loaded.explainer()
+        except BaseException:
+            loaded.close()
+            raise
+        return loaded
+
+    def _retire(self):
+        now = time.monotonic()
+        with self._lock:
+            due = [m for t, m in self._retired if t <= now]
+            self._retired = [(t, m) for t, m in self._retired if t > now]
+        for old in due:
+            old.close()
+
+    def _watch(self):
+        pending = None
+        while not self._stop.wait(self.interval):
+            self._retire()
+            state = self._state()
+            if state[0] is None or state in (self._loaded, self._failed):
+                pending = None              # .pkl missing mid-deploy, or nothing new
+            elif state != pending:
+                pending = state             # changed since the last poll: let it settle first
+            else:
+                pending = None
+                self.reload()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load, warm up and validate an exported model as the apps would")
+    parser.add_argument("command", choices=["check"])
+    parser.add_argument("model", choices=sorted(SPECS))
+    parser.add_argument("--backend", choices=["sklearn", "onnx"], help="defaults to CORVIGIL_BACKEND or sklearn")
+    args = parser.parse_args(argv)
+
+    spec = get_spec(args.model)
+    start = time.perf_counter()
+    loaded = LoadedModel.load(spec, args.backend)
+    try:
+        prob = check(loaded, parity_samples(spec, SMOKE_ROWS))
+    except ModelInvalid as exc:
+        raise SystemExit(f"{spec.name}: version {loaded.label} rejected: {exc}")
+    finally:
+        loaded.close()
+    print(f"{spec.name}: version {loaded.label} ({loaded.backend}) loaded, warmed up and valid "
+          f"in {time.perf_counter() - start:.2f} s")
+    print(f"  smoke batch of {len(prob)} rows: mean probability {prob.mean():.4f}, "
+          f"{(prob >= spec.threshold).mean():.1%} at or above {spec.threshold:.2f}")
+    if loaded.promoted_at:
+        print(f"  promoted at {loaded.promoted_at}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""Self-contained HTML assessment reports, rendered off the Streamlit session thread.
+
+The gauge is inline SVG (no browser or kaleido needed).  Everything that
+does not depend on the patient (gauge zones, the CorVigil banner from
+``assets/``, the stylesheet) is built once per process and cached, so a
+report is a few string substitutions.
+
+In the apps, :func:`submit` hands rendering to a small background pool and
+the page offers the file once the future is done.  For many patients:
+
+    python -m corvigil.reports cardiac patients.csv -o reports/ --workers 4
+
+where ``patients.csv`` holds the app's form fields (see ``corvigil.encoding``).
+"""
+import argparse
+import base64
+import html
+import io
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from corvigil.batch import risk_zone_codes
+from corvigil.encoding import encode_cardiac_form, encode_heart_attack_form
+from corvigil.schema import BINS, LABELS, ROOT, SPECS, get_spec
+
+ASSETS_DIR = ROOT / "assets"
+ZONE_COLORS = ["#d4edda", "#d1ecf1", "#fff3cd", "#f8d7da", "#f5c6cb"]
+LEVELS = {1: "Normal", 2: "Above Normal", 3: "Well Above Normal"}
+
+REPORT_CSS = """
+body{font-family:Inter,-apple-system,'Segoe UI',Roboto,sans-serif;color:#1e293b;max-width:880px;margin:2rem auto;padding:0 1.5rem}
+.banner{width:100%;border-radius:16px;margin-bottom:1rem}
+h1{font-size:2rem;margin:.5rem 0}h2{font-size:1.25rem;border-bottom:3px solid #667eea;display:inline-block;padding-bottom:.25rem;margin-top:2rem}
+.meta{color:#64748b;font-size:.9rem}
+.result{display:flex;gap:2rem;align-items:center;flex-wrap:wrap}
+.zone{padding:.75rem 1.5rem;border-radius:12px;font-size:1.4rem;font-weight:700}
+.positive{color:#991b1b;font-weight:700}.negative{color:#166534;font-weight:700}
+table{border-collapse:collapse;width:100%;margin-top:.75rem}
+td,th{border-bottom:1px solid #e2e8f0;padding:.45rem .6rem;text-align:left}th{color:#475569;font-weight:600}
+.risk{color:#b91c1c}.protective{color:#15803d}
+.disclaimer{margin-top:2.5rem;padding:1rem;background:#f8fafc;border-radius:12px;color:#475569;font-size:.85rem}
+"""
+
+
+@lru_cache(maxsize=None)
+def asset_data_uri(name: str, max_width: int = 720) -> str:
+    """``assets/<name>`` as a base64 data URI, downscaled to ``max_width`` pixels."""
+    from PIL import Image
+
+    with Image.open(ASSETS_DIR / name) as img:
+        if img.width > max_width:
+            img = img.resize((max_width, round(img.height * max_width / img.width)))
+        buf = io.BytesIO()
+        img.convert("RGB").save(buf, format="JPEG", quality=80, optimize=True)
+    return "data:image/jpeg;base64," + base64.b64encode(buf.getvalue()).decode()
+
+
+def _point(value, radius, cx=150, cy=150):
+    angle = math.pi * (1 - value / 100)
+    return cx + radius * math.cos(angle), cy - radius * math.sin(angle)
+
+
+def _arc(start, end, radius=120, width=30):
+    x0, y0 = _point(start, radius)
+    x1, y1 = _point(end, radius)
+    return (f'<path d="M{x0:.2f},{y0:.2f} A{radius},{radius} 0 0,1 {x1:.2f},{y1:.2f}" '
+            f'fill="none" stroke-width="{width}"')
+
+
+@lru_cache(maxsize=None)
+def gauge_background(threshold: float) -> str:
+    """Zone arcs and threshold marker, shared by every report with this threshold."""
+    parts = []
+    for (lo, hi), color in zip(zip(BINS, BINS[1:]), ZONE_COLORS):
+        parts.append(f'{_arc(lo * 100, hi * 100)} stroke="{color}"/>')
+    tx0, ty0 = _point(threshold * 100, 100)
+    tx1, ty1 = _point(threshold * 100, 140)
+    parts.append(f'<line x1="{tx0:.2f}" y1="{ty0:.2f}" x2="{tx1:.2f}" y2="{ty1:.2f}" '
+                 f'stroke="#dc2626" stroke-width="5"/>')
+    return "".join(parts)
+
+
+def gauge_svg(probability: float, threshold: float) -> str:
+    value = min(max(probability * 100, 0.0), 100.0)
+    bar = f'{_arc(0, value, width=14)} stroke="#667eea"/>' if value > 0 else ""
+    return (f'<svg viewBox="0 0 300 185" width="300" height="185" xmlns="http://www.w3.org/2000/svg">'
+            f'{gauge_background(threshold)}{bar}'
+            f'<text x="150" y="145" text-anchor="middle" font-size="40" font-weight="700" '
+            f'fill="#667eea">{value:.1f}%</text>'
+            f'<text x="150" y="175" text-anchor="middle" font-size="13" fill="#64748b">Risk Probability</text>'
+            f'</svg>')
+
+
+def _rows(pairs) -> str:
+    return "".join(f"<tr><th>{html.escape(str(k))}</th><td>{html.escape(str(v))}</td></tr>" for k, v in pairs)
+
+
+def _page(title, body) -> str:
+    return (f'<!DOCTYPE html><html lang="en"><head><meta charset="utf-8"><title>{html.escape(title)}</title>'
+            f'<style>{REPORT_CSS}</style></head><body>'
+            f'<img class="banner" src="{asset_data_uri("corvigil_banner.jpeg")}" alt="CorVigil">'
+            f'<h1>{html.escape(title)}</h1>'
+            f'<p class="meta">Generated {datetime.now():%Y-%m-%d %H:%M}</p>{body}'
+            f'<div class="disclaimer"><b>Medical Disclaimer.</b> This report is produced by a screening '
+            f'tool for educational purposes only. It does not replace professional medical advice, '
+            f'diagnosis, or treatment.</div></body></html>')
+
+
+def _result_block(probability, risk_zone, positive, threshold) -> str:
+    color = ZONE_COLORS[LABELS.index(risk_zone)]
+    decision = ('<span class="positive">POSITIVE SCREENING: further cardiac evaluation is advised.</span>'
+                if positive else
+                '<span class="negative">NEGATIVE SCREENING: continue regular health monitoring.</span>')
+    return (f'<h2>Assessment Result</h2><div class="result">{gauge_svg(probability, threshold)}'
+            f'<div><div class="zone" style="background:{color}">{html.escape(risk_zone)}</div>'
+            f'<p>Risk probability <b>{probability * 100:.2f}%</b> (threshold {threshold * 100:.0f}%)</p>'
+            f'<p>{decision}</p></div></div>')
+
+
+def render_cardiac_report(inputs: dict, result: dict, threshold: float) -> bytes:
+    """Report for ``cardiac_test_app.py``: ``inputs`` are its form values, ``result`` its ``predict_risk`` output."""
+    bmi = inputs["weight"] / ((inputs["height"] / 100) ** 2)
+    if bmi < 18.5:
+        bmi_category = "Underweight"
+    elif bmi < 25:
+        bmi_category = "Normal"
+    elif bmi < 30:
+        bmi_category = "Overweight"
+    else:
+        bmi_category = "Obese"
+    body = _result_block(result["probability"], result["risk_zone"],
+                         result["screening_prediction"] == 1, threshold)
+    body += "<h2>Complete Patient Summary</h2><table>" + _rows([
+        ("Age", f"{inputs['age']} years"),
+        ("Gender", "Female" if inputs["gender"] == 1 else "Male"),
+        ("Height", f"{inputs['height']} cm"),
+        ("Weight", f"{inputs['weight']} kg"),
+        ("Body Mass Index", f"{bmi:.1f} ({bmi_category})"),
+        ("Blood Pressure", f"{inputs['ap_hi']}/{inputs['ap_lo']} mmHg"),
+        ("Cholesterol", LEVELS[inputs["cholesterol"]]),
+        ("Glucose", LEVELS[inputs["gluc"]]),
+        ("Smoking Status", "Yes" if inputs["smoke"] else "No"),
+        ("Alcohol Use", "Yes" if inputs["alco"] else "No"),
+        ("Physical Activity", "Active" if inputs["active"] else "Inactive"),
+    ]) + "</table>"
+    return _page("Cardiac Risk Assessment", body).encode()
+
+
+def render_heart_attack_report(form: dict, probability: float, threshold: float, factors=None) -> bytes:
+    """Report for ``heart_attack_test_app.py``; ``factors`` is ``[(name, impact), ...]`` strongest first."""
+    zone = LABELS[int(risk_zone_codes(np.array([probability]))[0])]
+    body = _result_block(probability, zone, probability >= threshold, threshold)
+    body += "<h2>Patient Information</h2><table>" + _rows([
+        ("Age", form["age"]), ("Sex", form["sex"]), ("Chest Pain Type", form["chest_pain"]),
+        ("Resting BP", f"{form['resting_bp']} mmHg"), ("Cholesterol", f"{form['cholesterol']} mg/dL"),
+        ("Fasting Blood Sugar > 120", form["fasting_bs"]), ("Max Heart Rate", form["max_hr"]),
+        ("Oldpeak", form["oldpeak"]), ("Exercise Angina", form["exercise_angina"]),
+        ("Resting ECG", form["resting_ecg"]), ("ST Slope", form["st_slope"]),
+    ]) + "</table>"
+    if factors:
+        body += "<h2>Risk Factor Analysis</h2><table><tr><th>Factor</th><th>Effect</th><th>Strength</th></tr>"
+        for name, impact in factors:
+            kind, label = ("risk", "Risk factor") if impact > 0 else ("protective", "Protective factor")
+            body += (f'<tr><td>{html.escape(name)}</td><td class="{kind}">{label}</td>'
+                     f'<td>{min(abs(impact), 1.0) * 100:.0f}%</td></tr>')
+        body += "</table>"
+    return _page("Heart Attack Risk Assessment", body).encode()
+
+
+_pool = None
+
+
+def submit(render, *args, **kwargs):
+    """Render on the shared background pool; returns a ``Future`` of the report bytes."""
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="report")
+    return _pool.submit(render, *args, **kwargs)
+
+
+# ---------------- BATCH ----------------
+
+def _write_chunk(model_name, records, out_dir):
+    spec = get_spec(model_name)
+    written = []
+    for name, form, extra in records:
+        if model_name == "cardiac":
+            data = render_cardiac_report(form, extra, spec.threshold)
+        else:
+            data = render_heart_attack_report(form, extra["probability"], spec.threshold, extra["factors"])
+        path = Path(out_dir) / f"{name}.html"
+        path.write_bytes(data)
+        written.append(path)
+    return written
+
+
+def _heart_attack_factors(model, X, top=4):
+    import shap
+
+    Xt = model[0].transform(X)
+    names = [n.split("__", 1)[1] for n in model[0].get_feature_names_out()]
+    values = shap.TreeExplainer(model[-1])(Xt).values
+    order = np.argsort(-np.abs(values), axis=1)[:, :top]
+    return [[(names[j], float(values[i, j])) for j in order[i]] for i in range(len(X))]
+
+
+def batch_reports(model_name, src, out_dir, workers=None, chunk=64):
+    """Score every patient in ``src`` and write one HTML report each, rendering in parallel processes.
+
+    Rows are clipped to the model's serving bounds before scoring, like in the apps.
+    """
+    from corvigil.cleaning import serving_bounds
+    from corvigil.preprocess import apply_clip
+
+    spec = get_spec(model_name)
+    forms = pd.read_csv(src) if not str(src).endswith((".parquet", ".pq")) else pd.read_parquet(src)
+    model = joblib.load(spec.model_path)
+    if model_name == "cardiac":
+        X = encode_cardiac_form(forms)
+    else:
+        X = encode_heart_attack_form(forms)
+    X = apply_clip(X, serving_bounds(spec))
+    prob = model.predict_proba(X)[:, 1]
+    zones = risk_zone_codes(prob)
+    factors = _heart_attack_factors(model, X) if model_name == "heart_attack" else None
+
+    records = []
+    for i, form in enumerate(forms.to_dict("records")):
+        if model_name == "cardiac":
+            extra = {"probability": round(float(prob[i]), 4), "risk_zone": LABELS[zones[i]],
+                     "screening_prediction": int(prob[i] >= spec.threshold)}
+        else:
+            extra = {"probability": float(prob[i]), "factors": factors[i]}
+        records.append((form.get("patient_id", f"patient_{i:06d}"), form, extra))
+
+    Path(out_dir).mkdir(parents=True, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_write_chunk, model_name, records[i:i + chunk], out_dir)
+                   for i in range(0, len(records), chunk)]
+        return [path for f in futures for path in f.result()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write HTML assessment reports for a file of patients")
+    parser.add_argument("model", choices=sorted(SPECS))
+    parser.add_argument("src", help="CSV/Parquet with the app's form fields (optional patient_id column)")
+    parser.add_argument("-o", "--output", required=True, help="directory for the reports")
+    parser.add_argument("--workers", type=int)
+    args = parser.parse_args(argv)
+
+    paths = batch_reports(args.model, args.src, args.output, args.workers)
+    print(f"Wrote {len(paths)} reports -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
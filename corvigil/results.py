@@ -0,0 +1,263 @@
+"""Scored results shared by every app replica on a host, in one SQLite file.
+
+``st.cache_resource`` lives inside one Streamlit process: each replica
+behind the load balancer starts cold and forgets everything on restart.
+A :class:`ResultStore` keeps the probability, risk zone and explanation of
+every patient scored on the host, keyed by the model and the canonical
+feature vector, so a patient scored by one replica is a lookup for all of
+them.
+
+* The key is a 16-byte BLAKE2 of the model key and the model-ready
+  features as float64 in ``spec.features`` order (``-0.0`` folded into
+  ``0.0``).  The model key hashes the exported pipeline file, the scoring
+  backend and the stored explanation background, so retraining, switching
+  to ONNX or refitting the background never serves an old result; it is
+  recomputed whenever the model or sidecar file changes on disk.  Apps
+  that hot-reload pass the key of the version that actually scored
+  (:mod:`corvigil.reload`), so a result is never filed under a model
+  that is still warming up.
+* Rows expire ``ttl`` seconds after they were written.  Every
+  ``EVICT_EVERY`` writes a process also drops the least recently read rows
+  beyond ``max_entries`` / ``max_bytes``.  A hit refreshes the read time at
+  most once every ``TOUCH_AFTER`` seconds, so hot rows do not turn every
+  read into a write.
+* WAL mode lets readers run alongside one writer; each thread has its own
+  connection, and a busy or broken store counts as a miss -- the store
+  never fails a request.
+
+The store is off unless ``CORVIGIL_RESULT_STORE`` is set (to a path, or
+``1`` for ``.cache/results.sqlite``); ``CORVIGIL_RESULT_TTL``,
+``CORVIGIL_RESULT_MAX_ENTRIES`` and ``CORVIGIL_RESULT_MAX_MB`` override the
+limits.
+
+    python -m corvigil.results stats
+    python -m corvigil.results evict
+    python -m corvigil.results clear
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from corvigil.artifacts import load_meta, meta_path
+from corvigil.schema import ROOT
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE = ROOT / ".cache" / "results.sqlite"
+DEFAULT_TTL = 24 * 3600
+DEFAULT_MAX_ENTRIES = 200_000
+DEFAULT_MAX_MB = 256
+EVICT_EVERY = 500
+TOUCH_AFTER = 60.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key BLOB PRIMARY KEY,
+    model TEXT NOT NULL,
+    value TEXT NOT NULL,
+    bytes INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS results_created ON results (created_at);
+CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed_at);
+"""
+
+
+def _stat(path):
+    try:
+        st = os.stat(path)
+        return st.st_mtime_ns, st.st_size
+    except FileNotFoundError:
+        return None
+
+
+def model_key(spec, backend=None, digest=None, meta=None) -> str:
+    """Hash of what a stored result depends on: the pipeline file, backend and explanation background.
+
+    ``digest`` is the SHA-256 of the pipeline bytes, followed by the ``.onnx``
+    graph's for the ONNX backend, when the caller already has it (defaults
+    to the files on disk); ``meta`` is the sidecar read alongside them.
+    """
+    from corvigil.featcache import file_digest
+    from corvigil.onnx_backend import onnx_path
+
+    backend = (backend or os.environ.get("CORVIGIL_BACKEND") or "sklearn").lower()
+    if digest is None:
+        digest = file_digest(spec.model_path, *([onnx_path(spec)] if backend == "onnx" else []))
+    background = (load_meta(spec.model_path) if meta is None else meta).get("background")
+    h = hashlib.sha256()
+    for part in (spec.name, digest, backend, json.dumps(background, sort_keys=True)):
+        h.update(part.encode())
+        h.update(b"\0")
+    return h.hexdigest()[:16]
+
+
+def feature_key(model, spec, features) -> bytes:
+    """Key of one model-ready row (dict or one-row DataFrame) under ``model``."""
+    if not isinstance(features, dict):
+        features = features.iloc[0].to_dict()
+    values = np.array([features[c] for c in spec.features], dtype=np.float64) + 0.0
+    return hashlib.blake2b(model.encode() + values.tobytes(), digest_size=16).digest()
+
+
+class ResultStore:
+    """Cross-process result cache; see the module docstring."""
+
+    def __init__(self, path=DEFAULT_STORE, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES,
+                 max_bytes=DEFAULT_MAX_MB << 20, backend=None):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.backend = backend
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._models = {}               # spec name -> (file stats, model key)
+        self._lock = threading.Lock()
+        self._writes = 0
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+
+    @classmethod
+    def from_env(cls):
+        """The store configured by ``CORVIGIL_RESULT_*``, or ``None`` when it is off."""
+        setting = os.environ.get("CORVIGIL_RESULT_STORE", "")
+        if setting.lower() in ("", "0", "off", "false"):
+            return None
+        return cls(DEFAULT_STORE if setting.lower() in ("1", "on", "true") else setting,
+                   ttl=float(os.environ.get("CORVIGIL_RESULT_TTL", DEFAULT_TTL)),
+                   max_entries=int(os.environ.get("CORVIGIL_RESULT_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+                   max_bytes=int(float(os.environ.get("CORVIGIL_RESULT_MAX_MB", DEFAULT_MAX_MB)) * (1 << 20)))
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # autocommit; eviction opens ``BEGIN IMMEDIATE`` itself
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def model_key(self, spec) -> str:
+        stats = (_stat(spec.model_path), _stat(meta_path(spec.model_path)))
+        if (self.backend or os.environ.get("CORVIGIL_BACKEND") or "").lower() == "onnx":
+            from corvigil.onnx_backend import onnx_path
+
+            stats += (_stat(onnx_path(spec)),)
+        cached = self._models.get(spec.name)
+        if cached is None or cached[0] != stats:
+            cached = (stats, model_key(spec, self.backend))
+            self._models[spec.name] = cached
+        return cached[1]
+
+    def get(self, spec, features, model=None):
+        """The stored result for ``features`` under ``spec``'s current model, or ``None``.
+
+        ``model`` is the model key of the version actually serving (see
+        :class:`corvigil.reload.LoadedModel`); it defaults to the files on disk.
+        """
+        key = feature_key(model or self.model_key(spec), spec, features)
+        now = time.time()
+        try:
+            conn = self._conn()
+            row = conn.execute("SELECT value, created_at, accessed_at FROM results WHERE key = ?",
+                               (key,)).fetchone()
+            if row is None or row[1] < now - self.ttl:
+                return None
+            if row[2] < now - TOUCH_AFTER:
+                conn.execute("UPDATE results SET accessed_at = ? WHERE key = ?", (now, key))
+            return json.loads(row[0])
+        except sqlite3.Error as exc:
+            logger.warning("result store read failed: %s", exc)
+            return None
+
+    def put(self, spec, features, value: dict, model=None):
+        """Store ``value`` (JSON-serialisable) for ``features``; failures are logged, never raised."""
+        model = model or self.model_key(spec)
+        payload = json.dumps(value, separators=(",", ":"))
+        now = time.time()
+        try:
+            self._conn().execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+                                 (feature_key(model, spec, features), model, payload, len(payload), now, now))
+        except sqlite3.Error as exc:
+            logger.warning("result store write failed: %s", exc)
+            return
+        with self._lock:
+            self._writes += 1
+            due = self._writes % EVICT_EVERY == 0
+        if due:
+            try:
+                self.evict()
+            except sqlite3.Error as exc:
+                logger.warning("result store eviction failed: %s", exc)
+
+    def evict(self) -> int:
+        """Drop expired rows, then the least recently read ones over the size limits."""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            removed = conn.execute("DELETE FROM results WHERE created_at < ?", (time.time() - self.ttl,)).rowcount
+            count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM results").fetchone()
+            if count > self.max_entries or total > self.max_bytes:
+                # keep the most recently read rows that fit both limits
+                keep = conn.execute(
+                    "SELECT COUNT(*) FROM (SELECT SUM(bytes) OVER (ORDER BY accessed_at DESC) AS running "
+                    "FROM results LIMIT ?) WHERE running <= ?", (self.max_entries, self.max_bytes)).fetchone()[0]
+                removed += conn.execute(
+                    "DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY accessed_at DESC "
+                    "LIMIT -1 OFFSET ?)", (keep,)).rowcount
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return removed
+
+    def stats(self) -> dict:
+        count, total, oldest = self._conn().execute(
+            "SELECT COUNT(*), COALESCE(SUM(bytes), 0), MIN(created_at) FROM results").fetchone()
+        models = dict(self._conn().execute("SELECT model, COUNT(*) FROM results GROUP BY model").fetchall())
+        return {"entries": count, "bytes": total, "oldest_s": time.time() - oldest if oldest else None,
+                "models": models}
+
+    def clear(self):
+        self._conn().execute("DELETE FROM results")
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect or trim the shared result store")
+    parser.add_argument("command", choices=["stats", "evict", "clear"])
+    parser.add_argument("--store", help="defaults to CORVIGIL_RESULT_STORE or .cache/results.sqlite")
+    args = parser.parse_args(argv)
+
+    store = (ResultStore(args.store) if args.store else ResultStore.from_env()) or ResultStore()
+    if args.command == "stats":
+        s = store.stats()
+        age = f", oldest {s['oldest_s'] / 3600:.1f} h" if s["oldest_s"] is not None else ""
+        print(f"{store.path}: {s['entries']} results, {s['bytes'] / 1e6:.1f} MB{age}")
+        for model, n in sorted(s["models"].items()):
+            print(f"  model {model}: {n}")
+    elif args.command == "evict":
+        print(f"evicted {store.evict()} results")
+    else:
+        store.clear()
+        print(f"cleared {store.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""How many fits to run at once and how many XGBoost threads to give each.
+
+The notebooks run ``GridSearchCV(n_jobs=-1)`` around an ``XGBClassifier``
+that also takes every core, so a search starts cores x cores threads that
+mostly wait on each other.  A :class:`Plan` splits the cores explicitly:
+``n_jobs`` concurrent fits times ``nthread`` threads never exceeds them.
+
+:func:`plan` is the heuristic.  The ``hist`` tree method parallelises each
+fit over rows, and a thread only pays for its synchronisation once it has
+enough rows per tree node, so small sets and deep trees (more, smaller
+nodes) get one thread per fit and the cores go to concurrent fits instead;
+large sets get threads first.
+
+:func:`tune` measures instead: it times one fold's candidate groups under
+every split of the cores, reports wall time and CPU utilisation, and
+stores the fastest in ``.cache/schedules.json`` for this machine.
+``fold_cached_search(n_jobs="auto")`` and
+``resumable_search(workers="auto")`` use the stored plan when it matches
+the data, the heuristic otherwise.
+
+    python -m corvigil.scheduler plan heart_attack
+    python -m corvigil.scheduler tune heart_attack --quick
+"""
+import argparse
+import json
+import os
+import socket
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from corvigil.schema import ROOT, SPECS, get_spec
+
+SCHEDULE_FILE = ROOT / ".cache" / "schedules.json"
+# rows a hist thread needs per tree (at depth <= 4) before it speeds a fit up
+ROWS_PER_THREAD = 8_000
+
+
+def available_cores() -> int:
+    """Cores this process may run on (the affinity mask, not the machine total)."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+@dataclass(frozen=True)
+class Plan:
+    n_jobs: int             # concurrent fits
+    nthread: int            # XGBoost threads per fit
+    source: str = "heuristic"
+
+    @property
+    def threads(self) -> int:
+        return self.n_jobs * self.nthread
+
+
+@dataclass(frozen=True)
+class Measurement:
+    n_jobs: int
+    nthread: int
+    wall_s: float
+    cpu_s: float
+    utilization: float      # cpu_s / (wall_s * cores)
+
+
+def useful_threads(rows, max_depth, cores) -> int:
+    """Threads one ``hist`` fit of ``rows`` rows and ``max_depth`` can keep busy."""
+    per_thread = ROWS_PER_THREAD << max(0, max_depth - 4)
+    return max(1, min(cores, rows // per_thread))
+
+
+def plan(rows, max_depth, tasks, cores=None) -> Plan:
+    """Split ``cores`` between ``tasks`` independent fits of ``rows`` rows each."""
+    cores = cores or available_cores()
+    nthread = useful_threads(rows, max_depth, cores)
+    n_jobs = max(1, min(tasks, cores // nthread))
+    # fewer fits than slots: the idle cores are better spent as threads than left unused
+    return Plan(n_jobs, max(nthread, cores // n_jobs))
+
+
+def configurations(cores, tasks) -> list:
+    """Every way of splitting ``cores`` into ``n_jobs`` fits of ``cores // n_jobs`` threads."""
+    jobs = {j for j in (1 << i for i in range(cores.bit_length())) if j <= cores} | {cores}
+    return [Plan(j, max(1, cores // j), "tuned") for j in sorted(jobs) if j <= max(1, tasks)]
+
+
+def grid_shape(X, param_grid, cv=5):
+    """``(rows per fit, deepest max_depth, fits per fold)`` of a search over ``param_grid``."""
+    from sklearn.model_selection import ParameterGrid
+
+    from corvigil.training import MODEL_DEFAULTS, _groups
+
+    depths = param_grid.get("model__max_depth", [MODEL_DEFAULTS["max_depth"]])
+    rows = len(X) * (cv - 1) // cv
+    return rows, max(depths), len(_groups(list(ParameterGrid(param_grid))))
+
+
+def _key(name, cores):
+    return f"{socket.gethostname()}/{cores}/{name}"
+
+
+def _schedule_file(path=None) -> Path:
+    return Path(path or os.environ.get("CORVIGIL_SCHEDULE_FILE") or SCHEDULE_FILE)
+
+
+def load_plan(name, rows, max_depth, tasks, cores=None, path=None) -> Plan:
+    """The tuned plan for ``name`` on this machine if it fits the data, else :func:`plan`.
+
+    A tuned plan is reused for the same deepest ``max_depth`` and a row
+    count within a factor of two of the one it was measured on.
+    """
+    cores = cores or available_cores()
+    try:
+        entry = json.loads(_schedule_file(path).read_text()).get(_key(name, cores))
+    except (OSError, ValueError):
+        entry = None
+    if entry and entry["max_depth"] == max_depth and 0.5 <= rows / entry["rows"] <= 2:
+        n_jobs = min(entry["n_jobs"], max(1, tasks))
+        return Plan(n_jobs, entry["nthread"], "tuned")
+    return plan(rows, max_depth, tasks, cores)
+
+
+def resolve(name, X, param_grid, cv=5, n_jobs="auto", nthread=None) -> Plan:
+    """The plan a search runs with: ``"auto"`` parts filled in, nothing above the core count."""
+    cores = available_cores()
+    if n_jobs == "auto":
+        auto = load_plan(name, *grid_shape(X, param_grid, cv), cores=cores)
+        return auto if nthread is None else Plan(auto.n_jobs, nthread, "given")
+    n_jobs = max(1, int(n_jobs))
+    return Plan(n_jobs, nthread or max(1, cores // n_jobs), "given")
+
+
+def save_plan(name, best: Plan, rows, max_depth, cores=None, path=None):
+    cores = cores or available_cores()
+    path = _schedule_file(path)
+    try:
+        stored = json.loads(path.read_text())
+    except (OSError, ValueError):
+        stored = {}
+    stored[_key(name, cores)] = {"n_jobs": best.n_jobs, "nthread": best.nthread, "rows": rows,
+                                 "max_depth": max_depth, "tuned_at": time.time()}
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(stored, indent=1))
+    os.replace(tmp, path)
+
+
+def run_groups(groups, dtrain, dval, y_val, n_jobs, nthread, cores=None) -> Measurement:
+    """Fit ``groups`` (lists of candidate dicts) ``n_jobs`` at a time and measure the run."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    from corvigil.training import fit_group
+
+    cores = cores or available_cores()
+    wall, cpu = time.perf_counter(), time.process_time()
+    with ThreadPoolExecutor(max_workers=n_jobs) as pool:
+        list(pool.map(lambda g: fit_group(g, dtrain, dval, y_val, nthread), groups))
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+    return Measurement(n_jobs, nthread, wall, cpu, cpu / (wall * cores) if wall else 0.0)
+
+
+def tune(spec, X, y, param_grid, cv=5, max_groups=None, configs=None, save=True) -> list:
+    """Time one fold of the search under each of ``configs``; fastest first.
+
+    ``max_groups`` candidate groups, spread evenly over the grid, stand in
+    for the fold (all of them by default).  The winner is stored for
+    :func:`load_plan` unless ``save`` is false.
+    """
+    from sklearn.model_selection import ParameterGrid
+
+    from corvigil.training import _groups, cv_folds, prepare_fold
+
+    cores = available_cores()
+    candidates = list(ParameterGrid(param_grid))
+    groups = [[candidates[i] for i in g] for g in _groups(candidates)]
+    if max_groups and len(groups) > max_groups:
+        step = len(groups) / max_groups
+        groups = [groups[int(i * step)] for i in range(max_groups)]
+    train_idx, val_idx = cv_folds(X, y, cv)[0]
+    dtrain, dval, y_val = prepare_fold(spec, X, y, train_idx, val_idx)
+    configs = configs or configurations(cores, len(groups))
+    results = sorted((run_groups(groups, dtrain, dval, y_val, c.n_jobs, c.nthread, cores) for c in configs),
+                     key=lambda m: m.wall_s)
+    if save:
+        best = results[0]
+        rows, depth, _ = grid_shape(X, param_grid, cv)
+        save_plan(spec.name, Plan(best.n_jobs, best.nthread, "tuned"), rows, depth, cores)
+    return results
+
+
+def main(argv=None):
+    import numpy as np
+
+    from corvigil.featcache import FeatureCache
+    from corvigil.training import PARAM_GRIDS
+
+    parser = argparse.ArgumentParser(description="Plan or tune training parallelism for this machine")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name, help_ in (("plan", "show the plan a search would use"),
+                        ("tune", "time every split of the cores on one fold and store the fastest")):
+        p = sub.add_parser(name, help=help_)
+        p.add_argument("model", choices=sorted(SPECS))
+        p.add_argument("--data", help="raw training data (defaults to the model's Data/ file)")
+        p.add_argument("--cv", type=int, default=5)
+        p.add_argument("--quick", action="store_true", help="only the first two max_depth values")
+    sub.choices["tune"].add_argument("--max-groups", type=int, help="candidate groups to time per configuration")
+    args = parser.parse_args(argv)
+
+    spec = get_spec(args.model)
+    split = FeatureCache().load(spec, raw_path=args.data)
+    X, y = split.frame("X_train"), np.asarray(split["y_train"])
+    grid = dict(PARAM_GRIDS[spec.name])
+    if args.quick:
+        grid["model__max_depth"] = grid["model__max_depth"][:2]
+    rows, depth, tasks = grid_shape(X, grid, args.cv)
+    print(f"{spec.name}: {available_cores()} cores, {rows} rows per fit, max_depth up to {depth}, "
+          f"{tasks} candidate groups per fold")
+
+    if args.command == "plan":
+        print(json.dumps(asdict(resolve(spec.name, X, grid, args.cv))))
+        return
+    results = tune(spec, X, y, grid, args.cv, args.max_groups)
+    print(f"{'n_jobs':>6} {'nthread':>7} {'wall s':>8} {'cpu s':>8} {'cpu util':>8}")
+    for m in results:
+        print(f"{m.n_jobs:6d} {m.nthread:7d} {m.wall_s:8.2f} {m.cpu_s:8.2f} {m.utilization:8.0%}")
+    print(f"stored n_jobs={results[0].n_jobs} nthread={results[0].nthread}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+from dataclasses import dataclass
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+DATA_DIR = ROOT / "Data"
+MODELS_DIR = ROOT / "models"
+
+BINS = [0.0, 0.20, 0.35, 0.50, 0.70, 1.0]
+LABELS = ["Very Low Risk", "Low Risk", "Moderate Risk", "High Risk", "Very High Risk"]
+
+
+@dataclass(frozen=True)
+class ModelSpec:
+    """Everything the tooling needs to know about one of the two screening models."""
+    name: str
+    model_path: Path
+    data_path: Path
+    target: str
+    features: tuple          # column order the exported pipeline was fitted on
+    numeric_cols: tuple      # RobustScaler columns
+    binary_cols: tuple       # passthrough columns
+    threshold: float
+    drop_cols: tuple = ()    # raw columns that are not part of the feature set
+    onehot_groups: tuple = ()  # (factor, member columns, category when all members are 0)
+
+
+CARDIAC = ModelSpec(
+    name="cardiac",
+    model_path=MODELS_DIR / "cardiac_failure_detection.pkl",
+    data_path=DATA_DIR / "cardiac_failure_processed.csv",
+    target="cardio",
+    features=("age", "gender", "height", "weight", "ap_hi", "ap_lo",
+              "cholesterol", "gluc", "smoke", "alco", "active", "bmi"),
+    numeric_cols=("age", "height", "weight", "ap_hi", "ap_lo", "bmi"),
+    binary_cols=("gender", "cholesterol", "gluc", "smoke", "alco", "active"),
+    threshold=0.30,
+    drop_cols=("Unnamed: 0", "id"),
+)
+
+HEART_ATTACK = ModelSpec(
+    name="heart_attack",
+    model_path=MODELS_DIR / "heart_attack_detection.pkl",
+    data_path=DATA_DIR / "heart_data_preprocessed.csv",
+    target="HeartDisease",
+    features=("Age", "RestingBP", "Cholesterol", "FastingBS", "MaxHR", "Oldpeak",
+              "Sex_M", "ChestPainType_ATA", "ChestPainType_NAP", "ChestPainType_TA",
+              "RestingECG_Normal", "RestingECG_ST", "ExerciseAngina_Y",
+              "ST_Slope_Flat", "ST_Slope_Up"),
+    numeric_cols=("Age", "RestingBP", "Cholesterol", "MaxHR", "Oldpeak"),
+    binary_cols=("FastingBS", "Sex_M", "ChestPainType_ATA", "ChestPainType_NAP",
+                 "ChestPainType_TA", "RestingECG_Normal", "RestingECG_ST",
+                 "ExerciseAngina_Y", "ST_Slope_Flat", "ST_Slope_Up"),
+    threshold=0.35,
+    onehot_groups=(
+        ("ChestPainType", ("ChestPainType_ATA", "ChestPainType_NAP", "ChestPainType_TA"), "ASY"),
+        ("RestingECG", ("RestingECG_Normal", "RestingECG_ST"), "LVH"),
+        ("ST_Slope", ("ST_Slope_Flat", "ST_Slope_Up"), "Down"),
+    ),
+)
+
+SPECS = {spec.name: spec for spec in (CARDIAC, HEART_ATTACK)}
+
+
+def get_spec(name: str) -> ModelSpec:
+    try:
+        return SPECS[name]
+    except KeyError:
+        raise ValueError(f"Unknown model '{name}', expected one of {sorted(SPECS)}") from None
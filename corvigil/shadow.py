@@ -0,0 +1,264 @@
+"""Shadow evaluation: a candidate model scores live requests after production has answered.
+
+The app scores with the production pipeline as usual and hands the
+encoded row and its probability to :meth:`ShadowEvaluator.submit`, which
+only appends to a bounded queue -- a full queue drops the row (counted in
+``dropped``) rather than make a user wait.  A worker process drains the
+queue in batches (up to ``max_batch`` rows or ``max_delay`` seconds),
+scores them with the candidate pinned to one thread, and records per row:
+both probabilities, their delta and whether both models take the same
+side of the screening threshold.  The worker is a separate process, not
+a thread, so it never holds the app's GIL, and it runs under
+``SCHED_IDLE`` (``nice`` 19 where that is unavailable): it only gets CPU
+the app's requests leave idle, and on a saturated host it falls behind
+and drops rows instead of slowing users down.
+
+Rows are appended to a JSON-lines log (``.cache/shadow/<name>.jsonl`` by
+default) and a running summary -- agreement, the decision confusion
+between the two models, mean and max |delta| -- is logged every
+``report_every`` rows and available from :meth:`summary`.
+
+With ``CORVIGIL_SHADOW=1`` each app shadows its model with the
+candidate next to it, ``models/<model stem>.candidate.pkl`` (written by
+``python -m corvigil.update ... --save``); an app without one runs as
+before.  ``CORVIGIL_SHADOW_LOG_DIR`` moves the logs.
+
+    python -m corvigil.shadow summary cardiac
+    python -m corvigil.shadow replay cardiac patients.parquet
+"""
+import argparse
+import json
+import logging
+import os
+import queue
+import sys
+import time
+import types
+from multiprocessing import get_context
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from corvigil.inference import set_nthread
+from corvigil.schema import ROOT, SPECS, get_spec
+
+logger = logging.getLogger(__name__)
+
+LOG_DIR = ROOT / ".cache" / "shadow"
+DEFAULT_QUEUE_SIZE = 4096
+
+
+def candidate_path(spec) -> Path:
+    return spec.model_path.with_suffix(".candidate.pkl")
+
+
+def default_log(spec) -> Path:
+    return Path(os.environ.get("CORVIGIL_SHADOW_LOG_DIR") or LOG_DIR) / f"{spec.name}.jsonl"
+
+
+# running totals shared with the worker process
+STATS = ("rows", "agree", "both_positive", "production_only", "candidate_only",
+         "sum_delta", "sum_abs_delta", "max_abs_delta", "errors")
+
+
+class ShadowEvaluator:
+    """Score production's requests with ``candidate`` (a pipeline or a .pkl path) in a worker process."""
+
+    def __init__(self, candidate, spec, threshold=None, log_path=None, queue_size=DEFAULT_QUEUE_SIZE,
+                 max_batch=256, max_delay=0.25, report_every=500, idle=True):
+        self.spec = spec
+        self.threshold = spec.threshold if threshold is None else threshold
+        self.log_path = Path(log_path or default_log(spec))
+        self.log_path.parent.mkdir(parents=True, exist_ok=True)
+        self.dropped = 0
+        ctx = get_context("spawn")
+        self._queue = ctx.Queue(maxsize=queue_size)
+        self._stats = ctx.Array("d", len(STATS))
+        self._process = ctx.Process(
+            target=_work, name=f"shadow-{spec.name}", daemon=True,
+            args=(candidate, spec.name, self.threshold, str(self.log_path), self._queue, self._stats,
+                  max_batch, max_delay, report_every, idle))
+        _start_detached(self._process)
+
+    @classmethod
+    def for_model(cls, spec, threshold=None, **kwargs):
+        """Evaluator for ``spec``'s candidate, or ``None`` when shadowing is off or there is none."""
+        if os.environ.get("CORVIGIL_SHADOW", "").lower() in ("", "0", "off", "false"):
+            return None
+        path = candidate_path(spec)
+        if not path.exists():
+            logger.info("%s: no candidate at %s, not shadowing", spec.name, path)
+            return None
+        return cls(path, spec, threshold, **kwargs)
+
+    def submit(self, features, probability):
+        """Queue one production-scored row (dict or one-row DataFrame of model-ready features); never blocks."""
+        if not isinstance(features, dict):
+            features = features.iloc[0].to_dict()
+        row = [float(features[c]) for c in self.spec.features]
+        try:
+            self._queue.put_nowait((time.time(), row, float(probability)))
+        except queue.Full:
+            self.dropped += 1
+
+    def summary(self) -> dict:
+        with self._stats.get_lock():
+            s = dict(zip(STATS, self._stats[:]))
+        return _summary(s, self.dropped)
+
+    def close(self, timeout=None):
+        """Score what is queued, then stop the worker."""
+        self._queue.put(None)
+        self._process.join(timeout)
+
+
+def _start_detached(process):
+    """Start a spawn ``process`` without re-running ``__main__`` in it.
+
+    Under ``streamlit run`` the main module is the app script, which spawn
+    would otherwise import -- and so execute -- again in the worker.
+    """
+    main = sys.modules["__main__"]
+    sys.modules["__main__"] = types.ModuleType("__main__")
+    try:
+        process.start()
+    finally:
+        sys.modules["__main__"] = main
+
+
+def _summary(s, dropped=0) -> dict:
+    n = max(s["rows"], 1)
+    return {"rows": int(s["rows"]), "agreement": s["agree"] / n, "both_positive": int(s["both_positive"]),
+            "production_only": int(s["production_only"]), "candidate_only": int(s["candidate_only"]),
+            "mean_delta": s["sum_delta"] / n, "mean_abs_delta": s["sum_abs_delta"] / n,
+            "max_abs_delta": s["max_abs_delta"], "dropped": dropped, "errors": int(s["errors"])}
+
+
+def _lower_priority():
+    """Run only on otherwise idle CPU (``SCHED_IDLE``), or at least at the lowest nice level."""
+    try:
+        os.sched_setscheduler(0, os.SCHED_IDLE, os.sched_param(0))
+    except (AttributeError, OSError):
+        try:
+            os.nice(19)
+        except (AttributeError, OSError):
+            pass
+
+
+def _work(candidate, name, threshold, log_path, jobs, stats, max_batch, max_delay, report_every, idle):
+    """Worker process: batch the queued rows, score them with the candidate, log and count."""
+    if idle:
+        _lower_priority()
+    if isinstance(candidate, (str, Path)):
+        import joblib
+
+        candidate = joblib.load(candidate)
+    set_nthread(candidate, 1)
+    spec = get_spec(name)
+    columns = list(spec.features)
+    reported = 0
+    while True:
+        item = jobs.get()
+        if item is None:
+            return
+        batch, stop = [item], False
+        deadline = time.monotonic() + max_delay
+        while len(batch) < max_batch:
+            try:
+                item = jobs.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if item is None:
+                stop = True
+                break
+            batch.append(item)
+        try:
+            rows = _score(candidate, columns, threshold, log_path, batch)
+        except Exception:
+            logger.exception("%s: shadow scoring failed for %d rows", name, len(batch))
+            rows = {"errors": len(batch)}
+        with stats.get_lock():
+            for k, v in rows.items():
+                i = STATS.index(k)
+                stats[i] = max(stats[i], v) if k == "max_abs_delta" else stats[i] + v
+            current = dict(zip(STATS, stats[:]))
+        if current["rows"] - reported >= report_every:
+            reported = current["rows"]
+            r = _summary(current)
+            logger.info("%s shadow: %d rows, %.1f%% same decision at %.2f (%d production-only, "
+                        "%d candidate-only), mean |delta| %.4f, max %.4f", name, r["rows"], r["agreement"] * 100,
+                        threshold, r["production_only"], r["candidate_only"], r["mean_abs_delta"],
+                        r["max_abs_delta"])
+        if stop:
+            return
+
+
+def _score(candidate, columns, threshold, log_path, batch) -> dict:
+    X = pd.DataFrame([row for _, row, _ in batch], columns=columns)
+    cand = candidate.predict_proba(X)[:, 1]
+    prod = np.array([p for _, _, p in batch])
+    delta = cand - prod
+    prod_pos, cand_pos = prod >= threshold, cand >= threshold
+    agree = prod_pos == cand_pos
+    lines = [json.dumps({"ts": round(ts, 3), "production": round(p, 6), "candidate": round(float(c), 6),
+                         "delta": round(float(d), 6), "agree": bool(a), "features": row})
+             for (ts, row, p), c, d, a in zip(batch, cand, delta, agree)]
+    with open(log_path, "a") as fh:
+        fh.write("\n".join(lines) + "\n")
+    return {"rows": len(batch), "agree": int(agree.sum()), "both_positive": int((prod_pos & cand_pos).sum()),
+            "production_only": int((prod_pos & ~cand_pos).sum()),
+            "candidate_only": int((~prod_pos & cand_pos).sum()), "sum_delta": float(delta.sum()),
+            "sum_abs_delta": float(np.abs(delta).sum()), "max_abs_delta": float(np.abs(delta).max())}
+
+
+def summarize_log(path, threshold) -> dict:
+    """Agreement and delta quantiles of a shadow log."""
+    log = pd.read_json(path, lines=True)
+    delta = log["delta"].to_numpy()
+    prod_pos, cand_pos = log["production"] >= threshold, log["candidate"] >= threshold
+    return {"rows": len(log), "agreement": float(log["agree"].mean()),
+            "production_only": int((prod_pos & ~cand_pos).sum()),
+            "candidate_only": int((~prod_pos & cand_pos).sum()),
+            "delta_quantiles": dict(zip(("p1", "p50", "p99"), np.quantile(delta, [0.01, 0.5, 0.99]).round(4).tolist())),
+            "mean_abs_delta": float(np.abs(delta).mean()), "max_abs_delta": float(np.abs(delta).max())}
+
+
+def main(argv=None):
+    import joblib
+
+    from corvigil.datasets import as_frame, load_features
+
+    parser = argparse.ArgumentParser(description="Summarise a shadow log or replay a file through a candidate")
+    sub = parser.add_subparsers(dest="command", required=True)
+    summary = sub.add_parser("summary", help="agreement and probability deltas from a shadow log")
+    summary.add_argument("model", choices=sorted(SPECS))
+    summary.add_argument("--log", help="defaults to CORVIGIL_SHADOW_LOG_DIR or .cache/shadow, <model>.jsonl")
+    replay = sub.add_parser("replay", help="score a CSV/Parquet file with production and the candidate")
+    replay.add_argument("model", choices=sorted(SPECS))
+    replay.add_argument("path")
+    replay.add_argument("--candidate", help="defaults to models/<model stem>.candidate.pkl")
+    replay.add_argument("--log", help="defaults to CORVIGIL_SHADOW_LOG_DIR or .cache/shadow, <model>.jsonl")
+    for p in (summary, replay):
+        p.add_argument("--threshold", type=float, help="defaults to the model's screening threshold")
+    args = parser.parse_args(argv)
+
+    spec = get_spec(args.model)
+    threshold = spec.threshold if args.threshold is None else args.threshold
+    log = args.log or default_log(spec)
+    if args.command == "replay":
+        X, _ = load_features(args.path, spec, dtype=np.float64)
+        X = as_frame(X, spec.features)
+        production = joblib.load(spec.model_path).predict_proba(X)[:, 1]
+        shadow = ShadowEvaluator(args.candidate or candidate_path(spec), spec, threshold, log, queue_size=len(X) + 1)
+        for (_, row), p in zip(X.iterrows(), production):
+            shadow.submit(row.to_dict(), p)
+        shadow.close()
+    print(json.dumps(summarize_log(log, threshold), indent=1))
+
+
+if __name__ == "__main__":
+    # run the importable module's copy, so the worker process can unpickle ``_work``
+    from corvigil.shadow import main
+
+    main()
@@ -0,0 +1,301 @@
+"""Synthetic patients for benchmarks and load tests, from a Gaussian copula.
+
+The copula is fitted on a model's ``Data/`` file: every column keeps its
+own marginal (an empirical quantile function for measurements, category
+frequencies for flags and one-hot groups) and the columns are tied
+together by a latent normal correlation, calibrated so that the sampled
+columns reproduce the observed correlations.  Sampling is a
+matrix of standard normals, one matmul with the Cholesky factor, ``ndtr``
+and a per-column ``interp``/``searchsorted``, all NumPy.
+
+The repo ships no cardiac training data, so a built-in prior stands in for
+it: marginals and correlations summarised from the public cardiovascular
+disease dataset the cardiac notebook was trained on (cleaned ranges).
+
+Rows are produced in fixed blocks of ``BLOCK_ROWS``, block ``i`` drawing
+from ``SeedSequence([seed, i])``, so the output depends only on the seed --
+not on the chunk size it is streamed in, and blocks can be generated in
+any order.
+
+    python -m corvigil.synth heart_attack --rows 5000000 -o synth_heart.parquet
+    python -m corvigil.synth cardiac --rows 1000000 -o synth_cardiac.csv --layout raw
+
+``--layout features`` (default) writes the model-ready columns plus the
+label, as ``corvigil.batch`` and ``corvigil.drift`` read them; ``raw``
+writes the cardiac columns as ``Data/cardiac_failure_processed.csv`` has
+them (gender 1/2, cholesterol 1-3, no bmi), for ``corvigil.featcache``.
+"""
+import argparse
+import json
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from scipy.special import ndtr, ndtri
+
+from corvigil.schema import SPECS, get_spec
+
+BLOCK_ROWS = 65_536
+QUANTILE_POINTS = 257
+# cardiac_failure_processed.csv columns before corvigil.preprocess encodes them
+CARDIAC_RAW = ("age", "gender", "height", "weight", "ap_hi", "ap_lo", "cholesterol", "gluc",
+               "smoke", "alco", "active")
+
+
+@dataclass
+class Marginal:
+    name: str
+    kind: str               # "continuous" or "discrete"
+    values: list            # quantile function on QUANTILE_POINTS, or the categories
+    probs: list = None      # category frequencies (discrete)
+    decimals: int = 0       # rounding of continuous draws
+    columns: list = None    # one-hot member columns for a discrete group, None for a plain column
+
+    def codes(self, u: np.ndarray) -> np.ndarray:
+        """Category index (discrete) or value (continuous) for uniforms ``u``."""
+        if self.kind == "continuous":
+            grid = np.linspace(0, 1, len(self.values))
+            return np.round(np.interp(u, grid, self.values), self.decimals)
+        return np.searchsorted(np.cumsum(self.probs)[:-1], u, side="right")
+
+    def inverse(self, u: np.ndarray) -> np.ndarray:
+        if self.kind == "continuous":
+            return self.codes(u)
+        return np.asarray(self.values)[self.codes(u)]
+
+
+def _decimals(x: np.ndarray) -> int:
+    for d in range(4):
+        if np.allclose(x, np.round(x, d)):
+            return d
+    return 4
+
+
+def _normal_scores(x: np.ndarray) -> np.ndarray:
+    ranks = pd.Series(x).rank(method="average").to_numpy()
+    return ndtri((ranks - 0.5) / len(x))
+
+
+def _nearest_correlation(c: np.ndarray) -> np.ndarray:
+    w, v = np.linalg.eigh((c + c.T) / 2)
+    c = (v * np.clip(w, 1e-6, None)) @ v.T
+    d = np.sqrt(np.diag(c))
+    return c / np.outer(d, d)
+
+
+class CopulaModel:
+    """Marginals plus the normal-score correlation of a patient table."""
+
+    def __init__(self, marginals, corr):
+        self.marginals = list(marginals)
+        self.corr = np.asarray(corr, dtype=np.float64)
+        self._chol = np.linalg.cholesky(self.corr)
+
+    @property
+    def columns(self) -> list:
+        out = []
+        for m in self.marginals:
+            out.extend(m.columns or [m.name])
+        return out
+
+    @classmethod
+    def fit(cls, df: pd.DataFrame, groups=(), target=None, max_categories=10):
+        """Fit on ``df``; ``groups`` are ``(name, member columns, implicit category)`` one-hot groups.
+
+        A group enters the copula as one ordinal variable; its categories
+        are ordered by their ``target`` rate so that variable moves with
+        risk (ST slope Up < Down < Flat) instead of following column order.
+        """
+        grouped = {c for _, members, _ in groups for c in members}
+        marginals, scores, observed = [], [], []
+        for name, members, implicit in groups:
+            block = df[list(members)].to_numpy() > 0.5
+            codes = np.where(block.any(axis=1), block.argmax(axis=1), len(members))
+            labels = [m[len(name) + 1:] for m in members] + [implicit]
+            if target is not None:
+                rate = pd.Series(df[target].to_numpy()).groupby(codes).mean().reindex(range(len(labels)))
+                order = np.argsort(rate.fillna(0).to_numpy(), kind="stable")
+                codes = np.argsort(order)[codes]
+                labels = [labels[i] for i in order]
+            freq = np.bincount(codes, minlength=len(labels)) / len(codes)
+            marginals.append(Marginal(name, "discrete", labels, freq.tolist(), columns=list(members)))
+            scores.append(_normal_scores(codes))
+            observed.append(codes)
+        for col in df.columns:
+            if col in grouped:
+                continue
+            x = df[col].to_numpy(dtype=np.float64)
+            categories = np.unique(x)
+            if len(categories) <= max_categories:
+                freq = np.array([(x == c).mean() for c in categories])
+                marginals.append(Marginal(col, "discrete", categories.tolist(), freq.tolist()))
+                observed.append(np.searchsorted(categories, x))
+            else:
+                q = np.quantile(x, np.linspace(0, 1, QUANTILE_POINTS))
+                marginals.append(Marginal(col, "continuous", q.tolist(), decimals=_decimals(x)))
+                observed.append(x)
+            scores.append(_normal_scores(x))
+        model = cls(marginals, _nearest_correlation(np.corrcoef(np.array(scores))))
+        return model.calibrate(np.corrcoef(np.array(observed, dtype=np.float64)))
+
+    def calibrate(self, target_corr, iterations=8, rows=BLOCK_ROWS * 2, seed=12345):
+        """Adjust the latent correlation until sampled codes reproduce ``target_corr``.
+
+        Discretising a normal variable weakens its correlations (a 15%
+        binary flag keeps about two thirds of them), so normal scores of the
+        data understate the latent correlation; a few simulate-and-correct
+        steps put it back.
+        """
+        target = np.nan_to_num(np.asarray(target_corr, dtype=np.float64))
+        z = np.random.default_rng(seed).standard_normal((rows, len(self.marginals)))
+        corr = self.corr
+        for _ in range(iterations):
+            u = ndtr(z @ np.linalg.cholesky(corr).T)
+            sampled = np.corrcoef(np.array([m.codes(u[:, j]) for j, m in enumerate(self.marginals)],
+                                           dtype=np.float64))
+            corr = _nearest_correlation(np.clip(corr + target - np.nan_to_num(sampled), -0.999, 0.999)
+                                        + np.diag(np.full(len(corr), 0.001)))
+        return type(self)(self.marginals, corr)
+
+    def sample_block(self, seed, block) -> dict:
+        """Column arrays of block ``block`` (``BLOCK_ROWS`` rows)."""
+        rng = np.random.default_rng(np.random.SeedSequence([seed, block]))
+        u = ndtr(rng.standard_normal((BLOCK_ROWS, len(self.marginals))) @ self._chol.T)
+        out = {}
+        for j, m in enumerate(self.marginals):
+            values = m.inverse(u[:, j])
+            if m.columns:
+                for col in m.columns:
+                    out[col] = (values == col[len(m.name) + 1:]).astype(np.int8)
+            else:
+                out[m.name] = values
+        return out
+
+    def iter_chunks(self, rows, chunk_rows=BLOCK_ROWS * 16, seed=0):
+        """Yield ``{column: array}`` chunks of ``chunk_rows`` (the last one shorter) until ``rows``."""
+        chunk_rows = max(BLOCK_ROWS, chunk_rows // BLOCK_ROWS * BLOCK_ROWS)
+        for start in range(0, rows, chunk_rows):
+            n = min(chunk_rows, rows - start)
+            blocks = [self.sample_block(seed, start // BLOCK_ROWS + b) for b in range(-(-n // BLOCK_ROWS))]
+            yield {c: np.concatenate([b[c] for b in blocks])[:n] for c in blocks[0]}
+
+    def to_dict(self) -> dict:
+        return {"marginals": [vars(m) for m in self.marginals], "corr": self.corr.round(6).tolist()}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls([Marginal(**m) for m in data["marginals"]], data["corr"])
+
+
+def _normal_marginal(name, mean, sd, lo, hi, decimals=0):
+    p = np.linspace(0.0005, 0.9995, QUANTILE_POINTS)
+    return Marginal(name, "continuous", np.clip(mean + sd * ndtri(p), lo, hi).round(decimals).tolist(),
+                    decimals=decimals)
+
+
+def _cardiac_prior() -> CopulaModel:
+    marginals = [
+        _normal_marginal("age", 0.533, 0.068, 0.30, 0.65, 2),       # years / 100, as the pipeline takes it
+        Marginal("gender", "discrete", [1.0, 2.0], [0.65, 0.35]),
+        _normal_marginal("height", 164.4, 8.2, 140, 200),
+        _normal_marginal("weight", 74.2, 14.4, 40, 180),
+        _normal_marginal("ap_hi", 126.6, 16.7, 90, 200),
+        _normal_marginal("ap_lo", 81.4, 9.5, 60, 120),
+        Marginal("cholesterol", "discrete", [1.0, 2.0, 3.0], [0.750, 0.135, 0.115]),
+        Marginal("gluc", "discrete", [1.0, 2.0, 3.0], [0.850, 0.074, 0.076]),
+        Marginal("smoke", "discrete", [0.0, 1.0], [0.912, 0.088]),
+        Marginal("alco", "discrete", [0.0, 1.0], [0.946, 0.054]),
+        Marginal("active", "discrete", [0.0, 1.0], [0.196, 0.804]),
+        Marginal("cardio", "discrete", [0, 1], [0.50, 0.50]),
+    ]
+    names = [m.name for m in marginals]
+    pairs = {
+        ("gender", "height"): 0.50, ("gender", "weight"): 0.16, ("gender", "smoke"): 0.34,
+        ("gender", "alco"): 0.17, ("height", "weight"): 0.29, ("height", "smoke"): 0.19,
+        ("weight", "ap_hi"): 0.27, ("weight", "ap_lo"): 0.25, ("weight", "cholesterol"): 0.14,
+        ("weight", "gluc"): 0.11, ("weight", "cardio"): 0.18, ("ap_hi", "ap_lo"): 0.73,
+        ("age", "ap_hi"): 0.21, ("age", "ap_lo"): 0.15, ("age", "cholesterol"): 0.15, ("age", "gluc"): 0.10,
+        ("age", "cardio"): 0.24, ("ap_hi", "cardio"): 0.45, ("ap_lo", "cardio"): 0.34,
+        ("cholesterol", "gluc"): 0.45, ("cholesterol", "cardio"): 0.22, ("gluc", "cardio"): 0.09,
+        ("smoke", "alco"): 0.34, ("active", "cardio"): -0.04,
+    }
+    corr = np.eye(len(names))
+    for (a, b), r in pairs.items():
+        corr[names.index(a), names.index(b)] = corr[names.index(b), names.index(a)] = r
+    # the pairs are correlations of the observed columns, so calibrate towards them
+    return CopulaModel(marginals, _nearest_correlation(corr)).calibrate(corr)
+
+
+def fit_model(spec) -> CopulaModel:
+    """Copula for ``spec``: fitted on its ``Data/`` file, or the cardiac prior when that is absent."""
+    if spec.data_path.exists():
+        df = pd.read_csv(spec.data_path).drop(columns=list(spec.drop_cols), errors="ignore")
+        if spec.name == "cardiac":
+            df = df[list(CARDIAC_RAW) + [spec.target]]
+        return CopulaModel.fit(df.astype(float), spec.onehot_groups, spec.target)
+    if spec.name == "cardiac":
+        return _cardiac_prior()
+    raise FileNotFoundError(spec.data_path)
+
+
+def to_table(chunk: dict, spec, layout="features"):
+    """A generated chunk as an Arrow table: features float64 in ``spec.features`` order, label int8."""
+    import pyarrow as pa
+
+    columns = list(spec.features)
+    if spec.name == "cardiac":
+        # the copula keeps ap_lo < ap_hi almost always; make it always
+        chunk = dict(chunk, ap_lo=np.minimum(chunk["ap_lo"], chunk["ap_hi"] - 10))
+        if layout == "raw":
+            columns = list(CARDIAC_RAW)
+        else:
+            chunk.update(gender=chunk["gender"] - 1, cholesterol=(chunk["cholesterol"] - 1) / 2,
+                         bmi=chunk["weight"] / (chunk["height"] / 100) ** 2)
+    arrays = [pa.array(np.asarray(chunk[c], dtype=np.float64)) for c in columns]
+    arrays.append(pa.array(np.asarray(chunk[spec.target], dtype=np.int8)))
+    return pa.Table.from_arrays(arrays, names=columns + [spec.target])
+
+
+def generate(spec, rows, dst, seed=0, chunk_rows=BLOCK_ROWS * 16, layout="features", model=None) -> int:
+    """Stream ``rows`` synthetic patients into a Parquet or CSV file."""
+    import pyarrow.csv as pacsv
+    import pyarrow.parquet as pq
+
+    from corvigil.datasets import is_parquet
+
+    model = model or fit_model(spec)
+    writer = None
+    try:
+        for chunk in model.iter_chunks(rows, chunk_rows, seed):
+            table = to_table(chunk, spec, layout)
+            if writer is None:
+                writer = (pq.ParquetWriter(dst, table.schema, compression="zstd") if is_parquet(dst)
+                          else pacsv.CSVWriter(dst, table.schema))
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic patients from a Gaussian copula")
+    parser.add_argument("model", choices=sorted(SPECS))
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("-o", "--output", required=True, help="Parquet or CSV file")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-rows", type=int, default=BLOCK_ROWS * 16)
+    parser.add_argument("--layout", choices=["features", "raw"], default="features")
+    parser.add_argument("--dump-model", action="store_true", help="print the fitted copula as JSON and exit")
+    args = parser.parse_args(argv)
+
+    spec = get_spec(args.model)
+    if args.dump_model:
+        print(json.dumps(fit_model(spec).to_dict(), indent=1))
+        return
+    generate(spec, args.rows, args.output, args.seed, args.chunk_rows, args.layout)
+    print(f"{args.rows} synthetic {spec.name} patients -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
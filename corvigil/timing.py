@@ -0,0 +1,25 @@
+"""Small latency helpers shared by the benchmarks and tooling."""
+import time
+
+import numpy as np
+
+
+def time_calls(fn, n=200, warmup=10) -> np.ndarray:
+    """Call ``fn()`` ``n`` times and return the per-call latencies in seconds."""
+    for _ in range(warmup):
+        fn()
+    samples = np.empty(n)
+    for i in range(n):
+        start = time.perf_counter()
+        fn()
+        samples[i] = time.perf_counter() - start
+    return samples
+
+
+def summarize(samples) -> dict:
+    """p50/p99/max of ``samples`` (seconds) in milliseconds."""
+    samples = np.asarray(samples, dtype=float) * 1000
+    if samples.size == 0:
+        return {"n": 0, "p50_ms": float("nan"), "p99_ms": float("nan"), "max_ms": float("nan")}
+    p50, p99 = np.percentile(samples, [50, 99])
+    return {"n": int(samples.size), "p50_ms": float(p50), "p99_ms": float(p99), "max_ms": float(samples.max())}
@@ -0,0 +1,336 @@
+"""Resumable grid search backed by a SQLite trial store.
+
+Every (candidate, fold) pair of the grid is a row in ``trials``; a search
+inserts the rows it needs (existing ones are kept), and workers claim
+pending rows, train and write the score back as soon as it is known.  A
+search that dies keeps everything it finished, a rerun or a wider grid
+only trains what is missing, and several processes -- on this machine or
+started by hand from other shells -- can work through one study together.
+
+Workers claim all pending candidates of one fold that differ only in
+``n_estimators`` at once, so :func:`corvigil.training.fit_group` can still
+train the longest run and score the shorter ones from it, and prefer the
+fold whose matrices they already built.  Rows claimed by a process that no
+longer exists (or longer ago than ``LEASE_SECONDS``) go back to pending.
+
+    python -m corvigil.trials run heart_attack --workers 2
+    python -m corvigil.trials worker heart_attack      # join from another shell
+    python -m corvigil.trials status
+
+A study is tied to its data and the model defaults through a fingerprint;
+reusing a study name with different training data is an error.
+"""
+import argparse
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+
+import numpy as np
+from sklearn.model_selection import ParameterGrid
+
+from corvigil.schema import ROOT, SPECS, get_spec
+from corvigil.scheduler import resolve
+from corvigil.training import (MODEL_DEFAULTS, PARAM_GRIDS, cv_folds, finish_search, fit_group,
+                               prepare_fold)
+
+DEFAULT_STORE = ROOT / ".cache" / "trials.sqlite"
+LEASE_SECONDS = 3600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS studies (
+    name TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    cv INTEGER NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS trials (
+    study TEXT NOT NULL,
+    params TEXT NOT NULL,
+    fold INTEGER NOT NULL,
+    grp TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    score REAL,
+    seconds REAL,
+    worker TEXT,
+    claimed_at REAL,
+    finished_at REAL,
+    PRIMARY KEY (study, params, fold)
+);
+CREATE INDEX IF NOT EXISTS trials_state ON trials (study, state, fold, grp);
+"""
+
+
+def candidate_key(candidate) -> str:
+    return json.dumps(candidate, sort_keys=True)
+
+
+def group_key(candidate) -> str:
+    return json.dumps({k: v for k, v in candidate.items() if k != "model__n_estimators"}, sort_keys=True)
+
+
+def fingerprint(X, y, cv) -> str:
+    """Digest of the training data, fold count and model defaults a study's scores depend on."""
+    h = hashlib.sha256()
+    h.update(json.dumps([list(map(str, X.columns)), MODEL_DEFAULTS, cv], sort_keys=True).encode())
+    h.update(np.ascontiguousarray(X.to_numpy(dtype=np.float64)).tobytes())
+    h.update(np.ascontiguousarray(np.asarray(y, dtype=np.int64)).tobytes())
+    return h.hexdigest()
+
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _alive(worker) -> bool:
+    host, _, pid = worker.rpartition(":")
+    if host != socket.gethostname():
+        return True     # can't tell; the lease decides
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, ValueError):
+        pass
+    return True
+
+
+class TrialStore:
+    """The SQLite file holding studies and their (candidate, fold) trials."""
+
+    def __init__(self, path=DEFAULT_STORE):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # autocommit; writes that must be atomic open ``BEGIN IMMEDIATE`` themselves
+        self.conn = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def create_study(self, name, model, fingerprint, cv):
+        row = self.conn.execute("SELECT model, fingerprint, cv FROM studies WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            self.conn.execute("INSERT OR IGNORE INTO studies VALUES (?, ?, ?, ?, ?)",
+                              (name, model, fingerprint, cv, time.time()))
+        elif tuple(row) != (model, fingerprint, cv):
+            raise ValueError(f"study '{name}' in {self.path} was run on different data, folds or model "
+                             "defaults; pick another study name")
+
+    def study(self, name) -> dict:
+        row = self.conn.execute("SELECT model, fingerprint, cv FROM studies WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            raise KeyError(f"no study '{name}' in {self.path}")
+        return {"model": row[0], "fingerprint": row[1], "cv": row[2]}
+
+    def add_trials(self, study, candidates, cv) -> int:
+        """Insert the trials of ``candidates`` that the study doesn't have yet; returns how many."""
+        rows = [(study, candidate_key(c), f, group_key(c)) for c in candidates for f in range(cv)]
+        self.conn.execute("BEGIN IMMEDIATE")
+        before = self.conn.total_changes
+        self.conn.executemany("INSERT OR IGNORE INTO trials (study, params, fold, grp) VALUES (?, ?, ?, ?)", rows)
+        self.conn.execute("COMMIT")
+        return self.conn.total_changes - before
+
+    def _release_stale(self, study):
+        running = self.conn.execute("SELECT DISTINCT worker FROM trials WHERE study = ? AND state = 'running'",
+                                    (study,)).fetchall()
+        dead = [w for (w,) in running if not _alive(w)]
+        self.conn.executemany("UPDATE trials SET state = 'pending', worker = NULL "
+                              "WHERE study = ? AND state = 'running' AND worker = ?", [(study, w) for w in dead])
+        self.conn.execute("UPDATE trials SET state = 'pending', worker = NULL "
+                          "WHERE study = ? AND state = 'running' AND claimed_at < ?",
+                          (study, time.time() - LEASE_SECONDS))
+
+    def claim(self, study, worker, prefer_fold=-1):
+        """Claim one fold's pending candidates of one ``n_estimators`` group.
+
+        Returns ``(fold, [params, ...])`` with params as the stored JSON
+        keys, or ``None`` when nothing is left to do.
+        """
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._release_stale(study)
+            row = self.conn.execute(
+                "SELECT fold, grp FROM trials WHERE study = ? AND state = 'pending' "
+                "ORDER BY fold = ? DESC, fold, grp LIMIT 1", (study, prefer_fold)).fetchone()
+            if row is None:
+                self.conn.execute("COMMIT")
+                return None
+            fold, grp = row
+            params = [p for (p,) in self.conn.execute(
+                "SELECT params FROM trials WHERE study = ? AND fold = ? AND grp = ? AND state = 'pending'",
+                (study, fold, grp))]
+            self.conn.execute("UPDATE trials SET state = 'running', worker = ?, claimed_at = ? "
+                              "WHERE study = ? AND fold = ? AND grp = ? AND state = 'pending'",
+                              (worker, time.time(), study, fold, grp))
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        return fold, params
+
+    def finish(self, study, fold, results, seconds):
+        """Record ``[(params, score), ...]`` of one claimed group."""
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        self.conn.executemany("UPDATE trials SET state = 'done', score = ?, seconds = ?, finished_at = ? "
+                              "WHERE study = ? AND params = ? AND fold = ?",
+                              [(score, seconds, now, study, params, fold) for params, score in results])
+        self.conn.execute("COMMIT")
+
+    def scores(self, study, candidates, cv) -> np.ndarray:
+        """``(n_candidates, cv)`` scores, NaN where a trial isn't done."""
+        index = {candidate_key(c): i for i, c in enumerate(candidates)}
+        scores = np.full((len(candidates), cv), np.nan)
+        for params, fold, score in self.conn.execute(
+                "SELECT params, fold, score FROM trials WHERE study = ? AND state = 'done'", (study,)):
+            if params in index and fold < cv:
+                scores[index[params], fold] = score
+        return scores
+
+    def counts(self, study=None) -> dict:
+        """``{study: {state: trials}}``."""
+        query = "SELECT study, state, COUNT(*) FROM trials"
+        args = ()
+        if study is not None:
+            query += " WHERE study = ?"
+            args = (study,)
+        out = defaultdict(dict)
+        for name, state, n in self.conn.execute(query + " GROUP BY study, state", args):
+            out[name][state] = n
+        return dict(out)
+
+
+def run_worker(store_path, study, X, y, nthread=None, max_groups=None) -> int:
+    """Claim and train trials of ``study`` until none are pending; returns the groups trained."""
+    store = TrialStore(store_path)
+    meta = store.study(study)
+    if fingerprint(X, y, meta["cv"]) != meta["fingerprint"]:
+        raise ValueError(f"this data doesn't match study '{study}'")
+    spec = get_spec(meta["model"])
+    folds = cv_folds(X, y, meta["cv"])
+    me = worker_id()
+    prepared, trained = None, 0
+    try:
+        while max_groups is None or trained < max_groups:
+            claim = store.claim(study, me, prefer_fold=prepared[0] if prepared else -1)
+            if claim is None:
+                break
+            fold, params = claim
+            if prepared is None or prepared[0] != fold:
+                prepared = (fold, *prepare_fold(spec, X, y, *folds[fold]))
+            scores, train_s, score_s = fit_group([json.loads(p) for p in params], *prepared[1:], nthread=nthread)
+            store.finish(study, fold, zip(params, scores), (train_s + score_s) / len(params))
+            trained += 1
+    finally:
+        store.close()
+    return trained
+
+
+def resumable_search(spec, X, y, param_grid, store=DEFAULT_STORE, study=None, cv=5, workers="auto",
+                     nthread=None, refit=True):
+    """:func:`corvigil.training.fold_cached_search` whose trials persist in ``store``.
+
+    Trials already done in ``study`` (default: the model name) are not
+    trained again.  ``workers`` processes pull pending trials, each with
+    ``nthread`` XGBoost threads, planned by :mod:`corvigil.scheduler` when
+    ``"auto"``/``None``.  Returns a ``SearchResult``; its
+    ``timings`` hold the training seconds of every trial the scores came
+    from, including earlier runs.
+    """
+    study = study or spec.name
+    candidates = list(ParameterGrid(param_grid))
+    trial_store = TrialStore(store)
+    try:
+        trial_store.create_study(study, spec.name, fingerprint(X, y, cv), cv)
+        trial_store.add_trials(study, candidates, cv)
+    finally:
+        trial_store.close()
+
+    plan = resolve(spec.name, X, param_grid, cv, workers, nthread)
+    workers, nthread = plan.n_jobs, plan.nthread
+    if workers <= 1:
+        run_worker(store, study, X, y, nthread)
+    else:
+        # spawn: forked children would inherit the parent's OpenMP state
+        with ProcessPoolExecutor(workers, mp_context=get_context("spawn")) as pool:
+            for future in [pool.submit(run_worker, store, study, X, y, nthread) for _ in range(workers)]:
+                future.result()
+
+    trial_store = TrialStore(store)
+    try:
+        scores = trial_store.scores(study, candidates, cv)
+        keys = [candidate_key(c) for c in candidates]
+        seconds = trial_store.conn.execute(
+            "SELECT SUM(seconds) FROM trials WHERE study = ? AND state = 'done' AND params IN "
+            f"({','.join('?' * len(keys))})", (study, *keys)).fetchone()[0]
+    finally:
+        trial_store.close()
+    missing = int(np.isnan(scores).sum())
+    if missing:
+        raise RuntimeError(f"{missing} trials of '{study}' are still claimed by other workers; rerun to collect them")
+    result = finish_search(spec, X, y, candidates, scores, {"trials": seconds or 0.0}, refit, workers * nthread)
+    result.plan = plan
+    return result
+
+
+def _training_split(name, data=None):
+    from corvigil.featcache import FeatureCache
+
+    split = FeatureCache().load(name, raw_path=data)
+    return split.frame("X_train"), np.asarray(split["y_train"])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Resumable grid search with a SQLite trial store")
+    parser.add_argument("--store", default=str(DEFAULT_STORE))
+    sub = parser.add_subparsers(dest="command", required=True)
+    run = sub.add_parser("run", help="run (or resume) the notebook grid for a model")
+    worker = sub.add_parser("worker", help="work on an existing study's pending trials")
+    for p in (run, worker):
+        p.add_argument("model", choices=sorted(SPECS))
+        p.add_argument("--study", help="study name (default: the model name)")
+        p.add_argument("--data", help="raw training data (defaults to the model's Data/ file)")
+        p.add_argument("--nthread", type=int, help="XGBoost threads per worker")
+    run.add_argument("--workers", default="auto", help="worker processes, or 'auto' (corvigil.scheduler)")
+    run.add_argument("--cv", type=int, default=5)
+    run.add_argument("--quick", action="store_true", help="only the first two max_depth values")
+    status = sub.add_parser("status", help="trial counts per study")
+    status.add_argument("--study")
+    args = parser.parse_args(argv)
+
+    if args.command == "status":
+        for name, states in sorted(TrialStore(args.store).counts(args.study).items()):
+            print(f"{name:<24} " + "  ".join(f"{s} {n}" for s, n in sorted(states.items())))
+        return
+
+    spec = get_spec(args.model)
+    X, y = _training_split(spec.name, args.data)
+    if args.command == "worker":
+        trained = run_worker(args.store, args.study or spec.name, X, y, args.nthread)
+        print(f"trained {trained} candidate groups")
+        return
+
+    grid = dict(PARAM_GRIDS[spec.name])
+    if args.quick:
+        grid["model__max_depth"] = grid["model__max_depth"][:2]
+    start = time.perf_counter()
+    result = resumable_search(spec, X, y, grid, args.store, args.study, args.cv, args.workers,
+                              args.nthread, refit=False)
+    print(f"{len(result.candidates)} candidates x {args.cv} folds in {time.perf_counter() - start:.1f} s "
+          f"({result.timings['trials']:.1f} s of training stored)")
+    print(f"{result.plan.n_jobs} workers x {result.plan.nthread} threads ({result.plan.source})")
+    print(f"best recall {result.best_score_:.4f} with {result.best_params_}")
+
+
+if __name__ == "__main__":
+    main()
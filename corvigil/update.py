@@ -0,0 +1,233 @@
+"""Update an exported model from a new labelled batch without rerunning the grid search.
+
+    python -m corvigil.update heart_attack new_batch.parquet
+    python -m corvigil.update heart_attack new_batch.csv --mode refresh --promote
+    python -m corvigil.update cardiac new_batch.parquet --holdout holdout.parquet --save
+
+``continue`` adds ``--rounds`` boosting rounds fitted on the new batch on top
+of the existing booster; ``refresh`` keeps every tree structure and
+re-estimates the leaf values from the new batch.  The fitted RobustScaler is
+reused as is, so the booster keeps seeing inputs on the scale it was trained on.
+
+The candidate is scored on a held-out set (the cached test split unless
+``--holdout`` is given) at the production threshold, and ``--promote`` only
+replaces ``models/<name>.pkl`` if recall did not drop and ROC-AUC stayed
+within ``--max-auc-drop``.  The previous artifact is kept as
+``models/<name>.<timestamp>.pkl``.  What the sidecar and the ``.onnx``
+graph computed from the old model is rebuilt for the new one, or removed
+when it cannot be, so the apps never explain or drift-check a promoted
+model against its predecessor (see :func:`promote`).  ``--bootstrap N`` also prints paired
+bootstrap intervals of the candidate's difference to the current model
+(:mod:`corvigil.evaluation`), since a few hundred held-out rows rarely
+separate the two.  ``--save`` writes the candidate
+whatever the verdict, by default to ``models/<name>.candidate.pkl`` where
+the apps run it in shadow (:mod:`corvigil.shadow`) before it is promoted.
+"""
+import argparse
+import logging
+import os
+import shutil
+import time
+from datetime import datetime, timezone
+
+import joblib
+import numpy as np
+import xgboost as xgb
+from sklearn.metrics import recall_score, roc_auc_score
+
+from corvigil.artifacts import load_meta, update_meta
+from corvigil.compact import with_booster
+from corvigil.datasets import as_frame, load_features
+from corvigil.featcache import FeatureCache
+from corvigil.schema import SPECS, get_spec
+
+logger = logging.getLogger(__name__)
+
+# sidecar sections computed from the model or its training data
+MODEL_SECTIONS = ("explanations", "background", "drift_reference")
+
+
+def _train(pipeline, X_new, y_new, rounds, extra_params):
+    clf = pipeline[-1]
+    params = clf.get_xgb_params()
+    params.update(extra_params)
+    dtrain = xgb.DMatrix(pipeline[0].transform(X_new), label=np.asarray(y_new))
+    booster = xgb.train(params, dtrain, num_boost_round=rounds, xgb_model=clf.get_booster())
+    return with_booster(pipeline, booster)
+
+
+def continue_boosting(pipeline, X_new, y_new, rounds=50, learning_rate=None):
+    extra = {} if learning_rate is None else {"learning_rate": learning_rate}
+    return _train(pipeline, X_new, y_new, rounds, extra)
+
+
+def refresh_leaves(pipeline, X_new, y_new):
+    rounds = pipeline[-1].get_booster().num_boosted_rounds()
+    return _train(pipeline, X_new, y_new, rounds,
+                  {"process_type": "update", "updater": "refresh", "refresh_leaf": True})
+
+
+def score(pipeline, X, y, threshold) -> dict:
+    prob = pipeline.predict_proba(X)[:, 1]
+    return {"recall": float(recall_score(y, (prob >= threshold).astype(int))),
+            "roc_auc": float(roc_auc_score(y, prob))}
+
+
+def validate(candidate, current, X_holdout, y_holdout, threshold, max_auc_drop=0.01):
+    """Return ``(ok, {"current": metrics, "candidate": metrics})``."""
+    before = score(current, X_holdout, y_holdout, threshold)
+    after = score(candidate, X_holdout, y_holdout, threshold)
+    ok = after["recall"] >= before["recall"] and after["roc_auc"] >= before["roc_auc"] - max_auc_drop
+    return ok, {"current": before, "candidate": after}
+
+
+def rebuild_sections(candidate, spec, meta, X_new=None) -> dict:
+    """The :data:`MODEL_SECTIONS` present in ``meta``, recomputed for ``candidate``; ones that fail are left out.
+
+    Explanations and the background are rebuilt as their ``fit`` commands
+    would (the background with its stored method, size and source); the
+    drift reference also covers ``X_new``, the batch the candidate was updated on.
+    """
+    from corvigil.attribution import build_background, training_rows
+    from corvigil.drift import build_reference
+    from corvigil.explain import build_explanations
+
+    sections = {}
+    for name in MODEL_SECTIONS:
+        if name not in meta:
+            continue
+        try:
+            if name == "background":
+                old = meta[name]
+                synthetic = old["source_rows"] if old.get("source") == "synthetic" else None
+                X, y = training_rows(spec, synthetic=synthetic)
+                value = build_background(candidate, spec, X, y, old["method"], len(old["rows"]), sum(old["counts"]))
+                value["source"] = old.get("source", "training split")
+            elif name == "explanations":
+                value = build_explanations(candidate, spec, training_rows(spec)[0])
+            else:
+                X = np.asarray(training_rows(spec)[0], dtype=np.float64)
+                if X_new is not None:
+                    X = np.vstack([X, np.asarray(X_new, dtype=np.float64)])
+                value = build_reference(X, spec)
+        except Exception as exc:
+            logger.warning("%s: could not rebuild %s for the promoted model: %s: %s",
+                           spec.name, name, type(exc).__name__, exc)
+            continue
+        sections[name] = value
+    return sections
+
+
+def promote(candidate, spec, record=None, X_new=None):
+    """Atomically replace ``spec``'s model with ``candidate``, keeping a timestamped backup.
+
+    The sidecar's :data:`MODEL_SECTIONS` are rebuilt for ``candidate``
+    (:func:`rebuild_sections`) and an exported ``.onnx`` graph re-exported;
+    whatever cannot be is removed rather than left describing the old model
+    (the old graph is kept next to the ``.pkl`` backup), and logged.
+    Returns ``(backup path, {section or "onnx": "rebuilt" | "removed"})``.
+    """
+    from corvigil.onnx_backend import export, onnx_path
+
+    model_path = spec.model_path
+    meta = load_meta(model_path)
+    sections = rebuild_sections(candidate, spec, meta, X_new)
+    changes = {name: "rebuilt" if name in sections else "removed" for name in MODEL_SECTIONS if name in meta}
+    graph = onnx_path(spec)
+    graph_tmp = graph.with_name(f".{graph.name}.{os.getpid()}.tmp")
+    if graph.exists():
+        try:
+            export(spec, candidate, graph_tmp)
+            changes["onnx"] = "rebuilt"
+        except Exception as exc:
+            logger.warning("%s: could not re-export %s for the promoted model: %s: %s",
+                           spec.name, graph.name, type(exc).__name__, exc)
+            changes["onnx"] = "removed"
+
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    backup = model_path.with_name(f"{model_path.stem}.{stamp}.pkl")
+    shutil.copy2(model_path, backup)
+    if "onnx" in changes:
+        shutil.copy2(graph, backup.with_suffix(".onnx"))
+    tmp = model_path.with_name(f".{model_path.name}.{os.getpid()}.tmp")
+    joblib.dump(candidate, tmp)
+    os.replace(tmp, model_path)
+    if record is not None:
+        sections["updates"] = meta.get("updates", []) + [dict(record, backup=backup.name, promoted_at=stamp)]
+    update_meta(model_path, **{name: None for name in MODEL_SECTIONS if changes.get(name) == "removed"}, **sections)
+    if changes.get("onnx") == "rebuilt":
+        os.replace(graph_tmp, graph)
+    elif changes.get("onnx") == "removed":
+        graph.unlink()
+    for name, change in changes.items():
+        if change == "removed":
+            logger.warning("%s: removed %s, it described the previous model", spec.name,
+                           graph.name if name == "onnx" else f"the sidecar's {name}")
+    return backup, changes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Update an exported model from a new labelled batch")
+    parser.add_argument("model", choices=sorted(SPECS))
+    parser.add_argument("batch", help="CSV/Parquet batch with the model's features and label")
+    parser.add_argument("--mode", choices=["continue", "refresh"], default="continue")
+    parser.add_argument("--rounds", type=int, default=50, help="extra rounds for --mode continue")
+    parser.add_argument("--learning-rate", type=float)
+    parser.add_argument("--holdout", help="labelled held-out file (defaults to the cached test split)")
+    parser.add_argument("--max-auc-drop", type=float, default=0.01)
+    parser.add_argument("--promote", action="store_true", help="replace the production artifact if valid")
+    parser.add_argument("--bootstrap", type=int, metavar="N", help="print paired bootstrap intervals over N resamples")
+    parser.add_argument("--save", nargs="?", const="", metavar="PATH",
+                        help="also write the candidate pipeline (defaults to models/<name>.candidate.pkl)")
+    args = parser.parse_args(argv)
+
+    spec = get_spec(args.model)
+    current = joblib.load(spec.model_path)
+    X_new, y_new = load_features(args.batch, spec, dtype=np.float64)
+    if y_new is None:
+        parser.error(f"{args.batch} has no '{spec.target}' column")
+    if args.holdout:
+        X_hold, y_hold = load_features(args.holdout, spec, dtype=np.float64)
+        X_hold = as_frame(X_hold, spec.features)
+    else:
+        split = FeatureCache().load(spec)
+        X_hold, y_hold = split.frame("X_test"), np.asarray(split["y_test"])
+
+    start = time.perf_counter()
+    X_new = as_frame(X_new, spec.features)
+    if args.mode == "continue":
+        candidate = continue_boosting(current, X_new, y_new, args.rounds, args.learning_rate)
+    else:
+        candidate = refresh_leaves(current, X_new, y_new)
+    elapsed = time.perf_counter() - start
+
+    ok, metrics = validate(candidate, current, X_hold, y_hold, spec.threshold, args.max_auc_drop)
+    print(f"{args.mode} on {len(X_new)} rows in {elapsed:.2f}s")
+    for name, m in metrics.items():
+        print(f"{name:<10} recall@{spec.threshold:.2f} {m['recall']:.4f}  ROC-AUC {m['roc_auc']:.4f}")
+    if args.bootstrap:
+        from corvigil.evaluation import bootstrap
+
+        probs = {m: p.predict_proba(X_hold)[:, 1] for m, p in (("current", current), ("candidate", candidate))}
+        diff = bootstrap(y_hold, probs, spec.threshold, args.bootstrap)["candidate - current"]
+        print(f"difference recall {diff['recall']}  ROC-AUC {diff['roc_auc']}  "
+              f"false negatives {diff['false_negatives']:.1f}  (95% over {args.bootstrap} resamples)")
+    if args.save is not None:
+        from corvigil.shadow import candidate_path
+
+        path = args.save or candidate_path(spec)
+        joblib.dump(candidate, path)
+        print(f"Candidate saved to {path}")
+    if not ok:
+        print("Candidate rejected: recall dropped or ROC-AUC fell by more than the allowed margin")
+        raise SystemExit(1)
+    if args.promote:
+        backup, changes = promote(candidate, spec, {"mode": args.mode, "rows": len(X_new),
+                                                    "batch": str(args.batch), **metrics["candidate"]}, X_new)
+        print(f"Promoted; previous model kept as {backup}")
+        for name, change in changes.items():
+            print(f"  {name}: {change}" + ("" if change == "rebuilt" else " (could not be rebuilt for the new model)"))
+
+
+if __name__ == "__main__":
+    main()
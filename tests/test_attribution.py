@@ -0,0 +1,18 @@
+"""Background row counts for the patient explainer."""
+import numpy as np
+import pytest
+
+from corvigil.attribution import _allocate
+
+
+@pytest.mark.parametrize("weights, total", [
+    ([1000] + [1] * 31, 100),       # most clusters raised to one row: the excess comes off the largest
+    ([5, 3, 2], 100),
+    ([1] * 32, 100),
+    ([7, 1, 1], 3),
+])
+def test_allocate_sums_to_total(weights, total):
+    counts = _allocate(weights, total)
+    assert counts.sum() == total
+    assert counts.min() >= 1
+    assert np.argmax(counts) == np.argmax(weights)
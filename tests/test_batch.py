@@ -0,0 +1,30 @@
+"""Batch scoring clips rows to the serving bounds like the apps."""
+import joblib
+import numpy as np
+import pandas as pd
+
+from corvigil.batch import score_batches
+from corvigil.preprocess import apply_clip
+from corvigil.schema import CARDIAC
+
+BOUNDS = {"ap_hi": (90.0, 170.0), "ap_lo": (60.0, 105.0), "weight": (45.0, 110.0), "bmi": (17.0, 40.0)}
+
+
+def test_batch_scores_match_the_clipped_app_path(tmp_path):
+    rng = np.random.default_rng(0)
+    n = 300
+    X = pd.DataFrame({
+        "age": rng.uniform(0.3, 0.7, n), "gender": rng.integers(0, 2, n), "height": rng.integers(140, 200, n),
+        "weight": rng.integers(30, 200, n), "ap_hi": rng.integers(60, 300, n), "ap_lo": rng.integers(30, 200, n),
+        "cholesterol": rng.choice([0.0, 0.5, 1.0], n), "gluc": rng.integers(1, 4, n),
+        "smoke": rng.integers(0, 2, n), "alco": rng.integers(0, 2, n), "active": rng.integers(0, 2, n),
+    }).astype(float)
+    X["bmi"] = X["weight"] / (X["height"] / 100) ** 2
+    X.to_parquet(tmp_path / "patients.parquet")
+    model = joblib.load(CARDIAC.model_path)
+
+    expected = model.predict_proba(apply_clip(X[list(CARDIAC.features)].copy(), BOUNDS))[:, 1]
+    chunks = list(score_batches(tmp_path / "patients.parquet", CARDIAC, model, batch_rows=128, bounds=BOUNDS))
+    assert np.array_equal(np.concatenate([p for _, p in chunks]), expected)
+    clipped = np.concatenate([X for X, _ in chunks])
+    assert clipped[:, CARDIAC.features.index("ap_hi")].max() <= 170.0
@@ -0,0 +1,61 @@
+"""The exported ONNX graphs score like the joblib pipelines on the parity rows."""
+import joblib
+import pytest
+
+from corvigil.onnx_backend import PARITY_ATOL, OnnxPipeline, onnx_path, parity, parity_samples
+from corvigil.schema import SPECS
+
+pytest.importorskip("onnxruntime")
+
+
+@pytest.fixture(params=sorted(SPECS))
+def spec(request):
+    spec = SPECS[request.param]
+    if not onnx_path(spec).exists():
+        pytest.skip(f"{onnx_path(spec).name} not exported")
+    return spec
+
+
+def test_parity_samples_use_the_cached_test_split(spec):
+    from corvigil.featcache import FeatureCache
+
+    split = FeatureCache().load(spec) if spec.data_path.exists() else FeatureCache().latest(spec)
+    if split is None:
+        pytest.skip(f"no data or cached split for {spec.name}")
+    X = parity_samples(spec, n=10_000)
+    assert list(X.columns) == list(spec.features)
+    assert len(X) == len(split["X_test"])
+
+
+def test_onnx_matches_pipeline(spec):
+    report = parity(joblib.load(spec.model_path), OnnxPipeline.load(spec), parity_samples(spec))
+    assert report["max_abs_diff"] <= PARITY_ATOL
+    assert report["single_row_max_abs_diff"] <= PARITY_ATOL
+    assert report["zone_agreement"] == 1.0
+
+
+def test_reload_rejects_a_graph_from_another_pkl(spec, tmp_path):
+    import dataclasses
+    import shutil
+
+    from corvigil.reload import LoadedModel, ModelInvalid, check
+
+    for path in spec.model_path.parent.glob(f"{spec.model_path.stem}.*"):
+        shutil.copy(path, tmp_path / path.name)
+    copy = dataclasses.replace(spec, model_path=tmp_path / spec.model_path.name)
+    X = parity_samples(spec, 256)
+    before = LoadedModel.load(copy, "onnx", workers=1)
+    check(before, X)
+    before.close()
+
+    pipeline = joblib.load(copy.model_path)
+    booster = pipeline[-1].get_booster()
+    pipeline[-1]._Booster = booster[:booster.num_boosted_rounds() // 2]
+    joblib.dump(pipeline, copy.model_path)          # new .pkl, graph still exported from the old one
+    after = LoadedModel.load(copy, "onnx", workers=1)
+    try:
+        assert after.version != before.version
+        with pytest.raises(ModelInvalid, match="disagree"):
+            check(after, X)
+    finally:
+        after.close()
@@ -0,0 +1,111 @@
+"""Health probes and HealthCache against the local stand-in server."""
+import time
+
+import pytest
+
+from corvigil.probes import HealthCache, StandInServer, probe_all
+
+TIMEOUT = 0.5
+
+
+@pytest.fixture
+def server():
+    with StandInServer() as s:
+        yield s
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_ok(server):
+    r = probe_all([server.url("/ok")], TIMEOUT)[server.url("/ok")]
+    assert r.up and r.status == 200 and not r.error
+    assert 0 < r.latency_ms < TIMEOUT * 1000
+
+
+def test_slow_within_timeout_is_up(server):
+    url = server.url("/slow?ms=100")
+    r = probe_all([url], TIMEOUT)[url]
+    assert r.up and r.latency_ms >= 100
+
+
+def test_slow_past_timeout_is_down(server):
+    url = server.url("/slow?ms=2000")
+    start = time.perf_counter()
+    r = probe_all([url], TIMEOUT)[url]
+    assert time.perf_counter() - start < TIMEOUT + 0.5
+    assert not r.up and r.status == 0 and r.error == f"timeout after {TIMEOUT:g}s"
+
+
+@pytest.mark.parametrize("code, up", [(200, True), (404, True), (500, False), (503, False)])
+def test_status(server, code, up):
+    url = server.url(f"/status/{code}")
+    r = probe_all([url], TIMEOUT)[url]
+    assert r.status == code and r.up is up
+
+
+def test_hang_costs_one_timeout_for_all_targets(server):
+    urls = [server.url("/ok"), server.url("/hang"), server.url("/hang?second"), server.url("/status/503")]
+    start = time.perf_counter()
+    results = probe_all(urls, TIMEOUT)
+    assert time.perf_counter() - start < 2 * TIMEOUT
+    assert [results[u].up for u in urls] == [True, False, False, False]
+    assert results[urls[1]].error.startswith("timeout")
+
+
+def test_connection_and_url_errors():
+    refused, bad = "http://127.0.0.1:9/", "ftp://example.org/"
+    results = probe_all([refused, bad], TIMEOUT)
+    assert not results[refused].up and results[refused].status == 0 and results[refused].error
+    assert not results[bad].up and "unsupported URL" in results[bad].error
+
+
+def test_cache_get_never_waits_on_the_network(server):
+    cache = HealthCache(ttl=60, timeout=TIMEOUT)
+    urls = [server.url("/ok"), server.url("/hang")]
+    start = time.perf_counter()
+    assert cache.get(urls) == {u: None for u in urls}          # nothing checked yet
+    assert time.perf_counter() - start < 0.1
+    assert wait_for(lambda: all(cache.get(urls).values()))
+    results = cache.get(urls)
+    assert results[urls[0]].up
+    assert not results[urls[1]].up and results[urls[1]].error.startswith("timeout")
+
+
+def test_cache_serves_stale_results_until_the_refresh_lands():
+    ttl = 2.0
+    cache = HealthCache(ttl=ttl, timeout=TIMEOUT)
+    with StandInServer() as server:
+        url = server.url("/ok")
+        cache.get([url])
+        assert wait_for(lambda: cache.get([url])[url] is not None)
+        first = cache.get([url])[url]
+        checked = time.monotonic()
+        assert first.up
+    # the target is gone; within the TTL the cached result is still served as is
+    assert cache.get([url])[url] is first
+    time.sleep(max(0.0, checked + ttl - time.monotonic()) + 0.05)
+    start = time.perf_counter()
+    assert cache.get([url])[url] is first                       # stale: returned now, refresh started
+    assert time.perf_counter() - start < 0.1
+    assert wait_for(lambda: cache.get([url])[url] is not first)
+    latest = cache.get([url])[url]
+    assert not latest.up and latest.status == 0 and latest.error
+    assert latest.checked_at > first.checked_at
+
+
+def test_recent_latency_counts_successful_checks_only(server):
+    cache = HealthCache(ttl=60, timeout=TIMEOUT, history=3)
+    ok, failing = server.url("/slow?ms=50"), server.url("/status/503")
+    cache.get([ok, failing])
+    for _ in range(4):
+        cache.refresh()
+    assert cache.recent_latency_ms(ok) >= 50
+    assert cache.recent_latency_ms(failing) is None
+    assert len(cache._latencies[ok]) == 3
@@ -0,0 +1,40 @@
+"""A hot reload swaps the sidecar-derived state together with the pipeline."""
+import dataclasses
+import shutil
+
+import pytest
+
+from corvigil.artifacts import load_meta, update_meta
+from corvigil.reload import ModelWatcher
+from corvigil.schema import HEART_ATTACK
+
+
+@pytest.fixture
+def spec(tmp_path):
+    for path in HEART_ATTACK.model_path.parent.glob(f"{HEART_ATTACK.model_path.stem}.*"):
+        shutil.copy(path, tmp_path / path.name)
+    return dataclasses.replace(HEART_ATTACK, model_path=tmp_path / HEART_ATTACK.model_path.name)
+
+
+def test_reload_swaps_bounds_population_and_monitor(spec):
+    meta = load_meta(spec.model_path)
+    if "drift_reference" not in meta or "explanations" not in meta:
+        pytest.skip("heart attack sidecar has no drift reference or explanations")
+    watcher = ModelWatcher(spec, interval=0, backend="sklearn", workers=1)
+    try:
+        old = watcher.current
+        assert old.bounds == {} and old.population == meta["explanations"]
+        assert old.monitor is not None and old.monitor.reference == meta["drift_reference"]
+
+        population = {**meta["explanations"], "rows": 1}
+        update_meta(spec.model_path, clip_bounds={"Cholesterol": [85.0, 600.0]}, explanations=population,
+                    drift_reference=None)
+        assert watcher.current is old                   # nothing changes until the reload
+        assert watcher.reload()
+        new = watcher.current
+        assert new.bounds == {"Cholesterol": (85.0, 600.0)}
+        assert new.population == population
+        assert new.monitor is None
+        assert old.population == meta["explanations"]  # requests in flight keep their snapshot
+    finally:
+        watcher.close()
@@ -0,0 +1,46 @@
+"""Promotion rebuilds or removes what the sidecar and graph said about the old model."""
+import dataclasses
+import shutil
+from unittest import mock
+
+import joblib
+import pytest
+
+from corvigil.artifacts import load_meta
+from corvigil.onnx_backend import onnx_path
+from corvigil.schema import HEART_ATTACK
+from corvigil.update import MODEL_SECTIONS, continue_boosting, promote
+
+
+@pytest.fixture
+def spec(tmp_path):
+    for path in HEART_ATTACK.model_path.parent.glob(f"{HEART_ATTACK.model_path.stem}.*"):
+        if "candidate" not in path.name:
+            shutil.copy(path, tmp_path / path.name)
+    return dataclasses.replace(HEART_ATTACK, model_path=tmp_path / HEART_ATTACK.model_path.name)
+
+
+def test_promote_rebuilds_sections_and_removes_a_graph_it_cannot_export(spec, caplog):
+    from corvigil.attribution import training_rows
+
+    before = load_meta(spec.model_path)
+    present = [name for name in MODEL_SECTIONS if name in before]
+    try:
+        X, y = training_rows(spec)
+    except FileNotFoundError:
+        pytest.skip("no heart attack training split")
+    candidate = continue_boosting(joblib.load(spec.model_path), X.iloc[:200], y[:200], rounds=10)
+    had_graph = onnx_path(spec).exists()
+
+    with mock.patch("corvigil.onnx_backend.export", side_effect=ImportError("no onnxmltools")):
+        backup, changes = promote(candidate, spec, {"mode": "continue"}, X.iloc[:200])
+
+    after = load_meta(spec.model_path)
+    assert {name: changes[name] for name in present} == {name: "rebuilt" for name in present}
+    if "explanations" in present:
+        assert after["explanations"] != before["explanations"]
+    assert after["updates"][-1]["backup"] == backup.name
+    if had_graph:
+        assert changes["onnx"] == "removed" and not onnx_path(spec).exists()
+        assert backup.with_suffix(".onnx").exists()
+        assert "removed heart_attack_detection.onnx" in caplog.text